@@ -0,0 +1,187 @@
+"""
+CacheTablas.py
+
+Caché local del resultado de la etapa de tablas por página (recuadros de las tablas, geometría de
+las celdas, estructura con rowspan/colspan y texto asignado).
+
+La llave de cada página es un hash SHA-256 de su contenido normalizado (flujo de contenido
+re-serializado con pikepdf, fuentes usadas, XObjects de formulario e imágenes, y geometría de la
+página) junto con la versión del detector y la configuración que afecta al resultado. Así, las
+mismas páginas que reaparecen entre ofertas o entre ejecuciones de una misma oferta no vuelven a
+pasar por pdfplumber, el renderizado ni OpenCV. Las páginas localizadas con el motor raster porque
+'find_tables' superó el presupuesto de tiempo no se guardan, ya que su resultado depende de la carga
+de la máquina.
+
+Cada entrada se guarda como un archivo JSON en Config.CACHE_TABLAS_DIR. El tamaño de la caché se
+limita por número de entradas y por tamaño total, desalojando primero las entradas usadas hace más
+tiempo (LRU, usando la fecha de modificación, que se actualiza en cada acierto).
+"""
+
+import hashlib
+import json
+import os
+
+import pikepdf
+
+import Config
+import DetectarCeldasVectoriales
+
+# Versión del detector de tablas. Se debe incrementar cuando cambie la lógica de detección,
+# estructura o asignación de texto, para invalidar los resultados guardados.
+VERSION_DETECTOR = 2
+
+
+def _actualizar_con_objeto(h, objeto, visitados):
+    """
+    Agrega al hash el contenido normalizado de un flujo de contenido (página o XObject de formulario),
+    sus fuentes y, recursivamente, sus XObjects.
+
+    :param h: Objeto hashlib a actualizar.
+    :param objeto: Página o XObject de formulario de pikepdf.
+    :param visitados: Conjunto de objetos ya incluidos (evita ciclos y repeticiones).
+    """
+    h.update(pikepdf.unparse_content_stream(pikepdf.parse_content_stream(objeto)))
+
+    recursos = objeto.get("/Resources")
+    if recursos is None:
+        return
+
+    # El texto extraído depende de la codificación de las fuentes, no solo de los operadores
+    fuentes = recursos.get("/Font")
+    if fuentes is not None:
+        for nombre in sorted(fuentes.keys()):
+            fuente = fuentes[nombre]
+            h.update(f"{nombre}={fuente.get('/BaseFont', '')}".encode("utf-8", errors="ignore"))
+            to_unicode = fuente.get("/ToUnicode")
+            if isinstance(to_unicode, pikepdf.Stream):
+                h.update(hashlib.sha256(to_unicode.read_bytes()).digest())
+
+    xobjects = recursos.get("/XObject")
+    if xobjects is not None:
+        for nombre in sorted(xobjects.keys()):
+            xobj = xobjects[nombre]
+            if not isinstance(xobj, pikepdf.Stream) or xobj.objgen in visitados:
+                continue
+            if xobj.objgen != (0, 0):
+                visitados.add(xobj.objgen)
+            h.update(nombre.encode("utf-8", errors="ignore"))
+            if xobj.get("/Subtype") == "/Form":
+                h.update(str(xobj.get("/Matrix", "")).encode("utf-8") + str(xobj.get("/BBox", "")).encode("utf-8"))
+                _actualizar_con_objeto(h, xobj, visitados)
+            else:
+                h.update(hashlib.sha256(xobj.read_raw_bytes()).digest())
+
+
+def clave_pagina(page, procesar):
+    """
+    Calcula la llave de caché de una página.
+
+    :param page: Página de pikepdf.
+    :param procesar: Indica si las tablas de la página se procesan (en modo normal se ignoran las páginas 0 y 1).
+    :return: Llave hexadecimal (SHA-256), o None si el contenido no se pudo normalizar.
+    """
+    h = hashlib.sha256()
+    configuracion = {
+        "version": VERSION_DETECTOR,
+        "procesar": procesar,
+        "deteccion_vectorial": Config.DETECCION_VECTORIAL,
+        "tolerancia_vectorial": DetectarCeldasVectoriales.TOLERANCIA_VECTORIAL,
+        "longitud_minima_vectorial": DetectarCeldasVectoriales.LONGITUD_MINIMA_VECTORIAL,
+        "prefiltro_tablas": Config.PREFILTRO_TABLAS,
+        "motor_localizacion": Config.MOTOR_LOCALIZACION_TABLAS,
+        "umbral_segmentos_raster": Config.UMBRAL_SEGMENTOS_RASTER,
+        "presupuesto_find_tables": Config.PRESUPUESTO_FIND_TABLES_S,
+        "detector_celdas": Config.DETECTOR_CELDAS,
+        "piramide_celdas": Config.PIRAMIDE_CELDAS,
+    }
+    h.update(json.dumps(configuracion, sort_keys=True).encode("utf-8"))
+    for caja in ("/MediaBox", "/CropBox", "/Rotate"):
+        h.update(f"{caja}={page.obj.get(caja, '')}".encode("utf-8"))
+    try:
+        _actualizar_con_objeto(h, page, set())
+    except pikepdf.PdfError as e:
+        if Config.DEBUG_PRINTS:
+            print(f"No se pudo calcular la llave de caché de la página: {e}")
+        return None
+    return h.hexdigest()
+
+
+def _ruta_entrada(clave):
+    return os.path.join(Config.CACHE_TABLAS_DIR, clave + ".json")
+
+
+def _a_json(valor):
+    """
+    Convierte a tipos nativos los valores de NumPy que puedan venir de la detección raster.
+    """
+    if hasattr(valor, "tolist"):
+        return valor.tolist()
+    raise TypeError(f"Tipo no serializable: {type(valor)}")
+
+
+def leer(clave):
+    """
+    Lee el resultado guardado para la llave y lo marca como usado recientemente.
+
+    :param clave: Llave de la página (ver clave_pagina).
+    :return: Resultado guardado (diccionario) o None si no existe o no se pudo leer.
+    """
+    if not Config.CACHE_TABLAS or clave is None:
+        return None
+    ruta = _ruta_entrada(clave)
+    try:
+        with open(ruta, "r", encoding="utf-8") as archivo:
+            resultado = json.load(archivo)
+        os.utime(ruta)  # Actualizar la fecha de uso para el desalojo LRU
+    except (OSError, ValueError):
+        return None
+    return resultado
+
+
+def escribir(clave, resultado):
+    """
+    Guarda el resultado de la página y aplica los límites de tamaño de la caché.
+
+    :param clave: Llave de la página (ver clave_pagina).
+    :param resultado: Diccionario serializable en JSON con el resultado de la página.
+    """
+    if not Config.CACHE_TABLAS or clave is None:
+        return
+    try:
+        os.makedirs(Config.CACHE_TABLAS_DIR, exist_ok=True)
+        ruta = _ruta_entrada(clave)
+        ruta_temporal = ruta + ".tmp"
+        with open(ruta_temporal, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, default=_a_json)
+        os.replace(ruta_temporal, ruta)
+        podar()
+    except OSError as e:
+        if Config.DEBUG_PRINTS:
+            print(f"No se pudo escribir la caché de tablas: {e}")
+
+
+def podar():
+    """
+    Desaloja las entradas menos usadas recientemente hasta cumplir los límites de
+    Config.CACHE_TABLAS_MAX_ENTRADAS y Config.CACHE_TABLAS_MAX_MB.
+    """
+    entradas = []
+    with os.scandir(Config.CACHE_TABLAS_DIR) as it:
+        for entrada in it:
+            if entrada.is_file() and entrada.name.endswith(".json"):
+                estado = entrada.stat()
+                entradas.append((estado.st_mtime, estado.st_size, entrada.path))
+
+    total_bytes = sum(tamano for _, tamano, _ in entradas)
+    max_bytes = Config.CACHE_TABLAS_MAX_MB * 1024 * 1024
+    entradas.sort()  # Las más antiguas primero
+    restantes = len(entradas)
+    for _, tamano, ruta in entradas:
+        if restantes <= Config.CACHE_TABLAS_MAX_ENTRADAS and total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        restantes -= 1
+        total_bytes -= tamano
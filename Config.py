@@ -1,4 +1,31 @@
+import os
+
 DEBUG_PRINTS = False
 DEBUG_IMAGES = False
 MOVIL = False
-DECODIFICAR = False
\ No newline at end of file
+DECODIFICAR = False
+DETECCION_VECTORIAL = True
+PREFILTRO_TABLAS = True
+PERFIL_EJECUCION = True
+CACHE_TABLAS = True
+CACHE_TABLAS_DIR = os.path.join(os.path.expanduser("~"), ".curacion_pdf", "cache_tablas")
+CACHE_TABLAS_MAX_ENTRADAS = 2000
+CACHE_TABLAS_MAX_MB = 200
+MOTOR_LOCALIZACION_TABLAS = "pdfplumber"
+UMBRAL_SEGMENTOS_RASTER = 3000
+PRESUPUESTO_FIND_TABLES_S = 10
+DEPURACION_VOLCADO_DIR = None
+DETECTOR_CELDAS = "contornos"
+# Solo aplica al detector "proyeccion"; la ruta "contornos" procesa siempre la imagen completa
+PIRAMIDE_CELDAS = 2
+HILOS_DETECCION_CELDAS = os.cpu_count() or 1
+PAGINAS_POR_LOTE_MARKDOWN = 8
+PROCESOS_EXTRACCION_TEXTO = os.cpu_count() or 1
+PAGINAS_POR_TAREA_EXTRACCION = 4
+PAGINAS_MINIMAS_EXTRACCION_PARALELA = 24
+MOTOR_TEXTO = "pdfplumber"
+NEGRILLA_MOTOR_TEXTO = False
+PERSISTENCIA_TABLAS = "archivos"
+PARSER_HTML_TABLAS = "html.parser"
+PROCESOS_CONVERSION_TABLAS = os.cpu_count() or 1
+TABLAS_MINIMAS_CONVERSION_PARALELA = 16
\ No newline at end of file
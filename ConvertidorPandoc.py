@@ -0,0 +1,171 @@
+"""
+ConvertidorPandoc.py
+
+Conversión de texto a Markdown con Pandoc en lote y con memoización.
+
+En lugar de lanzar un proceso de Pandoc por cada página y por cada texto de imagen (pypandoc.convert_text),
+todos los fragmentos pendientes de una etapa se convierten en una sola invocación de "pandoc lua": un
+script Lua recibe la lista de textos en JSON por la entrada estándar, lee y escribe cada uno como un
+documento independiente (pandoc.read / pandoc.write, igual que "pandoc -f markdown -t markdown") y
+devuelve la lista convertida en JSON. Cada fragmento se procesa por separado dentro del mismo proceso,
+así que no hace falta delimitarlos con centinelas ni separar la salida después.
+
+Para que el resultado sea idéntico al de la línea de comandos, antes de enviarlos se eliminan los retornos de
+carro y se expanden las tabulaciones (tab-stop 4) como lo hace el CLI, y el lector recibe la misma lista de
+abreviaturas que usa el CLI (archivo de datos "abbreviations").
+
+Los resultados se memorizan en el proceso por el hash SHA-256 del texto de entrada, y la ruta de Pandoc
+se resuelve (descargándolo si no está instalado) la primera vez que se necesita, no al importar.
+Si "pandoc lua" no está disponible (versiones antiguas de Pandoc) se vuelve a la conversión individual.
+"""
+
+import hashlib
+import json
+import subprocess
+
+import pypandoc
+
+import Config
+
+# Script Lua ejecutado por "pandoc lua": {"abreviaturas": [...], "textos": [...]} -> [markdown, ...]
+SCRIPT_LOTE = """
+local entrada = pandoc.json.decode(io.read('a'), false)
+local abreviaturas = {}
+for _, abreviatura in ipairs(entrada.abreviaturas) do abreviaturas[abreviatura] = true end
+local opciones = {abbreviations = abreviaturas}
+local salidas = {}
+for i, texto in ipairs(entrada.textos) do
+  local salida = pandoc.write(pandoc.read(texto, 'markdown', opciones), 'markdown')
+  if salida:sub(-1) ~= '\\n' then salida = salida .. '\\n' end
+  salidas[i] = salida
+end
+io.write(pandoc.json.encode(salidas))
+"""
+
+# Número máximo de conversiones memorizadas (se descartan primero las más antiguas)
+MEMO_MAXIMO = 4096
+
+_ruta_pandoc = None
+_abreviaturas = None
+_lote_disponible = True
+_memo = {}
+
+
+def ruta_pandoc():
+    """
+    Obtiene la ruta del ejecutable de Pandoc, descargándolo si no se encuentra. El resultado se guarda
+    para las llamadas siguientes.
+
+    :return: Ruta del ejecutable de Pandoc.
+    """
+    global _ruta_pandoc
+    if _ruta_pandoc is None:
+        try:
+            _ruta_pandoc = pypandoc.get_pandoc_path()
+        except OSError:
+            print("[INFO] Pandoc no encontrado, descargando...")
+            pypandoc.download_pandoc()
+            _ruta_pandoc = pypandoc.get_pandoc_path()
+    return _ruta_pandoc
+
+
+def abreviaturas():
+    """
+    Obtiene la lista de abreviaturas que el CLI de Pandoc entrega al lector de Markdown (las abreviaturas
+    reciben un espacio no separable tras el punto).
+
+    :return: Lista de abreviaturas.
+    """
+    global _abreviaturas
+    if _abreviaturas is None:
+        resultado = subprocess.run([ruta_pandoc(), "--print-default-data-file", "abbreviations"],
+                                   capture_output=True, check=True)
+        _abreviaturas = resultado.stdout.decode("utf-8").split()
+    return _abreviaturas
+
+
+def preparar_texto(texto):
+    """
+    Aplica al texto las mismas transformaciones que hace el CLI de Pandoc antes de leerlo: elimina los
+    retornos de carro y expande las tabulaciones con tab-stop 4.
+
+    :param texto: Texto de entrada.
+    :return: Texto listo para pandoc.read.
+    """
+    return "\n".join(linea.expandtabs(4) for linea in texto.replace("\r", "").split("\n"))
+
+
+def _clave(texto):
+    return hashlib.sha256(texto.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _convertir_en_lote(textos):
+    """
+    Convierte una lista de textos en una sola invocación de "pandoc lua".
+
+    :param textos: Lista de textos en Markdown.
+    :return: Lista con los textos convertidos, en el mismo orden.
+    """
+    entrada = {"abreviaturas": abreviaturas(), "textos": [preparar_texto(texto) for texto in textos]}
+    resultado = subprocess.run([ruta_pandoc(), "lua", "-e", SCRIPT_LOTE],
+                               input=json.dumps(entrada).encode("utf-8"), capture_output=True, check=True)
+    salidas = json.loads(resultado.stdout.decode("utf-8"))
+    if not isinstance(salidas, list) or len(salidas) != len(textos):
+        raise ValueError("La salida de pandoc lua no corresponde a los textos enviados")
+    return salidas
+
+
+def convertir_lote(textos):
+    """
+    Convierte una lista de textos de Markdown a Markdown normalizado por Pandoc (equivalente a
+    pypandoc.convert_text(texto, 'md', format='markdown') para cada texto).
+
+    Los textos ya convertidos se toman de la memoria; los pendientes (sin repetir) se convierten en una
+    sola invocación de Pandoc.
+
+    :param textos: Lista de textos a convertir.
+    :return: Lista con los textos convertidos, en el mismo orden.
+    """
+    global _lote_disponible
+    claves = [_clave(texto) for texto in textos]
+    resultados = {}
+    pendientes = {}
+    for clave, texto in zip(claves, textos):
+        if clave in _memo:
+            resultados[clave] = _memo[clave]
+        elif clave not in resultados:
+            pendientes[clave] = texto
+
+    if pendientes:
+        convertidos = None
+        if _lote_disponible:
+            try:
+                convertidos = _convertir_en_lote(list(pendientes.values()))
+            except (OSError, ValueError, subprocess.CalledProcessError) as e:
+                _lote_disponible = False
+                if Config.DEBUG_PRINTS:
+                    print(f"No se pudo convertir en lote con pandoc lua, se convierte texto por texto: {e}")
+        if convertidos is None:
+            ruta_pandoc()
+            convertidos = [pypandoc.convert_text(texto, 'md', format='markdown') for texto in pendientes.values()]
+
+        for clave, convertido in zip(pendientes, convertidos):
+            resultados[clave] = convertido
+            _memo[clave] = convertido
+        while len(_memo) > MEMO_MAXIMO:
+            del _memo[next(iter(_memo))]
+
+        if Config.DEBUG_PRINTS:
+            print(f"Pandoc: {len(pendientes)} textos convertidos, {len(textos) - len(pendientes)} desde memoria")
+
+    return [resultados[clave] for clave in claves]
+
+
+def convertir(texto):
+    """
+    Convierte un único texto (ver convertir_lote).
+
+    :param texto: Texto a convertir.
+    :return: Texto convertido.
+    """
+    return convertir_lote([texto])[0]
@@ -14,7 +14,6 @@ from matplotlib.widgets import RectangleSelector, Button, CheckButtons
 import fitz  # PyMuPDF
 import EliminarDatosInternosFisicos as EDIF
 import ExtraerTablasSinTextoPDF
-import InyectarXObjects
 from PIL import Image
 import numpy as np
 import io
@@ -56,29 +55,31 @@ def limpiar_nombre_carpeta(nombre):
     return nombre[:255]
 
 
-# Inicializar la interfaz de Tkinter para seleccionar el PDF
-root = tk.Tk()
-root.withdraw()  # Oculta la ventana principal de Tkinter
+# Inicializar la interfaz de Tkinter para seleccionar el PDF (solo al ejecutar el script, no cuando
+# los procesos de extracción de texto importan este módulo)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.withdraw()  # Oculta la ventana principal de Tkinter
 
-# Mostrar diálogo para seleccionar archivo PDF
-full_pdf_path = filedialog.askopenfilename(
-    title="Selecciona un archivo PDF",
-    filetypes=[("Archivos PDF", "*.pdf")]
-)
+    # Mostrar diálogo para seleccionar archivo PDF
+    full_pdf_path = filedialog.askopenfilename(
+        title="Selecciona un archivo PDF",
+        filetypes=[("Archivos PDF", "*.pdf")]
+    )
 
-# Verificar que se haya seleccionado un archivo, de lo contrario terminar
-if not full_pdf_path:
-    print("No se seleccionó ningún archivo. Terminando ejecución.")
-    exit()
+    # Verificar que se haya seleccionado un archivo, de lo contrario terminar
+    if not full_pdf_path:
+        print("No se seleccionó ningún archivo. Terminando ejecución.")
+        exit()
 
-# Convertir la ruta a relativa desde el directorio del script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-pdf_path = os.path.relpath(full_pdf_path, start=script_dir)
+    # Convertir la ruta a relativa desde el directorio del script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    pdf_path = os.path.relpath(full_pdf_path, start=script_dir)
 
-# Limpiar el nombre para crear la carpeta destino y asignar folder_path
-nombre_limpio = limpiar_nombre_carpeta(pdf_path.split(".pdf")[0])
-print(nombre_limpio)
-folder_path = f"Curacion_{nombre_limpio}"
+    # Limpiar el nombre para crear la carpeta destino y asignar folder_path
+    nombre_limpio = limpiar_nombre_carpeta(pdf_path.split(".pdf")[0])
+    print(nombre_limpio)
+    folder_path = f"Curacion_{nombre_limpio}"
 
 # Variables globales para almacenar estados y coordenadas de selección
 paginas_omitidas = set()      # Páginas en las que se omite la colisión
@@ -295,7 +296,7 @@ def crop_and_add_to_pdf(page_number, coords, pdf_bytes):
 def apply_crop_with_pikepdf(pdf_bytes):
     """
     Procesa el PDF eliminando elementos internos dentro de las áreas recortadas (usando EDIF)
-    y luego llama a otros módulos (InyectarXObjects, ExtraerTablasSinTextoPDF) para continuar el procesamiento.
+    y luego llama a ExtraerTablasSinTextoPDF para continuar el procesamiento (los XObjects se inyectan por página).
     Además, se actualizan y eliminan widgets y eventos de la interfaz gráfica para proceder.
     
     :param pdf_bytes: Objeto BytesIO con el PDF original.
@@ -329,9 +330,8 @@ def apply_crop_with_pikepdf(pdf_bytes):
     toggle_selector.disconnect_events()
     fig.canvas.mpl_disconnect(event_id)
 
-    # Llamar a otros módulos para continuar procesamiento
-    pdf_xobjects = InyectarXObjects.main(pdf_bytes, folder_path)
-    ExtraerTablasSinTextoPDF.main(pdf_bytes, folder_path, fig, ax, bprev, bnext, pdf_xobjects, True)
+    # Llamar a otros módulos para continuar procesamiento (los XObjects se inyectan por página bajo demanda)
+    ExtraerTablasSinTextoPDF.main(pdf_bytes, folder_path, fig, ax, bprev, bnext, None, True)
 
 
 def draw_rectangles(ax):
@@ -693,44 +693,46 @@ def process_pdf(pdf_bytes):
     new_doc.close()
 
 
-# Configuración de la interfaz gráfica con Matplotlib
-with pdfplumber.open(pdf_path) as pdf:
-    pdf_bytes = pdfplumber_to_fitz(pdf)
-    pdf_bytes.seek(0)
+# La interfaz solo se construye al ejecutar el script (no en los procesos de extracción de texto)
+if __name__ == "__main__":
+    # Configuración de la interfaz gráfica con Matplotlib
+    with pdfplumber.open(pdf_path) as pdf:
+        pdf_bytes = pdfplumber_to_fitz(pdf)
+        pdf_bytes.seek(0)
+
+    fig, ax = plt.subplots(figsize=(14, 9))
+
+    # Crear checkbox para "Modo Móvil"
+    ax_checkbox = plt.axes([0.1, 0.9, 0.1, 0.05])
+    checkbox = CheckButtons(ax_checkbox, ['Modo Móvil'], [False])
+    checkbox.on_clicked(toggle_modo_movil)
+
+    # Crear checkbox para "Omitir colisión"
+    ax_checkbox_omitir = plt.axes([0.05, 0.05, 0.15, 0.05])
+    checkbox_omitir = CheckButtons(ax_checkbox_omitir, ['Omitir colisión'], [False])
+    checkbox_omitir.on_clicked(toggle_omitir_colision)
+
+    # Botones de navegación y confirmación
+    axprev = plt.axes([0.2, 0.05, 0.1, 0.05])
+    axnext = plt.axes([0.35, 0.05, 0.1, 0.05])
+    axconfirm = plt.axes([0.7, 0.05, 0.15, 0.05])
+    bprev = Button(axprev, 'Anterior')
+    bprev.on_clicked(prev_page)
+    bnext = Button(axnext, 'Siguiente')
+    bnext.on_clicked(next_page)
+    bconfirm = Button(axconfirm, 'Confirmar')
+    bconfirm.on_clicked(functools.partial(confirm_and_process, pdf_bytes))
+
+    # Inicializar botones con la configuración actual
+    buttons = []
+    actualizar_botones()
 
-fig, ax = plt.subplots(figsize=(14, 9))
-
-# Crear checkbox para "Modo Móvil"
-ax_checkbox = plt.axes([0.1, 0.9, 0.1, 0.05])
-checkbox = CheckButtons(ax_checkbox, ['Modo Móvil'], [False])
-checkbox.on_clicked(toggle_modo_movil)
-
-# Crear checkbox para "Omitir colisión"
-ax_checkbox_omitir = plt.axes([0.05, 0.05, 0.15, 0.05])
-checkbox_omitir = CheckButtons(ax_checkbox_omitir, ['Omitir colisión'], [False])
-checkbox_omitir.on_clicked(toggle_omitir_colision)
-
-# Botones de navegación y confirmación
-axprev = plt.axes([0.2, 0.05, 0.1, 0.05])
-axnext = plt.axes([0.35, 0.05, 0.1, 0.05])
-axconfirm = plt.axes([0.7, 0.05, 0.15, 0.05])
-bprev = Button(axprev, 'Anterior')
-bprev.on_clicked(prev_page)
-bnext = Button(axnext, 'Siguiente')
-bnext.on_clicked(next_page)
-bconfirm = Button(axconfirm, 'Confirmar')
-bconfirm.on_clicked(functools.partial(confirm_and_process, pdf_bytes))
-
-# Inicializar botones con la configuración actual
-buttons = []
-actualizar_botones()
-
-# Habilitar la selección de recuadros
-toggle_selector = RectangleSelector(
-    ax, onselect, useblit=True,
-    button=[1],
-    minspanx=5, minspany=5, spancoords='pixels', interactive=True
-)
-event_id = fig.canvas.mpl_connect("button_press_event", on_click)
-show_page()
-plt.show()
+    # Habilitar la selección de recuadros
+    toggle_selector = RectangleSelector(
+        ax, onselect, useblit=True,
+        button=[1],
+        minspanx=5, minspany=5, spancoords='pixels', interactive=True
+    )
+    event_id = fig.canvas.mpl_connect("button_press_event", on_click)
+    show_page()
+    plt.show()
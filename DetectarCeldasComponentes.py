@@ -0,0 +1,96 @@
+"""
+DetectarCeldasComponentes.py
+
+Detector raster de celdas basado en componentes conexas, alternativo a la ruta de contornos de
+DetectarCentroidesDeCeldas.
+
+El interior de cada celda es una región blanca rodeada por las líneas de la tabla, así que basta
+una sola llamada a cv2.connectedComponentsWithStats sobre la máscara invertida de líneas para
+obtener a la vez el recuadro, el área y el centroide de todas las celdas. El filtrado (área mínima,
+rectangularidad por proporción de llenado, relación de aspecto y regiones que tocan el borde de la
+imagen) se hace con operaciones booleanas de NumPy, sin llamadas de OpenCV por celda.
+
+El resultado tiene el mismo formato que DetectarCentroidesDeCeldas.detectar_celdas.
+"""
+
+import cv2
+import numpy as np
+
+import Config
+import DetectarCentroidesDeCeldas as dcdc
+import ModeloCeldas as mc
+import SuperposicionDepuracion as sd
+import VerificarTablaCerrada as vtc
+
+
+def detectar_celdas_componentes(path_imagen, llenado_minimo=0.9, lado_minimo=3, relacion_maxima=200):
+    """
+    Detecta las celdas de una tabla como componentes conexas del fondo delimitado por las líneas.
+
+    :param path_imagen: Ruta al archivo de imagen que contiene la tabla.
+    :param llenado_minimo: Proporción mínima del recuadro ocupada por la componente (rectangularidad).
+    :param lado_minimo: Lado mínimo (en píxeles) del interior de una celda.
+    :param relacion_maxima: Relación máxima entre el lado mayor y el menor de una celda.
+    :return: Tuple con el mismo formato que DetectarCentroidesDeCeldas.detectar_celdas:
+             (imagenes_celdas, coordenadas_celdas, coordenadas_centros, imagen_width, imagen_height, dimensiones_tabla),
+             con las celdas en un ModeloCeldas.Celdas.
+    """
+    image = cv2.imread(path_imagen, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise FileNotFoundError(f"No se pudo cargar la imagen en: {path_imagen}")
+    imagen_height, imagen_width = image.shape[:2]
+
+    # Mismo preprocesamiento que la ruta de contornos (imagen binaria: líneas negras sobre blanco)
+    clean_image = vtc.verificar_cierre(dcdc.limpiar_imagen(image))
+
+    # Componentes conexas del fondo (todo lo que no es línea, con el mismo umbral que cargar_imagen)
+    fondo = (clean_image >= 150).astype(np.uint8)
+    _, _, stats, centroides = cv2.connectedComponentsWithStats(fondo, connectivity=4)
+    x = stats[1:, cv2.CC_STAT_LEFT]
+    y = stats[1:, cv2.CC_STAT_TOP]
+    w = stats[1:, cv2.CC_STAT_WIDTH]
+    h = stats[1:, cv2.CC_STAT_HEIGHT]
+    area = stats[1:, cv2.CC_STAT_AREA]
+    centroides = centroides[1:]
+
+    # Filtrado vectorizado de las componentes
+    area_min = (imagen_height * imagen_width) / 2000  # Mismo umbral de área que la ruta de contornos
+    toca_borde = (x == 0) | (y == 0) | (x + w == imagen_width) | (y + h == imagen_height)
+    lado_menor = np.minimum(w, h)
+    validas = (
+        ~toca_borde
+        & (area >= area_min)
+        & (area >= llenado_minimo * w * h)
+        & (lado_menor >= lado_minimo)
+        & (np.maximum(w, h) <= relacion_maxima * np.maximum(lado_menor, 1))
+    )
+
+    # El recuadro de la celda incluye el borde interior de las líneas que la rodean
+    # (mismo criterio que el contorno del hueco en la ruta de contornos)
+    xs = x[validas] - 1
+    ys = y[validas] - 1
+    ws = w[validas] + 2
+    hs = h[validas] + 2
+    cxs = centroides[validas, 0].astype(int)
+    cys = centroides[validas, 1].astype(int)
+
+    # Ordenar por centroide (Y y luego X) y numerar
+    orden = np.lexsort((cxs, cys))
+    coordenadas_celdas = mc.Celdas(np.arange(1, len(orden) + 1), xs[orden], ys[orden], ws[orden], hs[orden],
+                                   cxs[orden], cys[orden], imagen=clean_image)
+    coordenadas_centros = coordenadas_celdas.centros()
+    imagenes_celdas = coordenadas_celdas.recortes()
+    dimensiones_tabla = coordenadas_celdas.limites()
+
+    if Config.DEBUG_PRINTS:
+        print(f"Celdas por componentes conexas: {len(coordenadas_celdas)} de {len(area)} regiones")
+
+    celdas_detectadas = sd.Superposicion("Celdas Detectadas (componentes)", base=clean_image)
+    if celdas_detectadas.activa:
+        for (id_celda, cx, cy, cw, ch), (_, cX, cY) in zip(coordenadas_celdas, coordenadas_centros):
+            celdas_detectadas.rectangulo((cx, cy), (cx + cw, cy + ch), (0, 255, 0), 2)
+            celdas_detectadas.circulo((cX, cY), 5, (0, 0, 255), -1)
+            celdas_detectadas.texto(str(id_celda), (cx + 5, cy + 15), 0.5, (255, 0, 0), 1)
+    celdas_detectadas.publicar(dcdc.mostrar_imagen_redimensionada)
+
+    return imagenes_celdas, coordenadas_celdas, coordenadas_centros, imagen_width, imagen_height, dimensiones_tabla
@@ -0,0 +1,331 @@
+"""
+DetectarCeldasProyeccion.py
+
+Detector raster de celdas basado en perfiles de proyección, alternativo a la ruta de contornos
+de DetectarCentroidesDeCeldas (findContours + jerarquía + approxPolyDP + prueba de ángulos).
+
+Para tablas con líneas, la malla se recupera directamente:
+1. Se limpia la imagen y se cierra la tabla igual que en la ruta de contornos.
+2. Se separan las líneas horizontales y verticales con aperturas morfológicas orientadas.
+3. Los perfiles de proyección de cada máscara dan las bandas (filas/columnas de píxeles) donde hay líneas.
+4. Para cada tramo entre bandas se mide qué fracción está cubierta por la línea; un tramo sin línea
+   une las celdas atómicas vecinas (celdas combinadas).
+5. Las celdas atómicas unidas se agrupan con componentes conexas sobre la rejilla de celdas y cada
+   grupo rectangular se convierte en una celda.
+
+Todo el proceso es lineal en el número de píxeles y está vectorizado con NumPy/OpenCV. El resultado
+tiene el mismo formato que DetectarCentroidesDeCeldas.detectar_celdas.
+
+Con Config.PIRAMIDE_CELDAS > 1 los pasos 1 y 2 se hacen de grueso a fino: la topología de la malla
+se busca en un nivel reducido y el preprocesamiento a resolución completa solo se aplica en franjas
+estrechas alrededor de cada línea. Las máscaras resultantes son las mismas; si la pirámide no es
+fiable para una tabla (ninguna malla en el nivel reducido o una línea que sale de su franja) o no
+compensa (mallas densas, cuyas franjas cubren buena parte de la imagen), se usa la imagen completa.
+La pirámide solo se aplica en este detector (Config.DETECTOR_CELDAS = "proyeccion"); la ruta de
+contornos procesa siempre la imagen completa.
+"""
+
+import cv2
+import numpy as np
+
+import Config
+import DetectarCentroidesDeCeldas as dcdc
+import ModeloCeldas as mc
+import SuperposicionDepuracion as sd
+import VerificarTablaCerrada as vtc
+
+
+def bandas_de_perfil(perfil):
+    """
+    Agrupa las posiciones consecutivas con valor verdadero de un perfil booleano en bandas.
+
+    :param perfil: Array booleano 1D.
+    :return: Tuple (inicios, finales) con las posiciones (inclusivas) de cada banda.
+    """
+    bordes = np.diff(np.concatenate(([0], perfil.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    finales = np.flatnonzero(bordes == -1) - 1
+    return inicios, finales
+
+
+def reducir_bandas(mascara, inicios, finales, axis):
+    """
+    Indica, para cada posición a lo largo del otro eje, si hay algún píxel de la máscara dentro de cada banda.
+
+    :param mascara: Máscara binaria (uint8) de líneas.
+    :param inicios: Inicios (inclusivos) de las bandas a lo largo de 'axis'.
+    :param finales: Finales (inclusivos) de las bandas a lo largo de 'axis'.
+    :param axis: Eje de las bandas (0: filas, 1: columnas).
+    :return: Array booleano con una columna (axis=1) o una fila (axis=0) por banda.
+    """
+    # Se agrega una fila/columna vacía al final para que 'final + 1' siempre sea un índice válido
+    relleno = [(0, 0), (0, 0)]
+    relleno[axis] = (0, 1)
+    mascara = np.pad(mascara, relleno)
+    limites = np.column_stack((inicios, finales + 1)).ravel()
+    reducida = np.maximum.reduceat(mascara, limites, axis=axis)
+    return (reducida[::2] if axis == 0 else reducida[:, ::2]).astype(bool)
+
+
+def cobertura_de_tramos(presencia, limites):
+    """
+    Calcula qué fracción de cada tramo está cubierta, a partir de un perfil de presencia.
+
+    :param presencia: Array booleano (largo, n) con la presencia de línea por posición y banda.
+    :param limites: Array (m, 2) con el inicio y el final (inclusivos) de cada tramo.
+    :return: Array (m, n) con la fracción cubierta de cada tramo en cada banda.
+    """
+    acumulado = np.vstack((np.zeros((1, presencia.shape[1])), np.cumsum(presencia, axis=0)))
+    inicios, finales = limites[:, 0], limites[:, 1]
+    largo = np.maximum(finales - inicios + 1, 1)[:, np.newaxis]
+    return (acumulado[finales + 1] - acumulado[inicios]) / largo
+
+
+def abrir(binaria, ancho, alto):
+    """
+    Apertura morfológica con un elemento rectangular orientado (ancho x alto).
+
+    El borde se considera fondo, para que los trazos que tocan el borde de la imagen no se alarguen.
+    """
+    return cv2.morphologyEx(binaria, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (ancho, alto)),
+                            borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def mascaras_de_lineas(image, longitud_minima):
+    """
+    Preprocesa la imagen completa y separa sus líneas horizontales y verticales.
+
+    :param image: Imagen de la tabla (BGR o BGRA).
+    :param longitud_minima: Longitud mínima (en píxeles) de un tramo de línea.
+    :return: Tuple (clean_image, horizontales, verticales).
+    """
+    # Mismo preprocesamiento que la ruta de contornos (imagen binaria: líneas negras sobre blanco)
+    clean_image = vtc.verificar_cierre(dcdc.limpiar_imagen(image))
+    binaria = (clean_image < 150).astype(np.uint8)
+
+    # Máscaras de líneas horizontales y verticales mediante aperturas orientadas
+    return clean_image, abrir(binaria, longitud_minima, 1), abrir(binaria, 1, longitud_minima)
+
+
+def mascara_reducida(image, factor):
+    """
+    Máscara de píxeles oscuros del nivel reducido, por bloques de factor x factor.
+
+    Es un superconjunto de la máscara binaria que produce el preprocesamiento completo: un píxel que
+    queda oscuro tras componer el alfa sobre blanco y quitar los colores también es oscuro en la imagen
+    original, y cada bloque toma el máximo de la máscara. Un cierre de un píxel en el nivel reducido
+    cubre los huecos que cierra unir_lineas_cercanas a resolución completa.
+    """
+    if image.shape[2] == 4:
+        oscuros = cv2.bitwise_and(cv2.compare(cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY), 170, cv2.CMP_LT),
+                                  cv2.compare(image[:, :, 3], 0, cv2.CMP_GT))
+    else:
+        oscuros = cv2.compare(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 170, cv2.CMP_LT)
+    reducida = cv2.dilate(oscuros, np.ones((factor, factor), np.uint8), anchor=(0, 0))[::factor, ::factor]
+    kernel = np.ones((3, 3), np.uint8)
+    return (cv2.erode(cv2.dilate(reducida, kernel), kernel) > 0).astype(np.uint8)
+
+
+def rangos_de_bandas(inicios, finales, factor, margen, limite, borde):
+    """
+    Convierte las bandas del nivel reducido en rangos [inicio, fin) a resolución completa, ampliados
+    con un margen y unidos cuando se solapan. Se añaden las franjas de 'borde' píxeles de cada extremo.
+    """
+    inicios = np.concatenate(([0], np.maximum(inicios * factor - margen, 0), [max(limite - borde - margen, 0)]))
+    finales = np.concatenate(([min(borde + margen, limite)], np.minimum((finales + 1) * factor + margen, limite), [limite]))
+    rangos = []
+    for inicio, final in sorted(zip(inicios.tolist(), finales.tolist())):
+        if rangos and inicio <= rangos[-1][1]:
+            rangos[-1][1] = max(rangos[-1][1], final)
+        else:
+            rangos.append([inicio, final])
+    return rangos
+
+
+def mascaras_de_lineas_piramide(image, longitud_minima, factor, borde=20, relleno=6, cobertura_maxima=0.3):
+    """
+    Obtiene las mismas máscaras de líneas que mascaras_de_lineas procesando a resolución completa
+    solo franjas estrechas alrededor de las líneas.
+
+    1. En un nivel reducido (bloques de factor x factor) se localizan las bandas de líneas.
+    2. Las líneas de cierre del borde se calculan a resolución completa limpiando solo las franjas del borde.
+    3. Cada franja de filas (ancho completo) y de columnas (alto completo) alrededor de una banda se
+       limpia, se cierra y se abre con el elemento orientado a resolución completa. Las franjas se
+       amplían 'relleno' píxeles para que el cierre morfológico sea el mismo que en la imagen completa.
+
+    :param image: Imagen de la tabla (BGR o BGRA).
+    :param longitud_minima: Longitud mínima (en píxeles, a resolución completa) de un tramo de línea.
+    :param factor: Factor de reducción del nivel grueso.
+    :param borde: Ancho de las franjas que analiza VerificarTablaCerrada.detectar_bordes_oscuros.
+    :param relleno: Píxeles de contexto a cada lado de una franja (alcance del cierre morfológico).
+    :param cobertura_maxima: Fracción máxima de la imagen que pueden cubrir las franjas (filas más columnas).
+                             Por encima, refinar las franjas cuesta más que una pasada a resolución completa.
+    :return: Tuple (horizontales, verticales), o None si la pirámide no es fiable para esta imagen
+             (no hay malla en el nivel reducido o una banda llega al borde de su franja) o si las franjas
+             superan cobertura_maxima.
+    """
+    alto, ancho = image.shape[:2]
+
+    # 1. Topología de la malla en el nivel reducido
+    reducida = mascara_reducida(image, factor)
+    longitud_reducida = max(2, longitud_minima // factor - 1)
+    y_inicio, y_final = bandas_de_perfil(abrir(reducida, longitud_reducida, 1).any(axis=1))
+    x_inicio, x_final = bandas_de_perfil(abrir(reducida, 1, longitud_reducida).any(axis=0))
+    if len(y_inicio) < 2 or len(x_inicio) < 2:
+        return None
+
+    # Las franjas del borde se refinan siempre: allí se dibujan las líneas de cierre
+    margen = 2
+    rangos_y = rangos_de_bandas(y_inicio, y_final, factor, margen, alto, borde)
+    rangos_x = rangos_de_bandas(x_inicio, x_final, factor, margen, ancho, borde)
+
+    # En mallas densas las franjas cubren casi toda la imagen: una sola pasada completa es más barata
+    cobertura = sum(b - a for a, b in rangos_y) / alto + sum(b - a for a, b in rangos_x) / ancho
+    if cobertura > cobertura_maxima:
+        return None
+
+    # 2. Líneas de cierre del borde, sobre un lienzo blanco en el que solo se limpian las franjas del borde
+    lienzo = np.full((alto, ancho, 3), 255, np.uint8)
+    for region in (np.s_[:borde, :], np.s_[-borde:, :], np.s_[:, :borde], np.s_[:, -borde:]):
+        lienzo[region] = dcdc.limpiar_imagen(image[region])
+    for lado in ("top", "bottom", "left", "right"):
+        vtc.detectar_bordes_oscuros(lienzo, lado)
+
+    def binaria_de_franja(region, recorte):
+        # La franja limpia incluye las líneas de cierre (el lienzo es blanco fuera de las franjas del borde)
+        limpia = np.minimum(dcdc.limpiar_imagen(image[region]), lienzo[region])
+        cerrada = vtc.unir_lineas_cercanas(cv2.cvtColor(limpia, cv2.COLOR_BGR2GRAY), kernel_size=3,
+                                           iterations=2, convertir_a_bgr=False)
+        return (cerrada[recorte] < 150).astype(np.uint8)
+
+    # 3. Refinar a resolución completa solo dentro de las franjas. Si una línea llega al borde interior
+    #    de su franja, podría continuar fuera de ella y la pirámide no es fiable
+    horizontales = np.zeros((alto, ancho), np.uint8)
+    verticales = np.zeros((alto, ancho), np.uint8)
+    for a, b in rangos_y:
+        a_ext, b_ext = max(a - relleno, 0), min(b + relleno, alto)
+        franja = abrir(binaria_de_franja(np.s_[a_ext:b_ext, :], np.s_[a - a_ext:b - a_ext, :]), longitud_minima, 1)
+        perfil = franja.any(axis=1)
+        if (a > 0 and perfil[0]) or (b < alto and perfil[-1]):
+            return None
+        horizontales[a:b] = franja
+    for a, b in rangos_x:
+        a_ext, b_ext = max(a - relleno, 0), min(b + relleno, ancho)
+        franja = abrir(binaria_de_franja(np.s_[:, a_ext:b_ext], np.s_[:, a - a_ext:b - a_ext]), 1, longitud_minima)
+        perfil = franja.any(axis=0)
+        if (a > 0 and perfil[0]) or (b < ancho and perfil[-1]):
+            return None
+        verticales[:, a:b] = franja
+    return horizontales, verticales
+
+
+def detectar_celdas_proyeccion(path_imagen, longitud_minima=20, cobertura_minima=0.8, factor_piramide=None):
+    """
+    Detecta las celdas de una tabla con líneas a partir de los perfiles de proyección de sus líneas.
+
+    :param path_imagen: Ruta al archivo de imagen que contiene la tabla.
+    :param longitud_minima: Longitud mínima (en píxeles) de un tramo de línea.
+    :param cobertura_minima: Fracción mínima de un tramo cubierta por línea para considerarlo una pared.
+    :param factor_piramide: Factor de reducción del nivel grueso (None usa Config.PIRAMIDE_CELDAS; 1 desactiva
+                            la pirámide). Con pirámide, las imágenes de las celdas son cortes de la imagen original.
+    :return: Tuple con el mismo formato que DetectarCentroidesDeCeldas.detectar_celdas:
+             (imagenes_celdas, coordenadas_celdas, coordenadas_centros, imagen_width, imagen_height, dimensiones_tabla),
+             con las celdas en un ModeloCeldas.Celdas.
+    """
+    image = cv2.imread(path_imagen, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise FileNotFoundError(f"No se pudo cargar la imagen en: {path_imagen}")
+    imagen_height, imagen_width = image.shape[:2]
+
+    if factor_piramide is None:
+        factor_piramide = Config.PIRAMIDE_CELDAS
+
+    # Máscaras de líneas: primero con la pirámide (si está activa) y, si no es fiable, con la imagen completa
+    mascaras = None
+    if factor_piramide > 1:
+        mascaras = mascaras_de_lineas_piramide(image, longitud_minima, factor_piramide)
+        if mascaras is None and Config.DEBUG_PRINTS:
+            print("Pirámide no fiable o no rentable para esta tabla, se usa la resolución completa.")
+    if mascaras is not None:
+        horizontales, verticales = mascaras
+        clean_image = image[:, :, :3]
+    else:
+        clean_image, horizontales, verticales = mascaras_de_lineas(image, longitud_minima)
+
+    # Bandas de líneas a partir de los perfiles de proyección
+    y_inicio, y_final = bandas_de_perfil(horizontales.any(axis=1))
+    x_inicio, x_final = bandas_de_perfil(verticales.any(axis=0))
+    filas, columnas = len(y_inicio) - 1, len(x_inicio) - 1
+    if filas < 1 or columnas < 1:
+        return [], [], [], imagen_width, imagen_height, (float('inf'), 0, float('inf'), 0)
+
+    # Tramos interiores (entre bandas consecutivas) en cada eje
+    tramos_y = np.column_stack((y_final[:-1] + 1, y_inicio[1:] - 1))
+    tramos_x = np.column_stack((x_final[:-1] + 1, x_inicio[1:] - 1))
+
+    # Presencia de línea por banda: vertical por fila de píxeles y horizontal por columna de píxeles
+    presencia_v = reducir_bandas(verticales, x_inicio, x_final, axis=1)
+    presencia_h = reducir_bandas(horizontales, y_inicio, y_final, axis=0).T
+
+    # Paredes: cobertura de cada tramo entre bandas
+    paredes_v = cobertura_de_tramos(presencia_v, tramos_y) >= cobertura_minima    # (filas, columnas + 1)
+    paredes_h = cobertura_de_tramos(presencia_h, tramos_x).T >= cobertura_minima  # (filas + 1, columnas)
+
+    # Rejilla de conexiones: nodos en posiciones pares, uniones donde no hay pared
+    rejilla = np.zeros((2 * filas - 1, 2 * columnas - 1), np.uint8)
+    rejilla[::2, ::2] = 1
+    rejilla[::2, 1::2] = ~paredes_v[:, 1:-1]
+    rejilla[1::2, ::2] = ~paredes_h[1:-1, :]
+    _, etiquetas = cv2.connectedComponents(rejilla, connectivity=4)
+    etiquetas_celdas = etiquetas[::2, ::2]
+
+    # Extensión de cada grupo de celdas atómicas y prueba de rectangularidad
+    n = etiquetas_celdas.max() + 1
+    filas_idx, columnas_idx = np.indices(etiquetas_celdas.shape)
+    planas = etiquetas_celdas.ravel()
+    i0 = np.full(n, filas, int)
+    j0 = np.full(n, columnas, int)
+    i1 = np.full(n, -1, int)
+    j1 = np.full(n, -1, int)
+    np.minimum.at(i0, planas, filas_idx.ravel())
+    np.minimum.at(j0, planas, columnas_idx.ravel())
+    np.maximum.at(i1, planas, filas_idx.ravel())
+    np.maximum.at(j1, planas, columnas_idx.ravel())
+    atomos = np.bincount(planas, minlength=n)
+    grupos = np.flatnonzero(atomos > 0)
+    rectangulares = grupos[atomos[grupos] == (i1[grupos] - i0[grupos] + 1) * (j1[grupos] - j0[grupos] + 1)]
+
+    # Coordenadas en píxeles (del borde interior de la línea de inicio al de la línea de cierre)
+    xs = x_final[j0[rectangulares]]
+    ys = y_final[i0[rectangulares]]
+    ws = x_inicio[j1[rectangulares] + 1] - xs + 1
+    hs = y_inicio[i1[rectangulares] + 1] - ys + 1
+
+    # Descartar regiones diminutas (mismo umbral de área que la ruta de contornos) y franjas más
+    # delgadas que una línea mínima (por ejemplo, entre un marco doble)
+    area_min = (imagen_height * imagen_width) / 2000
+    validas = (ws * hs >= area_min) & (ws >= longitud_minima) & (hs >= longitud_minima)
+    xs, ys, ws, hs = xs[validas], ys[validas], ws[validas], hs[validas]
+    cxs = xs + ws // 2
+    cys = ys + hs // 2
+
+    # Ordenar por centroide (Y y luego X) y numerar
+    orden = np.lexsort((cxs, cys))
+    coordenadas_celdas = mc.Celdas(np.arange(1, len(orden) + 1), xs[orden], ys[orden], ws[orden], hs[orden],
+                                   cxs[orden], cys[orden], imagen=clean_image)
+    coordenadas_centros = coordenadas_celdas.centros()
+    imagenes_celdas = coordenadas_celdas.recortes()
+    dimensiones_tabla = coordenadas_celdas.limites()
+
+    if Config.DEBUG_PRINTS:
+        print(f"Celdas por proyección: {len(coordenadas_celdas)} ({filas} filas x {columnas} columnas atómicas)")
+
+    celdas_detectadas = sd.Superposicion("Celdas Detectadas (proyeccion)", base=clean_image)
+    if celdas_detectadas.activa:
+        for (id_celda, x, y, w, h), (_, cX, cY) in zip(coordenadas_celdas, coordenadas_centros):
+            celdas_detectadas.rectangulo((x, y), (x + w, y + h), (0, 255, 0), 2)
+            celdas_detectadas.circulo((cX, cY), 5, (0, 0, 255), -1)
+            celdas_detectadas.texto(str(id_celda), (x + 5, y + 15), 0.5, (255, 0, 0), 1)
+    celdas_detectadas.publicar(dcdc.mostrar_imagen_redimensionada)
+
+    return imagenes_celdas, coordenadas_celdas, coordenadas_centros, imagen_width, imagen_height, dimensiones_tabla
@@ -0,0 +1,202 @@
+"""
+DetectarCeldasVectoriales.py
+
+Detecta las celdas de una tabla directamente a partir de la geometría vectorial de la página
+(líneas y rectángulos del flujo de contenido, expuestos por pdfplumber como 'edges'), sin
+rasterizar la tabla.
+
+El proceso es:
+1. Se toman los segmentos horizontales y verticales que caen dentro del área de la tabla.
+2. Se ajustan ("snap") las posiciones cercanas a una misma línea y se unen los segmentos colineales.
+3. Se construye una malla atómica con todas las líneas y se determina, para cada par de celdas
+   vecinas, si existe una pared (segmento) que las separe.
+4. Las celdas atómicas sin pared entre ellas se unen (celdas combinadas) y cada grupo rectangular
+   se convierte en una celda con coordenadas exactas en el PDF.
+
+El resultado tiene el mismo formato que el de DetectarCentroidesDeCeldas.detectar_celdas, pero en
+coordenadas del PDF, por lo que se conecta directamente con generar_estructura_tabla_new y
+asignar_texto_a_estructura_new. Si la geometría no describe una tabla cerrada (por ejemplo, tablas
+que son imágenes), se devuelve una lista vacía para que se use la detección raster.
+"""
+
+import numpy as np
+
+import Config
+import ExtraerEstructuraDeTabla as eedt
+import ModeloCeldas as mc
+
+# Distancia máxima (en puntos) para considerar que dos segmentos están sobre la misma línea
+TOLERANCIA_VECTORIAL = 3
+# Longitud mínima (en puntos) de un segmento para tenerlo en cuenta
+LONGITUD_MINIMA_VECTORIAL = 3
+
+
+def agrupar_posiciones(posiciones, tolerancia):
+    """
+    Agrupa posiciones cercanas (por ejemplo, las dos caras de un rectángulo delgado usado como línea).
+
+    :param posiciones: Lista de coordenadas (números).
+    :param tolerancia: Distancia máxima entre posiciones consecutivas de un mismo grupo.
+    :return: Diccionario {posición original: posición representativa (media del grupo)}.
+    """
+    representantes = {}
+    grupo = []
+    for pos in sorted(set(posiciones)):
+        if grupo and pos - grupo[-1] > tolerancia:
+            media = sum(grupo) / len(grupo)
+            representantes.update({p: media for p in grupo})
+            grupo = []
+        grupo.append(pos)
+    if grupo:
+        media = sum(grupo) / len(grupo)
+        representantes.update({p: media for p in grupo})
+    return representantes
+
+
+def unir_segmentos_colineales(segmentos, tolerancia):
+    """
+    Une los segmentos que están sobre la misma línea y se tocan o se separan menos que la tolerancia.
+
+    :param segmentos: Lista de tuplas (posicion, inicio, fin).
+    :param tolerancia: Separación máxima para considerar dos segmentos como continuos.
+    :return: Diccionario {posicion: [(inicio, fin), ...]} con los intervalos unidos y ordenados.
+    """
+    por_linea = {}
+    for pos, inicio, fin in segmentos:
+        por_linea.setdefault(pos, []).append((inicio, fin))
+
+    lineas = {}
+    for pos, intervalos in por_linea.items():
+        intervalos.sort()
+        unidos = [list(intervalos[0])]
+        for inicio, fin in intervalos[1:]:
+            if inicio <= unidos[-1][1] + tolerancia:
+                unidos[-1][1] = max(unidos[-1][1], fin)
+            else:
+                unidos.append([inicio, fin])
+        lineas[pos] = [tuple(intervalo) for intervalo in unidos]
+    return lineas
+
+
+def detectar_celdas_vectoriales(page, bbox, tolerancia=TOLERANCIA_VECTORIAL, longitud_minima=LONGITUD_MINIMA_VECTORIAL):
+    """
+    Detecta las celdas de la tabla contenida en 'bbox' usando los segmentos vectoriales de la página.
+
+    :param page: Página de pdfplumber donde se detectó la tabla.
+    :param bbox: Tuple (x0, top, x1, bottom) de la tabla en coordenadas del PDF.
+    :param tolerancia: Distancia (en puntos) para ajustar y unir segmentos.
+    :param longitud_minima: Longitud mínima (en puntos) de un segmento para considerarlo una línea.
+    :return: Tuple de:
+             - coordenadas_celdas: Celdas (ModeloCeldas.Celdas) en coordenadas del PDF, ordenadas por
+               centroide (Y y luego X), o lista vacía si no se pudo construir la malla.
+             - lineas_x: Lista ordenada de coordenadas X donde inician las celdas.
+             - lineas_y: Lista ordenada de coordenadas Y donde inician las celdas.
+             - ancho: Coordenada X del borde derecho de la tabla.
+             - alto: Coordenada Y del borde inferior de la tabla.
+    """
+    x0, top, x1, bottom = bbox
+
+    # 1. Segmentos horizontales (y, inicio, fin) y verticales (x, inicio, fin) dentro del área
+    horizontales = []
+    verticales = []
+    for edge in page.edges:
+        if edge["orientation"] == "h":
+            y = edge["top"]
+            inicio, fin = max(edge["x0"], x0), min(edge["x1"], x1)
+            if top - tolerancia <= y <= bottom + tolerancia and fin - inicio >= longitud_minima:
+                horizontales.append((y, inicio, fin))
+        elif edge["orientation"] == "v":
+            x = edge["x0"]
+            inicio, fin = max(edge["top"], top), min(edge["bottom"], bottom)
+            if x0 - tolerancia <= x <= x1 + tolerancia and fin - inicio >= longitud_minima:
+                verticales.append((x, inicio, fin))
+
+    if not horizontales or not verticales:
+        return [], [], [], x1, bottom
+
+    # El contorno de la tabla se considera cerrado (equivalente a VerificarTablaCerrada en la vía raster)
+    horizontales += [(top, x0, x1), (bottom, x0, x1)]
+    verticales += [(x0, top, bottom), (x1, top, bottom)]
+
+    # 2. Ajustar posiciones cercanas y unir segmentos colineales
+    ajuste_y = agrupar_posiciones([y for y, _, _ in horizontales], tolerancia)
+    ajuste_x = agrupar_posiciones([x for x, _, _ in verticales], tolerancia)
+    lineas_h = unir_segmentos_colineales([(ajuste_y[y], a, b) for y, a, b in horizontales], tolerancia)
+    lineas_v = unir_segmentos_colineales([(ajuste_x[x], a, b) for x, a, b in verticales], tolerancia)
+
+    xs = sorted(lineas_v)
+    ys = sorted(lineas_h)
+    filas, columnas = len(ys) - 1, len(xs) - 1
+    if filas < 1 or columnas < 1:
+        return [], [], [], x1, bottom
+
+    def hay_pared(intervalos, inicio, fin):
+        # Existe pared si algún intervalo unido cubre por completo el tramo [inicio, fin]
+        return any(a <= inicio + tolerancia and b >= fin - tolerancia for a, b in intervalos)
+
+    # 3. Unir celdas atómicas que no están separadas por una pared (union-find)
+    padre = list(range(filas * columnas))
+
+    def raiz(k):
+        while padre[k] != k:
+            padre[k] = padre[padre[k]]
+            k = padre[k]
+        return k
+
+    for i in range(filas):
+        for j in range(columnas):
+            k = i * columnas + j
+            if j + 1 < columnas and not hay_pared(lineas_v[xs[j + 1]], ys[i], ys[i + 1]):
+                padre[raiz(k + 1)] = raiz(k)
+            if i + 1 < filas and not hay_pared(lineas_h[ys[i + 1]], xs[j], xs[j + 1]):
+                padre[raiz(k + columnas)] = raiz(k)
+
+    grupos = {}
+    for i in range(filas):
+        for j in range(columnas):
+            grupos.setdefault(raiz(i * columnas + j), []).append((i, j))
+
+    # 4. Convertir cada grupo rectangular en una celda con coordenadas exactas
+    celdas = []
+    for miembros in grupos.values():
+        i0 = min(i for i, _ in miembros)
+        i1 = max(i for i, _ in miembros)
+        j0 = min(j for _, j in miembros)
+        j1 = max(j for _, j in miembros)
+        if len(miembros) != (i1 - i0 + 1) * (j1 - j0 + 1):
+            # Una región no rectangular no se puede expresar con rowspan/colspan
+            if Config.DEBUG_PRINTS:
+                print("Celda vectorial no rectangular, se usa la detección raster.")
+            return [], [], [], x1, bottom
+        celdas.append((xs[j0], ys[i0], xs[j1 + 1] - xs[j0], ys[i1 + 1] - ys[i0]))
+
+    celdas.sort(key=lambda c: (c[1] + c[3] / 2, c[0] + c[2] / 2))
+    coordenadas_celdas = mc.Celdas(np.arange(len(celdas)), *zip(*celdas))
+
+    lineas_x = np.unique(coordenadas_celdas.x).tolist()
+    lineas_y = np.unique(coordenadas_celdas.y).tolist()
+
+    if Config.DEBUG_PRINTS:
+        print(f"Celdas vectoriales detectadas: {len(coordenadas_celdas)} ({len(lineas_y)} filas x {len(lineas_x)} columnas)")
+
+    return coordenadas_celdas, lineas_x, lineas_y, xs[-1], ys[-1]
+
+
+def generar_tabla_vectorial(page, bbox, tabla_actual):
+    """
+    Genera la estructura de la tabla (rowspan/colspan) a partir de las celdas vectoriales.
+
+    :param page: Página de pdfplumber donde se detectó la tabla.
+    :param bbox: Tuple (x0, top, x1, bottom) de la tabla en coordenadas del PDF.
+    :param tabla_actual: Identificador o nombre de la tabla (para depuración).
+    :return: Tuple (tabla_generada, coordenadas_celdas) con las coordenadas en el PDF,
+             o None si la tabla no se puede reconstruir con la geometría vectorial.
+    """
+    coordenadas_celdas, lineas_x, lineas_y, ancho, alto = detectar_celdas_vectoriales(page, bbox)
+    if not coordenadas_celdas:
+        return None
+
+    cuadricula = eedt.construir_cuadricula(lineas_x, lineas_y, ancho, alto)
+    tabla_generada = eedt.generar_estructura_tabla_new(coordenadas_celdas, cuadricula, len(lineas_y), len(lineas_x),
+                                                       ancho, alto, tabla_actual)
+    return tabla_generada, coordenadas_celdas
@@ -3,6 +3,8 @@ import numpy as np
 import VerificarTablaCerrada as vtc    # Módulo para asegurar que la tabla esté "cerrada"
 import DibujarContornosCuadrados as dcc   # Módulo que se encarga de extraer contornos bien definidos
 import Config
+import SuperposicionDepuracion as sd     # Superposiciones de depuración con rasterizado diferido
+import ModeloCeldas as mc               # Modelo compacto (columnas de NumPy) de las celdas
 
 def mostrar_imagen_redimensionada(name_image, image, max_ancho=1600, max_alto=900):
     """
@@ -44,18 +46,19 @@ def calcular_angulo(v1, v2):
     return np.degrees(np.arccos(cos_angulo))
 
 
-def sort_cropped_images(cropped_images, tolerance=4):
+def _tabla_composicion_alfa():
     """
-    Ordena la lista de imágenes recortadas (cada elemento es un diccionario)
-    basándose en la posición del centroide, primero por su coordenada Y y luego por X.
-    
-    :param cropped_images: Lista de diccionarios, cada uno conteniendo la imagen recortada y su centroide.
-    :param tolerance: Tolerancia para agrupar (no se utiliza directamente en el sort, pero puede ser parte de la lógica).
-    :return: La lista de imágenes ordenadas.
+    Construye la tabla de consulta [alfa, valor] -> valor compuesto sobre fondo blanco.
+
+    Se calcula una sola vez con la misma fórmula en coma flotante que se usaba por píxel
+    (incluido su truncamiento), de modo que la composición entera da exactamente el mismo resultado.
     """
-    # Ordena por el segundo valor (coordenada Y) y luego por el primer valor (coordenada X) del centroide
-    cropped_images.sort(key=lambda x: (x["centroide"][1], x["centroide"][0]))
-    return cropped_images
+    valores = np.arange(256, dtype=np.uint8)[np.newaxis, :]
+    alfa = np.arange(256)[:, np.newaxis].astype(float) / 255.0
+    return (valores * alfa + np.full_like(valores, 255) * (1 - alfa)).astype(np.uint8)
+
+
+TABLA_COMPOSICION_ALFA = _tabla_composicion_alfa()
 
 
 def limpiar_imagen(imagen):
@@ -64,36 +67,36 @@ def limpiar_imagen(imagen):
     Se remueve el canal alfa (en caso de existir) y se aplica una máscara para mantener únicamente
     los píxeles en escala de grises.
 
+    La composición del canal alfa se hace con aritmética entera (tabla de consulta) y la imagen se
+    convierte a HSV una sola vez.
+
     :param imagen: Imagen de entrada en formato NumPy (BGR o BGRA).
-    :return: Imagen procesada en la que se han eliminado colores fuertes.
+    :return: Imagen procesada (BGR) en la que se han eliminado colores fuertes.
     """
     if Config.DEBUG_IMAGES:
         mostrar_imagen_redimensionada("Imagen Original", imagen)
     
     # Comprobar si la imagen tiene canal alfa (transparencia)
     if imagen.shape[2] == 4:
-        # Separar canales de color y canal alfa
-        bgr = imagen[:, :, :3]
+        # Combinar la imagen con fondo blanco según la transparencia: los píxeles opacos se conservan,
+        # los transparentes pasan a blanco y solo los semitransparentes se buscan en la tabla
         alpha = imagen[:, :, 3]
-        # Crear un fondo blanco del mismo tamaño
-        fondo_blanco = np.full_like(bgr, 255, dtype=np.uint8)
-        # Normalizar el canal alfa a un rango [0, 1]
-        alpha = alpha.astype(float) / 255.0
-        alpha = alpha[:, :, np.newaxis]  # Agregar dimensión para multiplicación
-        # Combinar la imagen con fondo blanco según la transparencia
-        imagen_sin_transparencia = (bgr * alpha + fondo_blanco * (1 - alpha)).astype(np.uint8)
+        transparentes = cv2.cvtColor(cv2.compare(alpha, 0, cv2.CMP_EQ), cv2.COLOR_GRAY2BGR)
+        resultado = cv2.max(cv2.cvtColor(imagen, cv2.COLOR_BGRA2BGR), transparentes)
+        ys, xs = np.nonzero(cv2.inRange(alpha, 1, 254))
+        resultado[ys, xs] = TABLA_COMPOSICION_ALFA[alpha[ys, xs][:, np.newaxis], resultado[ys, xs]]
         if Config.DEBUG_PRINTS:
             print("Tiene transparencia")
     else:
-        imagen_sin_transparencia = imagen.copy()
+        resultado = imagen.copy()
         if Config.DEBUG_PRINTS:
             print("No tiene transparencia")
 
     if Config.DEBUG_IMAGES:
-        mostrar_imagen_redimensionada("Imagen sin transparencia", imagen_sin_transparencia)
+        mostrar_imagen_redimensionada("Imagen sin transparencia", resultado)
 
     # Convertir la imagen a espacio de color HSV para facilitar la separación de tonos
-    hsv = cv2.cvtColor(imagen_sin_transparencia, cv2.COLOR_BGR2HSV)
+    hsv = cv2.cvtColor(resultado, cv2.COLOR_BGR2HSV)
     
     if Config.DEBUG_IMAGES:
         mostrar_imagen_redimensionada("Imagen hsv", hsv)
@@ -103,11 +106,8 @@ def limpiar_imagen(imagen):
     upper_color = np.array([180, 255, 255])
     mascara_colores = cv2.inRange(hsv, lower_color, upper_color)
 
-    # Crear una imagen blanca que actuará como plantilla
-    resultado = np.full_like(imagen_sin_transparencia, 255, dtype=np.uint8)
-    # Conservar solo aquellos píxeles que NO estén dentro del rango de colores intensos,
-    # dejando así únicamente los tonos de gris
-    resultado[mascara_colores == 0] = imagen_sin_transparencia[mascara_colores == 0]
+    # Blanquear los píxeles de colores intensos, dejando así únicamente los tonos de gris
+    resultado[mascara_colores > 0] = 255
 
     if Config.DEBUG_IMAGES:
         mostrar_imagen_redimensionada("Imagen_Limpia", resultado)
@@ -129,8 +129,9 @@ def detectar_celdas(path_imagen):
     
     :param path_imagen: Ruta al archivo de imagen que contiene la tabla.
     :return: Tuple que contiene:
-             - imagenes_celdas: Lista de imágenes (cortes) de cada celda.
-             - coordenadas_celdas: Lista de tuplas (id_celda, x, y, w, h) de cada celda.
+             - imagenes_celdas: Secuencia perezosa con el recorte de cada celda (ModeloCeldas.Recortes).
+             - coordenadas_celdas: Celdas (ModeloCeldas.Celdas) ordenadas por centroide; se recorren
+               como tuplas (id_celda, x, y, w, h).
              - coordenadas_centros: Lista de tuplas (id_celda, cX, cY) con el centro de cada celda.
              - imagen_width: Ancho original de la imagen.
              - imagen_height: Alto original de la imagen.
@@ -144,7 +145,8 @@ def detectar_celdas(path_imagen):
     # Procesar la imagen para eliminar colores no deseados y dejar solo tonos de gris
     clean_image = limpiar_imagen(image)
 
-    # Verificar y corregir el cierre de la tabla (se llama a un módulo externo para esto)
+    # Verificar y corregir el cierre de la tabla (se llama a un módulo externo para esto).
+    # El resultado es una imagen binaria en escala de grises (líneas negras sobre fondo blanco).
     clean_image = vtc.verificar_cierre(clean_image)
 
     # Mostrar imagen limpia para revisión
@@ -154,15 +156,10 @@ def detectar_celdas(path_imagen):
     # Extraer contornos de la imagen utilizando funciones del módulo dcc
     contours_to_keep = dcc.cargar_imagen(clean_image)
 
-    cropped_images = []  # Lista para almacenar datos de cada celda detectada
+    # Columnas del modelo de celdas: (id_celda, x, y, w, h, cX, cY) de cada celda detectada
+    columnas_celdas = []
     id_celda = 1         # Identificador único para cada celda
 
-    # Inicializar variables para delimitar el área global de la tabla
-    xt1 = float('inf')   # Menor valor de X detectado
-    yt1 = float('inf')   # Menor valor de Y detectado
-    xt2 = 0              # Mayor valor en X + ancho
-    yt2 = 0              # Mayor valor en Y + alto
-
     for contour in contours_to_keep:
         # Calcular el perímetro del contorno
         perimeter = cv2.arcLength(contour, True)
@@ -186,44 +183,30 @@ def detectar_celdas(path_imagen):
                     x, y, w, h = cv2.boundingRect(approx)
                     if Config.DEBUG_PRINTS:
                         print("x, w, y, h:", x, w, y, h)
-                    # Actualizar límites globales de la tabla
-                    xt1 = min(xt1, x)
-                    yt1 = min(yt1, y)
-                    xt2 = max(xt2, x + w)
-                    yt2 = max(yt2, y + h)
-                    # Extraer el recorte de la celda de la imagen limpia
-                    cropped = clean_image[y:y+h, x:x+w]
-                    # Almacenar los datos de la celda en un diccionario
-                    cropped_images.append({
-                        "id_celda": id_celda,
-                        "imagen": cropped,
-                        "coordenadas": (id_celda, x, y, w, h),
-                        "centroide": (id_celda, cX, cY)
-                    })
+                    columnas_celdas.append((id_celda, x, y, w, h, cX, cY))
                     id_celda += 1
 
-    # Ordenar las celdas en función de la posición de sus centroides
-    sorted_images = sort_cropped_images(cropped_images, tolerance=10)
-
-    # Extraer listas separadas para imágenes, coordenadas y centroides
-    imagenes_celdas = [img_data["imagen"] for img_data in sorted_images]
-    coordenadas_celdas = [img_data["coordenadas"] for img_data in sorted_images]
-    coordenadas_centros = [img_data["centroide"] for img_data in sorted_images]
+    # Modelo de celdas ordenado en función de la posición de sus centroides (X del centroide y luego
+    # identificador, el mismo orden de siempre); los recortes de la imagen limpia solo se crean si se piden
+    celdas = mc.Celdas(*(zip(*columnas_celdas) if columnas_celdas else [[]] * 7), imagen=clean_image)
+    coordenadas_celdas = celdas.seleccionar(np.lexsort((celdas.ids, celdas.cx)))
+    imagenes_celdas = coordenadas_celdas.recortes()
+    coordenadas_centros = coordenadas_celdas.centros()
 
     # Obtener las dimensiones de la imagen original
     imagen_height, imagen_width, _ = image.shape
-    # Las dimensiones globales de la tabla se basan en los límites detectados
-    dimensiones_tabla = (xt1, xt2, yt1, yt2)
+    # Las dimensiones globales de la tabla se basan en los límites de las celdas detectadas
+    dimensiones_tabla = coordenadas_celdas.limites()
 
     # Dibujar los rectángulos y centroides sobre la imagen limpia para verificación visual
-    image_copy = clean_image.copy()
-    for (id_celda, x, y, w, h), (_, cX, cY) in zip(coordenadas_celdas, coordenadas_centros):
-        cv2.rectangle(image_copy, (x, y), (x + w, y + h), (0, 255, 0), 2)  # Dibujar rectángulo en verde
-        cv2.circle(image_copy, (cX, cY), 5, (0, 0, 255), -1)             # Dibujar centroide en rojo
-        cv2.putText(image_copy, str(id_celda), (x + 5, y + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-    
-    # Mostrar la imagen con los rectángulos y centroides detectados
-    if Config.DEBUG_IMAGES:
-        mostrar_imagen_redimensionada("Celdas Detectadas", image_copy)
+    celdas_detectadas = sd.Superposicion("Celdas Detectadas", base=clean_image)
+    if celdas_detectadas.activa:
+        for (id_celda, x, y, w, h), (_, cX, cY) in zip(coordenadas_celdas, coordenadas_centros):
+            celdas_detectadas.rectangulo((x, y), (x + w, y + h), (0, 255, 0), 2)  # Dibujar rectángulo en verde
+            celdas_detectadas.circulo((cX, cY), 5, (0, 0, 255), -1)             # Dibujar centroide en rojo
+            celdas_detectadas.texto(str(id_celda), (x + 5, y + 15), 0.5, (255, 0, 0), 1)
+
+    # Mostrar (o volcar) la imagen con los rectángulos y centroides detectados
+    celdas_detectadas.publicar(mostrar_imagen_redimensionada)
 
     return imagenes_celdas, coordenadas_celdas, coordenadas_centros, imagen_width, imagen_height, dimensiones_tabla
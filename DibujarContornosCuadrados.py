@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-import Config
+import SuperposicionDepuracion as sd  # Superposiciones de depuración con rasterizado diferido
 
 def mostrar_imagen_redimensionada(name_image, image, max_ancho=1280, max_alto=720):
     """
@@ -191,72 +191,53 @@ def cargar_imagen(image):
     alto, ancho = image.shape
     area_min = (alto * ancho) / 2000  # Definir un umbral mínimo basado en el área de la imagen
     
-    # Extraer la jerarquía (si existe)
-    hierarchy = hierarchy[0] if hierarchy is not None else []
-
-    filtered_contours = []
-    index_map = {}         # Mapear índices originales a nuevos índices (si fuera necesario)
-    new_hierarchy_list = []  # Almacenar la jerarquía filtrada
-
-    new_index = 0
-    # Filtrar los contornos por área
-    for i, cnt in enumerate(contours):
-        if cv2.contourArea(cnt) >= area_min:
-            filtered_contours.append(cnt)
-            index_map[i] = new_index
-            new_hierarchy_list.append(list(hierarchy[i]))  # Guardar la jerarquía correspondiente
-            new_index += 1
-
-    # Ajustar la jerarquía de acuerdo a los nuevos índices
-    if filtered_contours:
-        new_hierarchy = np.array(new_hierarchy_list)
-        for i in range(len(new_hierarchy)):
-            for j in range(4):  # Actualizar Next, Previous, First_Child, Parent
-                if new_hierarchy[i][j] != -1 and new_hierarchy[i][j] in index_map:
-                    new_hierarchy[i][j] = index_map[new_hierarchy[i][j]]
-                else:
-                    new_hierarchy[i][j] = -1
+    # Filtrar los contornos por área (las áreas se calculan de una vez en un array)
+    if not contours:
+        contornos_sin_hijos = []
     else:
-        new_hierarchy = None
+        hierarchy = hierarchy[0]
+        areas = np.array([cv2.contourArea(cnt) for cnt in contours])
+        conservados = areas >= area_min
 
-    # Si hay jerarquía, se extraen los contornos sin hijos (los que no contienen otros contornos)
-    if new_hierarchy is not None:
-        contornos_sin_hijos = [filtered_contours[i] for i in range(len(filtered_contours)) if new_hierarchy[i][2] == -1]
-    else:
-        contornos_sin_hijos = filtered_contours
+        # Un contorno conservado no tiene hijos si no tiene primer hijo o si ese primer hijo se
+        # descartó por área (equivale a reconstruir la jerarquía con solo los contornos conservados)
+        primer_hijo = hierarchy[:, 2]
+        sin_hijos_mask = conservados & ((primer_hijo == -1) | ~conservados[primer_hijo])
+        contornos_sin_hijos = [contours[i] for i in np.flatnonzero(sin_hijos_mask)]
 
-    # Dibujar los contornos sin hijos en una copia de la imagen para visualización
-    image_sin_hijos = cv2.cvtColor(image.copy(), cv2.COLOR_GRAY2BGR)
-    cv2.drawContours(image_sin_hijos, contornos_sin_hijos, -1, (0, 255, 0), 1)
+    # Registrar los contornos sin hijos para visualización (solo se dibujan si se depura)
+    sin_hijos = sd.Superposicion("Contornos sin hijos", base=image)
+    sin_hijos.contornos(contornos_sin_hijos, (0, 255, 0), 1)
+    sin_hijos.publicar(mostrar_imagen_redimensionada)
 
-    # Preparar la imagen final para dibujar los contornos simplificados y centroides
-    result = cv2.cvtColor(image.copy(), cv2.COLOR_GRAY2BGR)
+    # Superposición con los contornos simplificados, sus vértices y sus índices
+    result = sd.Superposicion("Resultado", base=image)
 
     for idx, cnt in enumerate(contornos_sin_hijos):
         # Simplificar el contorno eliminando vértices que estén alineados
         nuevo_contorno = eliminar_vertices_alineados(cnt)
         contornos_sin_hijos[idx] = nuevo_contorno
 
+        if not result.activa:
+            continue
+
         # Dibujar el contorno simplificado en color verde sobre la imagen de resultado
-        cv2.drawContours(result, [nuevo_contorno], -1, (0, 255, 0), 3)
-        idv = 0
+        result.contornos([nuevo_contorno], (0, 255, 0), 3)
         # Dibujar cada vértice y su índice para facilitar la depuración
-        for point in nuevo_contorno:
-            x, y = point[0]
-            cv2.circle(result, (x, y), 5, (0, 0, 255), -1)  # Vértice en rojo
-            cv2.putText(result, str(idv), (x + 5, y + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-            idv += 1
+        for idv, point in enumerate(nuevo_contorno):
+            x, y = (int(v) for v in point[0])
+            result.circulo((x, y), 5, (0, 0, 255), -1)  # Vértice en rojo
+            result.texto(str(idv), (x + 5, y + 5), 0.5, (255, 0, 0), 1)
 
         # Calcular el centroide del contorno y dibujar el índice del contorno
         M = cv2.moments(nuevo_contorno)
         if M["m00"] != 0:
             cx = int(M["m10"] / M["m00"])
             cy = int(M["m01"] / M["m00"])
-            cv2.putText(result, str(idx), (cx, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-        
-        # Mostrar el resultado en cada iteración si se está en modo depuración
-        if Config.DEBUG_IMAGES:
-            mostrar_imagen_redimensionada("Resultado", result)
-    
+            result.texto(str(idx), (cx, cy), 0.6, (0, 0, 0), 2)
+
+    # Mostrar (o volcar) el resultado si se está en modo depuración
+    result.publicar(mostrar_imagen_redimensionada)
+
     # Retornar los contornos procesados (simplificados) para uso posterior en detección de celdas
     return contornos_sin_hijos
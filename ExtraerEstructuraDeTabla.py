@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
-import Config
 import RenderizarTablaHTML
+import SuperposicionDepuracion as sd  # Superposiciones de depuración con rasterizado diferido
+import ModeloCeldas as mc  # Modelo compacto (columnas de NumPy) de las celdas y de la malla
 
 def mostrar_imagen_redimensionada(name_image, image, max_ancho=1600, max_alto=900):
     """
@@ -35,9 +36,9 @@ def generar_malla(coordenadas_celdas, imagen_width, imagen_height):
       3. Se agrupan las coordenadas cercanas utilizando una función auxiliar (agrupar_coordenadas),
          con un umbral en cada eje.
       4. Se generan las líneas de la malla a partir de las coordenadas agrupadas.
-      5. Se dibuja la malla sobre una imagen en blanco de las dimensiones originales.
+      5. Se registra la malla como superposición de depuración (solo se dibuja si alguien la pide).
 
-    :param coordenadas_celdas: Lista de tuplas (id_celda, x, y, w, h) que representan las celdas detectadas.
+    :param coordenadas_celdas: Celdas detectadas (ModeloCeldas.Celdas o lista de tuplas (id_celda, x, y, w, h)).
     :param imagen_width: Ancho de la imagen original.
     :param imagen_height: Alto de la imagen original.
     :return: Tuple que contiene:
@@ -45,25 +46,25 @@ def generar_malla(coordenadas_celdas, imagen_width, imagen_height):
              - lineas_y: Lista de coordenadas Y agrupadas.
              - max_filas: Número de filas de la malla.
              - max_columnas: Número de columnas de la malla.
-             - imagen_malla: Imagen en blanco con la malla dibujada.
+             - imagen_malla: Superposición de depuración con la malla (ver SuperposicionDepuracion;
+               'renderizar()' devuelve la imagen en blanco con la malla dibujada).
              - umbral_x: Umbral utilizado para agrupar las coordenadas en X.
              - umbral_y: Umbral utilizado para agrupar las coordenadas en Y.
     """
 
-    # Extraer la anchura y altura de cada celda para determinar umbrales mínimos.
-    anchuras = [w for _, x, y, w, h in coordenadas_celdas]
-    alturas = [h for _, x, y, w, h in coordenadas_celdas]
+    celdas = mc.como_celdas(coordenadas_celdas)
 
-    min_anchura = min(anchuras) if anchuras else 10  # Evita división por cero
-    min_altura = min(alturas) if alturas else 10      # Evita división por cero
+    # Usar la anchura y altura mínimas de las celdas para determinar los umbrales.
+    min_anchura = celdas.w.min().item() if len(celdas) else 10  # Evita división por cero
+    min_altura = celdas.h.min().item() if len(celdas) else 10   # Evita división por cero
 
     # Definir umbrales de agrupación basados en la dimensión mínima de las celdas
     umbral_x = min_anchura / 1.5
     umbral_y = min_altura / 1.5
 
     # Extraer y ordenar las coordenadas únicas en X e Y
-    coordenadas_x = sorted(set(x for _, x, y, w, h in coordenadas_celdas))
-    coordenadas_y = sorted(set(y for _, x, y, w, h in coordenadas_celdas))
+    coordenadas_x = np.unique(celdas.x).tolist()
+    coordenadas_y = np.unique(celdas.y).tolist()
 
     def agrupar_coordenadas(coordenadas, umbral):
         """
@@ -91,30 +92,157 @@ def generar_malla(coordenadas_celdas, imagen_width, imagen_height):
     max_columnas = len(lineas_x)
     max_filas = len(lineas_y)
 
-    # Crear una imagen en blanco para dibujar la malla
-    imagen_malla = np.ones((imagen_height, imagen_width, 3), dtype=np.uint8) * 255
+    # Registrar la malla sobre un lienzo en blanco de las dimensiones originales
+    imagen_malla = sd.Superposicion("malla creada", forma=(imagen_height, imagen_width))
+    if imagen_malla.activa:
+        # Dibujar líneas verticales
+        for x in lineas_x:
+            imagen_malla.linea((x, 0), (x, imagen_height), (0, 0, 0), 1)
 
-    # Dibujar líneas verticales
-    for x in lineas_x:
-        cv2.line(imagen_malla, (x, 0), (x, imagen_height), (0, 0, 0), 1)
+        # Dibujar líneas horizontales
+        for y in lineas_y:
+            imagen_malla.linea((0, y), (imagen_width, y), (0, 0, 0), 1)
 
-    # Dibujar líneas horizontales
-    for y in lineas_y:
-        cv2.line(imagen_malla, (0, y), (imagen_width, y), (0, 0, 0), 1)
-
-    if Config.DEBUG_IMAGES:
-        mostrar_imagen_redimensionada("malla creada", imagen_malla)
+    imagen_malla.publicar(mostrar_imagen_redimensionada)
 
     return lineas_x, lineas_y, max_filas, max_columnas, imagen_malla, umbral_x, umbral_y
 
 
+def construir_cuadricula(lineas_x, lineas_y, ancho, alto):
+    """
+    Construye la cuadricula (matriz de celdas de la malla) a partir de las líneas agrupadas.
+
+    Cada celda de la cuadricula inicia en una línea de la malla y termina en la siguiente; la última
+    fila y la última columna se extienden hasta el alto y el ancho indicados.
+
+    :param lineas_x: Lista ordenada de coordenadas X de la malla.
+    :param lineas_y: Lista ordenada de coordenadas Y de la malla.
+    :param ancho: Coordenada X donde termina la última columna (ancho de la imagen o borde derecho de la tabla).
+    :param alto: Coordenada Y donde termina la última fila (alto de la imagen o borde inferior de la tabla).
+    :return: ModeloCeldas.Cuadricula; cuadricula[i][j] es el diccionario con claves "x", "y", "w" y "h".
+    """
+    return mc.Cuadricula(lineas_x, lineas_y, ancho, alto)
+
+
+def calcular_fusiones(etiquetas):
+    """
+    Calcula las celdas fusionadas (rowspan y colspan) a partir del mapa de etiquetas de la malla.
+
+    Para cada etiqueta se obtienen, en una sola pasada vectorizada, las filas y columnas mínimas y
+    máximas que ocupa y el número de celdas de la malla que tiene. Si ocupa su rectángulo completo,
+    la fusión es ese rectángulo. Las etiquetas cuya región no es un rectángulo (celdas detectadas que
+    se superponen o que quedan partidas) se fusionan recorriéndolas por filas: se expande a la derecha
+    mientras la etiqueta se repite y luego hacia abajo mientras toda la fila de la fusión la repite.
+
+    :param etiquetas: Matriz (filas, columnas) de la malla con la etiqueta de cada celda (-1: sin celda).
+    :return: Lista de tuplas (fila, columna, rowspan, colspan) con la celda principal de cada fusión.
+    """
+    filas, columnas = etiquetas.shape
+    planas = etiquetas.ravel()
+    marcadas = np.flatnonzero(planas >= 0)
+    if len(marcadas) == 0:
+        return []
+
+    # Agrupar las celdas de la malla por etiqueta (dentro de cada grupo quedan en orden por filas)
+    orden = marcadas[np.argsort(planas[marcadas], kind="stable")]
+    etiquetas_ordenadas = planas[orden]
+    inicios = np.flatnonzero(np.r_[True, etiquetas_ordenadas[1:] != etiquetas_ordenadas[:-1]])
+    finales = np.r_[inicios[1:], len(orden)]
+    filas_malla, columnas_malla = np.divmod(orden, columnas)
+
+    fila_min = np.minimum.reduceat(filas_malla, inicios)
+    fila_max = np.maximum.reduceat(filas_malla, inicios)
+    columna_min = np.minimum.reduceat(columnas_malla, inicios)
+    columna_max = np.maximum.reduceat(columnas_malla, inicios)
+    rowspan = fila_max - fila_min + 1
+    colspan = columna_max - columna_min + 1
+    completas = (finales - inicios) == rowspan * colspan
+
+    fusiones = list(zip(fila_min[completas].tolist(), columna_min[completas].tolist(),
+                        rowspan[completas].tolist(), colspan[completas].tolist()))
+
+    for inicio, fin in zip(inicios[~completas].tolist(), finales[~completas].tolist()):
+        etiqueta = etiquetas_ordenadas[inicio]
+        celdas_asignadas = set()
+        for i, j in zip(filas_malla[inicio:fin].tolist(), columnas_malla[inicio:fin].tolist()):
+            if (i, j) in celdas_asignadas:
+                continue
+            colspan_region = 1
+            while j + colspan_region < columnas and etiquetas[i, j + colspan_region] == etiqueta:
+                colspan_region += 1
+            rowspan_region = 1
+            while i + rowspan_region < filas and (etiquetas[i + rowspan_region, j:j + colspan_region] == etiqueta).all():
+                rowspan_region += 1
+            celdas_asignadas.update((r, c) for r in range(i, i + rowspan_region) for c in range(j, j + colspan_region))
+            fusiones.append((i, j, rowspan_region, colspan_region))
+
+    return fusiones
+
+
+def construir_estructura(coordenadas_celdas, cuadricula):
+    """
+    Genera la estructura de la tabla a partir de la malla y las celdas detectadas.
+
+    Se pinta el mapa de etiquetas de la malla (ver ModeloCeldas.Cuadricula.etiquetar), se calculan
+    las fusiones con calcular_fusiones y se arma la matriz de diccionarios de la estructura.
+
+    :param coordenadas_celdas: Celdas detectadas (ModeloCeldas.Celdas o lista de tuplas (id_celda, x, y, w, h)).
+    :param cuadricula: Malla (ModeloCeldas.Cuadricula o matriz de diccionarios con claves "x", "y", "w" y "h").
+    :return: Matriz (lista de listas) con la estructura de la tabla (ver generar_estructura_tabla_new).
+    """
+    celdas = mc.como_celdas(coordenadas_celdas)
+    cuadricula = mc.como_cuadricula(cuadricula)
+
+    # La fusión se hace por ID (dos celdas detectadas con el mismo ID forman una sola región)
+    ids_celdas, id_por_posicion = np.unique(celdas.ids, return_inverse=True)
+    posiciones = cuadricula.etiquetar(celdas)
+    etiquetas = np.where(posiciones >= 0, id_por_posicion.ravel()[posiciones], -1) if len(celdas) else posiciones
+    ids_celdas = ids_celdas.tolist()
+    centros_x, centros_y = (centros.tolist() for centros in cuadricula.centros())
+
+    # Cada celda de la malla con el ID de la celda detectada que contiene su centro (o None)
+    tabla = [
+        [
+            {
+                "id_celda": ids_celdas[etiqueta] if etiqueta >= 0 else None,
+                "contenido": f"Celda ({i},{j})",
+                "rowspan": 1,
+                "colspan": 1,
+                "centro": (center_x, center_y)
+            }
+            for j, (etiqueta, center_x, center_y) in enumerate(zip(fila_etiquetas, fila_x, fila_y))
+        ]
+        for i, (fila_etiquetas, fila_x, fila_y) in enumerate(zip(etiquetas.tolist(), centros_x, centros_y))
+    ]
+
+    # Asignar a la celda principal de cada fusión su rowspan y colspan, y marcar las demás celdas de la
+    # fusión con rowspan=0 y colspan=0, conservando el centro de la principal
+    for i, j, rowspan, colspan in calcular_fusiones(etiquetas):
+        principal = tabla[i][j]
+        principal["rowspan"] = rowspan
+        principal["colspan"] = colspan
+        for r in range(i, i + rowspan):
+            for c in range(j, j + colspan):
+                if r == i and c == j:
+                    continue
+                tabla[r][c] = {
+                    "id_celda": principal["id_celda"],
+                    "contenido": "",
+                    "rowspan": 0,
+                    "colspan": 0,
+                    "centro": principal["centro"]
+                }
+
+    return tabla
+
+
 def generar_estructura_tabla(coordenadas_celdas, cuadricula, max_filas, max_columnas, imagen_width, imagen_height, umbral_x, umbral_y, tabla_actual):
     """
     Genera la estructura de la tabla a partir de los datos de la malla obtenida y las celdas detectadas.
 
-    Se crea una tabla (matriz) inicial asignando a cada celda de la cuadricula un placeholder
-    que incluye un identificador (ID) detectado, usando los centros de las celdas. Luego se fusionan
-    las celdas contiguas que tienen el mismo ID para generar los valores de 'rowspan' y 'colspan'.
+    Se asigna a cada celda de la cuadricula el identificador (ID) de la celda detectada que contiene su
+    centro. Luego se fusionan las celdas contiguas que tienen el mismo ID para generar los valores de
+    'rowspan' y 'colspan'. Usa el mismo motor que generar_estructura_tabla_new (construir_estructura).
 
     :param coordenadas_celdas: Lista de tuplas (id_celda, x, y, w, h) de las celdas detectadas.
     :param cuadricula: Matriz (lista de listas) de diccionarios con claves "x", "y", "w" y "h" para cada celda de la malla.
@@ -132,82 +260,7 @@ def generar_estructura_tabla(coordenadas_celdas, cuadricula, max_filas, max_colu
              - "colspan": Número de columnas fusionadas.
              - "centro": Coordenadas del centro de la celda fusionada.
     """
-    # Función auxiliar para determinar el ID de la celda detectada dada la posición central
-    def obtener_id_celda(center_x, center_y):
-        for id_celda, x, y, w, h in coordenadas_celdas:
-            if center_x >= x and center_x <= x + w and center_y >= y and center_y <= y + h:
-                return id_celda
-        return None
-
-    # Inicializar la tabla vacía
-    tabla = [[None for _ in range(max_columnas)] for _ in range(max_filas)]
-    for i in range(max_filas):
-        for j in range(max_columnas):
-            celda = cuadricula[i][j]
-            center_x = celda["x"] + celda["w"] / 2
-            center_y = celda["y"] + celda["h"] / 2
-            detected_id = None
-            # Buscar el ID de la celda que contenga el centro de la celda de la cuadricula
-            for id_celda, x, y, w, h in coordenadas_celdas:
-                if center_x >= x and center_x <= x + w and center_y >= y and center_y <= y + h:
-                    detected_id = id_celda
-                    break
-            tabla[i][j] = {
-                "id_celda": detected_id,
-                "contenido": f"Celda ({i},{j})",
-                "rowspan": 1,
-                "colspan": 1,
-                "centro": (center_x, center_y)
-            }
-
-    # Fusionar celdas contiguas que tengan el mismo ID para generar estructura de rowspan y colspan
-    celdas_asignadas = set()
-    for i in range(max_filas):
-        for j in range(max_columnas):
-            if (i, j) in celdas_asignadas:
-                continue
-            current_id = tabla[i][j]["id_celda"]
-            if current_id is None:
-                continue
-
-            # Expansión horizontal: calcular el colspan
-            colspan = 1
-            while j + colspan < max_columnas and tabla[i][j + colspan]["id_celda"] == current_id:
-                celdas_asignadas.add((i, j + colspan))
-                colspan += 1
-
-            # Expansión vertical: calcular el rowspan
-            rowspan = 1
-            vertical_fusion_possible = True
-            while i + rowspan < max_filas and vertical_fusion_possible:
-                for col in range(j, j + colspan):
-                    if tabla[i + rowspan][col]["id_celda"] != current_id:
-                        vertical_fusion_possible = False
-                        break
-                if vertical_fusion_possible:
-                    for col in range(j, j + colspan):
-                        celdas_asignadas.add((i + rowspan, col))
-                    rowspan += 1
-
-            # Asignar a la celda principal los valores de la fusión
-            tabla[i][j]["rowspan"] = rowspan
-            tabla[i][j]["colspan"] = colspan
-
-            # Marcar las celdas fusionadas, excepto la principal, con rowspan y colspan en cero
-            for r in range(i, i + rowspan):
-                for c in range(j, j + colspan):
-                    if r == i and c == j:
-                        continue
-                    tabla[r][c] = {
-                        "id_celda": current_id,
-                        "contenido": "",
-                        "rowspan": 0,
-                        "colspan": 0,
-                        "centro": tabla[i][j]["centro"]
-                    }
-                    celdas_asignadas.add((r, c))
-
-    return tabla
+    return construir_estructura(coordenadas_celdas, cuadricula)
 
 
 def generar_estructura_tabla_new(coordenadas_celdas, cuadricula, max_filas, max_columnas, imagen_width, imagen_height, tabla_actual):
@@ -216,8 +269,8 @@ def generar_estructura_tabla_new(coordenadas_celdas, cuadricula, max_filas, max_
     y las celdas detectadas. Para cada celda de la cuadricula, se determina el ID basado en el centro de la misma; luego,
     se fusionan aquellas celdas contiguas que tienen el mismo ID para determinar los valores de rowspan y colspan.
 
-    :param coordenadas_celdas: Lista de tuplas (id_celda, x, y, w, h) de las celdas detectadas.
-    :param cuadricula: Matriz (lista de listas) de diccionarios que definen las celdas con claves "x", "y", "w", "h".
+    :param coordenadas_celdas: Celdas detectadas (ModeloCeldas.Celdas o lista de tuplas (id_celda, x, y, w, h)).
+    :param cuadricula: ModeloCeldas.Cuadricula con la malla (ver construir_cuadricula).
     :param max_filas: Número de filas en la cuadricula.
     :param max_columnas: Número de columnas en la cuadricula.
     :param imagen_width: Ancho de la imagen original.
@@ -226,80 +279,4 @@ def generar_estructura_tabla_new(coordenadas_celdas, cuadricula, max_filas, max_
     :return: Matriz (lista de listas) que representa la tabla final, donde cada celda es un diccionario con:
              "id_celda", "contenido", "rowspan", "colspan" y "centro".
     """
-    
-    # Función auxiliar: asigna un ID a la celda basada en si el centro cae dentro del bounding box de alguna celda detectada.
-    def obtener_id_celda(center_x, center_y):
-        for id_celda, x, y, w, h in coordenadas_celdas:
-            if center_x >= x and center_x <= x + w and center_y >= y and center_y <= y + h:
-                return id_celda
-        return None
-
-    # Inicializar la tabla como una matriz vacía
-    tabla = [[None for _ in range(max_columnas)] for _ in range(max_filas)]
-    for i in range(max_filas):
-        for j in range(max_columnas):
-            celda = cuadricula[i][j]
-            center_x = celda["x"] + celda["w"] / 2
-            center_y = celda["y"] + celda["h"] / 2
-            detected_id = None
-            # Determinar el ID de la celda detectada a partir de su centro
-            for id_celda, x, y, w, h in coordenadas_celdas:
-                if center_x >= x and center_x <= x + w and center_y >= y and center_y <= y + h:
-                    detected_id = id_celda
-                    break
-            tabla[i][j] = {
-                "id_celda": detected_id,
-                "contenido": f"Celda ({i},{j})",
-                "rowspan": 1,
-                "colspan": 1,
-                "centro": (center_x, center_y)
-            }
-
-    # Fusionar celdas contiguas que tengan el mismo ID para asignar rowspan y colspan
-    celdas_asignadas = set()
-    for i in range(max_filas):
-        for j in range(max_columnas):
-            if (i, j) in celdas_asignadas:
-                continue
-            current_id = tabla[i][j]["id_celda"]
-            if current_id is None:
-                continue
-
-            # Calcular el colspan expandiéndose a la derecha
-            colspan = 1
-            while j + colspan < max_columnas and tabla[i][j + colspan]["id_celda"] == current_id:
-                celdas_asignadas.add((i, j + colspan))
-                colspan += 1
-
-            # Calcular el rowspan expandiéndose hacia abajo
-            rowspan = 1
-            vertical_fusion_possible = True
-            while i + rowspan < max_filas and vertical_fusion_possible:
-                for col in range(j, j + colspan):
-                    if tabla[i + rowspan][col]["id_celda"] != current_id:
-                        vertical_fusion_possible = False
-                        break
-                if vertical_fusion_possible:
-                    for col in range(j, j + colspan):
-                        celdas_asignadas.add((i + rowspan, col))
-                    rowspan += 1
-
-            # Asignar en la celda principal los valores de fusión
-            tabla[i][j]["rowspan"] = rowspan
-            tabla[i][j]["colspan"] = colspan
-
-            # Marcar las celdas fusionadas (excepto la principal) con rowspan=0 y colspan=0, conservando el centro.
-            for r in range(i, i + rowspan):
-                for c in range(j, j + colspan):
-                    if r == i and c == j:
-                        continue
-                    tabla[r][c] = {
-                        "id_celda": current_id,
-                        "contenido": "",
-                        "rowspan": 0,
-                        "colspan": 0,
-                        "centro": tabla[i][j]["centro"]
-                    }
-                    celdas_asignadas.add((r, c))
-
-    return tabla
+    return construir_estructura(coordenadas_celdas, cuadricula)
@@ -25,16 +25,25 @@ from PIL import Image           # Manipulación de imágenes
 from colorama import Style, Fore, Back  # Opcional, para resaltar salida en consola
 import InyectarXObjects         # Módulo para trabajar con XObjects (imágenes/objetos incrustados)
 import RenderizarTablaHTML as RtHTML # Para convertir tablas a HTML y mostrarlas en PyQt
+import RenderizarTablaMarkdown as RtMD  # Para generar el Markdown de las tablas desde su estructura
+import PersistenciaTablasHTML  # Escritura del HTML de las tablas fuera del bucle de detección
+import ModeloCeldas as mc       # Modelo compacto (columnas de NumPy) de las celdas
+import DetectarCeldasVectoriales  # Para detectar celdas desde la geometría vectorial del PDF
+import PrefiltroDeTablas        # Prefiltro barato de presencia de tablas (sin layout)
+import PerfilEjecucion          # Perfil de tiempos y decisiones de la ejecución
+import CacheTablas              # Caché de resultados de tablas por contenido de página
+import LocalizarTablasRaster    # Motor raster de localización de tablas (alternativa a find_tables)
 import cv2                      # OpenCV para procesar imágenes (detección y recorte)
 import EliminarYEscribirLlavesDeTablas as EYELDT  # Para eliminar elementos de área en el PDF y escribir llaves
 import sys                      # Acceso a argumentos y salida del script
+import time                     # Medición de tiempos para el perfil de ejecución
 import io                       # Manejo de flujos de bytes
+from concurrent.futures import ThreadPoolExecutor  # Detección de celdas de varias tablas en paralelo
 import Extraer_Imagenes         # Módulo para extracción de imágenes en PDF
 import Config                   # Configuración global (DEBUG, etc.)
 import EliminarYEscribirImagenes  # Para eliminar imágenes y agregar llaves en el PDF
 import PasarTextoPlanoAMarkdown  # Convertir texto plano a Markdown
 import EnviarImagenesAChatGPT    # Para enviar imágenes a la API de ChatGPT
-import RemplazarImagenesDeMarkdown # Para reemplazar imágenes referenciadas en Markdown
 
 from pathlib import Path         # Utilidad para manejo de rutas
 
@@ -56,6 +65,109 @@ def convertir_a_ruta_larga(path_str):
 # =============================================================================
 # 1. FUNCION PARA ELIMINAR TEXTO DEL PDF
 # =============================================================================
+# Patrón para identificar comandos de texto Tj y TJ
+patron_texto = re.compile(r'\((.*?)\)\s*Tj|\[(.*?)\]\s*TJ')
+# Patrón para detectar comandos de posicionamiento (Td y Tm)
+patron_tm_td = re.compile(r'([-0-9.]+)\s+([-0-9.]+)\s+Td|([-0-9.]+)\s+([-0-9.]+)\s+Tm')
+
+
+def procesar_contenido(contenido):
+    """
+    Elimina los comandos de texto del contenido decodificado y actualiza las coordenadas
+    de los textos, si fuese necesario. Devuelve el contenido sin texto codificado en latin1.
+    
+    :param contenido: Cadena decodificada del contenido de una página.
+    :return: Contenido procesado como bytes.
+    """
+    current_x, current_y = 0, 0  # Variables para almacenar la posición actual
+    nuevas_lineas = []  # Lista para acumular líneas procesadas
+
+    if Config.DECODIFICAR:
+        print("Contenido decodificado de la página:")
+        print(contenido[:100000])  # Muestra un fragmento del contenido para depuración
+
+    # Procesar cada línea del contenido
+    for line in contenido.split("\n"):
+        # Buscar comandos de transformación (Tm, Td) para actualizar la posición
+        tm_td_match = patron_tm_td.search(line)
+        if tm_td_match:
+            # Se actualiza la posición según grupos encontrados
+            x_pos = float(tm_td_match.group(1) or tm_td_match.group(3) or 0)
+            y_pos = float(tm_td_match.group(2) or tm_td_match.group(4) or 0)
+            current_x, current_y = x_pos, y_pos
+
+        # Eliminar los comandos Tj y TJ que contienen el texto
+        line = re.sub(patron_texto, "", line)
+        nuevas_lineas.append(line)  # Agregar la línea procesada
+
+    # Unir todas las líneas y codificar el resultado
+    return "\n".join(nuevas_lineas).encode("latin1")
+
+
+def procesar_xobjects(page):
+    """
+    Elimina el texto contenido en los XObjects de la página.
+    
+    Itera por cada XObject dentro de /Resources y, si es un flujo,
+    aplica la función 'procesar_contenido'.
+    
+    :param page: Diccionario que representa la página.
+    """
+    if "/Resources" in page and "/XObject" in page["/Resources"]:
+        xobjects = page["/Resources"]["/XObject"]
+        if Config.DEBUG_PRINTS:
+            print("XObjects detectados en la página:", list(xobjects.keys()))
+        # Procesar cada XObject
+        for xobj_name in list(xobjects):
+            xobj = xobjects[xobj_name]
+            if isinstance(xobj, pikepdf.Stream):
+                try:
+                    # Leer el contenido del XObject como bytes
+                    contenido_xobj = xobj.read_bytes()
+                    # Decodificar para procesar el contenido
+                    contenido_xobj = contenido_xobj.decode("latin1", errors="ignore")
+                    if Config.DEBUG_PRINTS:
+                        print(f"Contenido decodificado de XObject {xobj_name}:")
+                        print(contenido_xobj[:100000])
+                    # Procesar y eliminar el texto del contenido del XObject
+                    nuevo_contenido_xobj = procesar_contenido(contenido_xobj)
+                    xobj.write(nuevo_contenido_xobj)
+                except pikepdf.PdfError:
+                    if Config.DEBUG_PRINTS:
+                        print(f"No se pudo leer el contenido de XObject {xobj_name}, posiblemente codificado.")
+
+
+def eliminar_texto_de_pagina(page):
+    """
+    Elimina el texto del contenido de una página de pikepdf y de sus XObjects.
+
+    :param page: Página de pikepdf a modificar.
+    """
+    if "/Contents" not in page:
+        return  # Ignorar páginas sin contenido
+
+    contenido_obj = page["/Contents"]
+    # Si es un array, concatenar todos los flujos; de lo contrario, leer el flujo único
+    if isinstance(contenido_obj, pikepdf.Array):
+        contenido_completo = b"".join(p.read_bytes() for p in contenido_obj)
+    else:
+        contenido_completo = contenido_obj.read_bytes()
+
+    # Decodificar el contenido para poder procesarlo
+    contenido_decodificado = contenido_completo.decode("latin1", errors="ignore")
+    nuevo_contenido = procesar_contenido(contenido_decodificado)
+
+    # Reemplazar el contenido original con el contenido procesado
+    if isinstance(contenido_obj, pikepdf.Array):
+        for obj in contenido_obj:
+            obj.write(nuevo_contenido)
+    else:
+        contenido_obj.write(nuevo_contenido)
+
+    # Procesar el texto dentro de XObjects en la página
+    procesar_xobjects(page)
+
+
 def eliminar_texto_preciso(pdf_bytes, output_path):
     """
     Genera un nuevo PDF en el que se elimina todo el texto de cada página,
@@ -72,102 +184,11 @@ def eliminar_texto_preciso(pdf_bytes, output_path):
     pdf_bytes.seek(0)
     pdf = pikepdf.open(pdf_bytes)
 
-    # Patrón para identificar comandos de texto Tj y TJ
-    patron_texto = re.compile(r'\((.*?)\)\s*Tj|\[(.*?)\]\s*TJ')
-    # Patrón para detectar comandos de posicionamiento (Td y Tm)
-    patron_tm_td = re.compile(r'([-0-9.]+)\s+([-0-9.]+)\s+Td|([-0-9.]+)\s+([-0-9.]+)\s+Tm')
-
-    def procesar_contenido(contenido):
-        """
-        Elimina los comandos de texto del contenido decodificado y actualiza las coordenadas
-        de los textos, si fuese necesario. Devuelve el contenido sin texto codificado en latin1.
-        
-        :param contenido: Cadena decodificada del contenido de una página.
-        :return: Contenido procesado como bytes.
-        """
-        current_x, current_y = 0, 0  # Variables para almacenar la posición actual
-        nuevas_lineas = []  # Lista para acumular líneas procesadas
-
-        if Config.DECODIFICAR:
-            print("Contenido decodificado de la página:")
-            print(contenido[:100000])  # Muestra un fragmento del contenido para depuración
-
-        # Procesar cada línea del contenido
-        for line in contenido.split("\n"):
-            # Buscar comandos de transformación (Tm, Td) para actualizar la posición
-            tm_td_match = patron_tm_td.search(line)
-            if tm_td_match:
-                # Se actualiza la posición según grupos encontrados
-                x_pos = float(tm_td_match.group(1) or tm_td_match.group(3) or 0)
-                y_pos = float(tm_td_match.group(2) or tm_td_match.group(4) or 0)
-                current_x, current_y = x_pos, y_pos
-
-            # Eliminar los comandos Tj y TJ que contienen el texto
-            line = re.sub(patron_texto, "", line)
-            nuevas_lineas.append(line)  # Agregar la línea procesada
-
-        # Unir todas las líneas y codificar el resultado
-        return "\n".join(nuevas_lineas).encode("latin1")
-
-    def procesar_xobjects(page):
-        """
-        Elimina el texto contenido en los XObjects de la página.
-        
-        Itera por cada XObject dentro de /Resources y, si es un flujo,
-        aplica la función 'procesar_contenido'.
-        
-        :param page: Diccionario que representa la página.
-        """
-        if "/Resources" in page and "/XObject" in page["/Resources"]:
-            xobjects = page["/Resources"]["/XObject"]
-            if Config.DEBUG_PRINTS:
-                print("XObjects detectados en la página:", list(xobjects.keys()))
-            # Procesar cada XObject
-            for xobj_name in list(xobjects):
-                xobj = xobjects[xobj_name]
-                if isinstance(xobj, pikepdf.Stream):
-                    try:
-                        # Leer el contenido del XObject como bytes
-                        contenido_xobj = xobj.read_bytes()
-                        # Decodificar para procesar el contenido
-                        contenido_xobj = contenido_xobj.decode("latin1", errors="ignore")
-                        if Config.DEBUG_PRINTS:
-                            print(f"Contenido decodificado de XObject {xobj_name}:")
-                            print(contenido_xobj[:100000])
-                        # Procesar y eliminar el texto del contenido del XObject
-                        nuevo_contenido_xobj = procesar_contenido(contenido_xobj)
-                        xobj.write(nuevo_contenido_xobj)
-                    except pikepdf.PdfError:
-                        if Config.DEBUG_PRINTS:
-                            print(f"No se pudo leer el contenido de XObject {xobj_name}, posiblemente codificado.")
-
     # Procesar cada página del PDF
     for i, page in enumerate(pdf.pages):
         if Config.DEBUG_PRINTS:
             print(f"Pagina {i+1}")
-        if "/Contents" not in page:
-            continue  # Ignorar páginas sin contenido
-
-        contenido_obj = page["/Contents"]
-        # Si es un array, concatenar todos los flujos; de lo contrario, leer el flujo único
-        if isinstance(contenido_obj, pikepdf.Array):
-            contenido_completo = b"".join(p.read_bytes() for p in contenido_obj)
-        else:
-            contenido_completo = contenido_obj.read_bytes()
-
-        # Decodificar el contenido para poder procesarlo
-        contenido_decodificado = contenido_completo.decode("latin1", errors="ignore")
-        nuevo_contenido = procesar_contenido(contenido_decodificado)
-
-        # Reemplazar el contenido original con el contenido procesado
-        if isinstance(contenido_obj, pikepdf.Array):
-            for obj in contenido_obj:
-                obj.write(nuevo_contenido)
-        else:
-            contenido_obj.write(nuevo_contenido)
-
-        # Procesar el texto dentro de XObjects en la página
-        procesar_xobjects(page)
+        eliminar_texto_de_pagina(page)
 
     # Guardar el PDF modificado en la ruta larga para evitar problemas en Windows
     ruta_larga = convertir_a_ruta_larga(output_path)
@@ -179,10 +200,30 @@ def eliminar_texto_preciso(pdf_bytes, output_path):
     return pdf_bytes_sin_texto
 
 
+def eliminar_texto_pagina(pdf, page_idx):
+    """
+    Deriva bajo demanda la variante sin texto de una sola página.
+
+    La página se copia a un PDF nuevo de una página (el documento original no se modifica)
+    y se le elimina el texto, tanto del contenido como de sus XObjects.
+
+    :param pdf: Documento pikepdf abierto con el PDF original.
+    :param page_idx: Índice de la página (0-indexed).
+    :return: BytesIO con un PDF de una sola página sin texto.
+    """
+    pdf_pagina = InyectarXObjects.extract_single_page(pdf, page_idx)
+    eliminar_texto_de_pagina(pdf_pagina.pages[0])
+    pdf_bytes_sin_texto = io.BytesIO()
+    pdf_pagina.save(pdf_bytes_sin_texto)
+    pdf_pagina.close()
+    pdf_bytes_sin_texto.seek(0)
+    return pdf_bytes_sin_texto
+
+
 # =============================================================================
 # 2. FUNCION PARA RECORTAR TABLAS Y GUARDAR COMO IMAGEN DE ALTA CALIDAD
 # =============================================================================
-def crop_and_save_image(original_pdf, page_number, coords, output_path, tabla_actual, lista_tablas):
+def recortar_tabla(original_pdf, page_number, coords, output_path):
     """
     Recorta una tabla de la página indicada del PDF y la guarda como imagen PNG de alta calidad.
 
@@ -193,9 +234,6 @@ def crop_and_save_image(original_pdf, page_number, coords, output_path, tabla_ac
     :param page_number: Índice de la página (0-indexed) donde se encuentra la tabla.
     :param coords: Tuple (left, top, right, bottom) que delimita la región de la tabla.
     :param output_path: Ruta para guardar la imagen resultante.
-    :param tabla_actual: Identificador o ruta para nombrar la tabla actual (para mostrar en la GUI).
-    :param lista_tablas: Lista en la que se acumulan las tablas procesadas para uso posterior.
-    :return: HTML generado a partir de la imagen (usando RtHTML.image_to_HTML).
     """
     left, top, right, bottom = coords
     # Ajustar el rectángulo con márgenes: se restan al inicio y se suman al final
@@ -216,6 +254,22 @@ def crop_and_save_image(original_pdf, page_number, coords, output_path, tabla_ac
     if Config.DEBUG_PRINTS:
         print(f"Imagen de tabla guardada en: {output_path}")
 
+
+def crop_and_save_image(original_pdf, page_number, coords, output_path, tabla_actual, lista_tablas):
+    """
+    Recorta una tabla de la página indicada del PDF, la guarda como imagen PNG (recortar_tabla)
+    y detecta su estructura.
+
+    :param original_pdf: Objeto PDF abierto (por ejemplo, mediante fitz).
+    :param page_number: Índice de la página (0-indexed) donde se encuentra la tabla.
+    :param coords: Tuple (left, top, right, bottom) que delimita la región de la tabla.
+    :param output_path: Ruta para guardar la imagen resultante.
+    :param tabla_actual: Identificador o ruta para nombrar la tabla actual (para mostrar en la GUI).
+    :param lista_tablas: Lista en la que se acumulan las tablas procesadas para uso posterior.
+    :return: HTML generado a partir de la imagen (usando RtHTML.image_to_HTML).
+    """
+    recortar_tabla(original_pdf, page_number, coords, output_path)
+
     # Convertir la imagen a HTML para su visualización en una interfaz (por ejemplo, PyQt)
     return RtHTML.image_to_HTML(output_path, tabla_actual)
 
@@ -230,9 +284,10 @@ def convertir_coordenadas_imagen_a_pdf(coordenadas_celdas, x0, top, x1, bottom,
 
     Se toma el área original del PDF (x0, top, x1, bottom), se le agregan márgenes,
     y se calcula un factor de escala basado en las dimensiones de la imagen recortada.
-    Luego se mapean las coordenadas de las celdas (en la imagen) a coordenadas en el PDF.
+    Luego se mapean todas las coordenadas de las celdas (en la imagen) a coordenadas en el PDF
+    con una sola transformación afín vectorizada.
 
-    :param coordenadas_celdas: Lista de tuplas (id_celda, x, y, w, h) en la escala de la imagen.
+    :param coordenadas_celdas: Celdas (ModeloCeldas.Celdas o lista de tuplas (id_celda, x, y, w, h)) en la escala de la imagen.
     :param x0: Coordenada X inicial del área en el PDF.
     :param top: Coordenada Y superior del área en el PDF.
     :param x1: Coordenada X final del área en el PDF.
@@ -243,7 +298,8 @@ def convertir_coordenadas_imagen_a_pdf(coordenadas_celdas, x0, top, x1, bottom,
     :param right_margin: Margen a sumar en el lado derecho.
     :param bottom_margin: Margen a sumar en el lado inferior.
     :return: Tuple de:
-             - coordenadas_ajustadas: Lista de tuplas (id_celda, x_pdf, y_pdf, w_pdf, h_pdf).
+             - coordenadas_ajustadas: Celdas (ModeloCeldas.Celdas) en coordenadas del PDF; se recorren como
+               tuplas (id_celda, x_pdf, y_pdf, w_pdf, h_pdf).
              - effective_pdf_rect: Tuple (pdf_left, pdf_top, pdf_right, pdf_bottom) que define el área total mapeada.
     """
     # Se asume que la imagen recortada inicia en (0, 0); se extraen las dimensiones de la imagen.
@@ -267,16 +323,11 @@ def convertir_coordenadas_imagen_a_pdf(coordenadas_celdas, x0, top, x1, bottom,
         print("Scale factors:", scale_x, scale_y)
         print("Effective PDF rect:", pdf_left, pdf_top, pdf_right, pdf_bottom)
 
-    # Transformar cada conjunto de coordenadas de celda a la escala del PDF
-    coordenadas_ajustadas = []
-    for id_celda, x, y, w, h in coordenadas_celdas:
-        x_pdf = pdf_left + x * scale_x
-        y_pdf = pdf_top + y * scale_y
-        w_pdf = w * scale_x
-        h_pdf = h * scale_y
-        if Config.DEBUG_PRINTS:
+    # Transformar todas las coordenadas de celda a la escala del PDF
+    coordenadas_ajustadas = mc.como_celdas(coordenadas_celdas).transformar(scale_x, scale_y, pdf_left, pdf_top)
+    if Config.DEBUG_PRINTS:
+        for id_celda, x_pdf, y_pdf, w_pdf, h_pdf in coordenadas_ajustadas:
             print(f"Celda {id_celda} -> x: {x_pdf}, y: {y_pdf}, ancho: {w_pdf}, alto: {h_pdf}")
-        coordenadas_ajustadas.append((id_celda, x_pdf, y_pdf, w_pdf, h_pdf))
 
     effective_pdf_rect = (pdf_left, pdf_top, pdf_right, pdf_bottom)
     return coordenadas_ajustadas, effective_pdf_rect
@@ -296,25 +347,25 @@ def asignar_texto_a_estructura(tabla_estructura, coordenadas_celdas_convertidas,
     :param textos_pdf: Lista de tuplas (texto, x_texto, y_texto) con las posiciones extraídas.
     :return: Tabla estructurada con el contenido asignado a cada celda.
     """
+    celdas = mc.como_celdas(coordenadas_celdas_convertidas)
+
     # Diccionario para acumular los textos asignados por id de celda
-    contenido_por_celda = {id_celda: [] for id_celda, _, _, _, _ in coordenadas_celdas_convertidas}
-
-    # Recorrer cada fragmento de texto y determinar a qué celda pertenece
-    for texto, x_texto, y_texto in textos_pdf:
-        for id_celda, x_original, y_original, w_original, h_original in coordenadas_celdas_convertidas:
-            # Calcular límites del bounding box
-            x_min, x_max = x_original, x_original + w_original
-            y_min, y_max = y_original, y_original + h_original
-            # Verificar si el centro del texto cae dentro del bounding box de la celda
-            if x_min <= x_texto <= x_max and y_min <= y_texto <= y_max:
-                contenido_por_celda[id_celda].append((y_texto, x_texto, texto))
-                break
-
-    # Ordenar los textos de cada celda primero por su coordenada Y, luego por X
+    contenido_por_celda = {id_celda: [] for id_celda in celdas.ids.tolist()}
+
+    # Determinar a qué celda pertenece cada fragmento de texto (todos a la vez, con el índice de celdas)
+    textos = [texto for texto, _, _ in textos_pdf]
+    x_textos = [x_texto for _, x_texto, _ in textos_pdf]
+    y_textos = [y_texto for _, _, y_texto in textos_pdf]
+    posiciones, encontrados = celdas.buscar(x_textos, y_textos)
+
+    # Ordenar los textos de cada celda primero por su coordenada Y, luego por X (un solo ordenamiento global)
+    orden, ids = celdas.agrupar(posiciones, encontrados, y_textos, x_textos)
+    for k, id_celda in zip(orden.tolist(), ids.tolist()):
+        contenido_por_celda[id_celda].append(textos[k])
+
+    # Combinar los textos en una única cadena
     for id_celda in contenido_por_celda:
-        contenido_por_celda[id_celda].sort(key=lambda t: (t[0], t[1]))
-        # Combinar los textos en una única cadena
-        contenido_por_celda[id_celda] = " ".join(txt for _, _, txt in contenido_por_celda[id_celda]).strip()
+        contenido_por_celda[id_celda] = " ".join(contenido_por_celda[id_celda]).strip()
 
     # Asignar el contenido combinado a cada celda en la estructura
     for fila in tabla_estructura:
@@ -337,28 +388,30 @@ def asignar_texto_a_estructura_new(tabla_estructura, coordenadas_celdas_converti
     y luego se concatenan para formar el contenido de cada celda.
 
     :param tabla_estructura: Estructura de la tabla en formato lista de listas.
-    :param coordenadas_celdas_convertidas: Lista de tuplas (id_celda, x_pdf, y_pdf, w_pdf, h_pdf).
+    :param coordenadas_celdas_convertidas: Celdas en coordenadas del PDF (ModeloCeldas.Celdas o lista de
+                                           tuplas (id_celda, x_pdf, y_pdf, w_pdf, h_pdf)).
     :param palabras_pdf: Lista de diccionarios, cada uno con claves 'text', 'x0', 'x1', 'top', 'bottom'.
     :return: Tabla actualizada con el contenido textual asignado a cada celda.
     """
+    celdas = mc.como_celdas(coordenadas_celdas_convertidas)
+    ids_celdas = celdas.ids.tolist()
+
     # Inicializar el diccionario para acumular palabras por celda
-    contenido_por_celda = {id_celda: [] for id_celda, _, _, _, _ in coordenadas_celdas_convertidas}
+    contenido_por_celda = {id_celda: [] for id_celda in ids_celdas}
 
     # Asignar cada palabra a la celda cuyo bounding box la contenga, usando el centro de la palabra
-    for w in palabras_pdf:
-        x_center = (w['x0'] + w['x1']) / 2
-        y_center = (w['top'] + w['bottom']) / 2
-        texto = w['text']
-        for id_celda, x_original, y_original, w_original, h_original in coordenadas_celdas_convertidas:
-            x_min, x_max = x_original, x_original + w_original
-            y_min, y_max = y_original, y_original + h_original
-            if x_min <= x_center <= x_max and y_min <= y_center <= y_max:
-                contenido_por_celda[id_celda].append((y_center, x_center, texto))
-                break
+    # (todas las palabras se buscan a la vez con el índice de celdas)
+    centros_x = [(w['x0'] + w['x1']) / 2 for w in palabras_pdf]
+    centros_y = [(w['top'] + w['bottom']) / 2 for w in palabras_pdf]
+    posiciones, encontradas = celdas.buscar(centros_x, centros_y)
+
+    # Ordenar las palabras por celda y, dentro de cada celda, por Y y luego X (un solo ordenamiento global)
+    orden, ids = celdas.agrupar(posiciones, encontradas, centros_y, centros_x)
+    for k, id_celda in zip(orden.tolist(), ids.tolist()):
+        contenido_por_celda[id_celda].append((centros_y[k], centros_x[k], palabras_pdf[k]['text']))
 
     # Agrupar palabras en líneas, considerando una tolerancia vertical
     for id_celda in contenido_por_celda:
-        contenido_por_celda[id_celda].sort(key=lambda t: (t[0], t[1]))
         tolerancia = 5  # Tolerancia en píxeles para agrupar palabras en la misma línea
         grupos = []
         grupo_actual = []
@@ -395,6 +448,40 @@ def asignar_texto_a_estructura_new(tabla_estructura, coordenadas_celdas_converti
 # =============================================================================
 # 4. FUNCION PRINCIPAL: OBTENER TABLAS USANDO EL PDF ORIGINAL
 # =============================================================================
+def imprimir_contenido_tabla(table):
+    """
+    Imprime en consola el contenido que pdfplumber extrae de la tabla (encabezados y celdas con sus recuadros).
+
+    :param table: Tabla de pdfplumber.
+    """
+    data = table.extract()
+    if not data:
+        print("    (Tabla vacía o sin contenido extraído)")
+        return
+    headers = data[0]
+    rows = data[1:] if len(data) > 1 else []
+    print("    Contenido de la tabla:\n", tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+    for col_idx, header_text in enumerate(headers):
+        if col_idx < len(table.rows[0].cells):
+            header_cell = table.rows[0].cells[col_idx]
+            if header_cell is None:
+                continue
+            cell_x0, cell_top, cell_x1, cell_bottom = header_cell
+            print(f"    - Encabezado ({col_idx}) | BBox: ({cell_x0:.2f}, {cell_top:.2f}) - ({cell_x1:.2f}, {cell_bottom:.2f})")
+            print(f"      - Contenido: {header_text}")
+    for row_idx, row_data in enumerate(rows):
+        for col_idx, texto_celda in enumerate(row_data):
+            try:
+                cell = table.rows[row_idx + 1].cells[col_idx]
+            except IndexError:
+                continue
+            if cell is None:
+                continue
+            cell_x0, cell_top, cell_x1, cell_bottom = cell
+            print(f"      Celda ({row_idx+1}, {col_idx}) | BBox: ({cell_x0:.2f}, {cell_top:.2f}) - ({cell_x1:.2f}, {cell_bottom:.2f})")
+            print(f"        - Contenido: {texto_celda if texto_celda is not None else ''}")
+
+
 def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev, bnext, pdf_xobjects, come_from):
     """
     Función principal para visualizar y procesar las tablas detectadas en un PDF.
@@ -412,26 +499,26 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
     :param ax: Objeto eje de Matplotlib.
     :param bprev: Botón para navegar a la página anterior.
     :param bnext: Botón para navegar a la página siguiente.
-    :param pdf_xobjects: PDF modificado con XObjects (resultado del módulo InyectarXObjects).
+    :param pdf_xobjects: PDF modificado con XObjects (resultado del módulo InyectarXObjects), o None para
+                         derivar la variante con XObjects por página, solo cuando se necesita.
     :param come_from: Flag para controlar comportamientos particulares (p.ej., modo depuración).
     """
-    # Preparar el PDF con XObjects
-    pdf_bytes_xobjects = io.BytesIO()
-    pdf_xobjects.save(pdf_bytes_xobjects)
-    pdf_xobjects.close()
-    pdf_bytes_xobjects.seek(0)
-    pdf_copy_xobjects = io.BytesIO(pdf_bytes_xobjects.getvalue())
-    pdf_modificado_xobjects = pdfplumber.open(pdf_copy_xobjects)
-
-    # Preparar un PDF sin texto para recortes (esto facilita la detección de tablas)
+    # Preparar el PDF con XObjects (solo si se entrega ya procesado; si no, se deriva por página)
+    pdf_modificado_xobjects = None
+    if pdf_xobjects is not None:
+        pdf_bytes_xobjects = io.BytesIO()
+        pdf_xobjects.save(pdf_bytes_xobjects)
+        pdf_xobjects.close()
+        pdf_bytes_xobjects.seek(0)
+        pdf_copy_xobjects = io.BytesIO(pdf_bytes_xobjects.getvalue())
+        pdf_modificado_xobjects = pdfplumber.open(pdf_copy_xobjects)
+
+    # Abrir el PDF original; las variantes sin texto y con XObjects se derivan de él bajo demanda
     pdf_bytes.seek(0)
     pdf_copy = io.BytesIO(pdf_bytes.getvalue())
-    pdf_sin_texto_path = os.path.join(folder_path, "documento_temporal_sin_texto.pdf")
-    pdf_bytes_sin_texto = eliminar_texto_preciso(pdf_bytes, pdf_sin_texto_path)
-
-    # Abrir el PDF original y el PDF sin texto
     pdf_original = pdfplumber.open(pdf_copy)
-    pdf_sin_texto = fitz.open(stream=pdf_bytes_sin_texto, filetype="pdf")
+    pdf_pikepdf = pikepdf.open(io.BytesIO(pdf_bytes.getvalue()))
+    PerfilEjecucion.reiniciar()
     total_pages = len(pdf_original.pages)
     
     if Config.DEBUG_PRINTS:
@@ -443,30 +530,164 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
     plt.subplots_adjust(bottom=0.15)
 
     lista_tablas = []   # Almacena las tablas generadas para uso posterior
-    crop_data = []      # Almacena datos de recorte de cada tabla
+    resultados_paginas = {}  # Resultado de la etapa de tablas por índice de página (una entrada por página)
+    tablas_markdown = {}  # Markdown de cada tabla por llave única, para reemplazarlo en el Markdown del documento
+    persistencia_tablas = PersistenciaTablasHTML.PersistenciaTablas(folder_path)  # HTML de las tablas, en un hilo aparte
+    buscador_con_presupuesto = LocalizarTablasRaster.BuscadorConPresupuesto(pdf_bytes.getvalue())
+    paginas_xobjects = {}   # Caché: índice -> página de pdfplumber con XObjects inyectados (None si no aplica)
+    paginas_sin_texto = {}  # Caché: índice -> documento fitz de una página sin texto
+    paginas_fuera_de_presupuesto = set()  # Páginas localizadas con el motor raster porque 'find_tables' superó el presupuesto
+
+    # Detección de celdas en paralelo: los recortes de todas las tablas del documento se encolan a medida
+    # que se generan y un grupo acotado de hilos ejecuta la cadena de OpenCV (que libera el GIL). Los
+    # resultados se completan en orden (página, tabla) antes de escribir las llaves. Las ventanas, los
+    # mensajes y los volcados de depuración necesitan el orden secuencial.
+    paralelo = (Config.HILOS_DETECCION_CELDAS > 1
+                and not (Config.DEBUG_PRINTS or Config.DEBUG_IMAGES or Config.DEPURACION_VOLCADO_DIR))
+    ejecutor = ThreadPoolExecutor(max_workers=Config.HILOS_DETECCION_CELDAS) if paralelo else None
+    paginas_pendientes = {}  # Índice -> (clave de caché, resultado, tablas pendientes), en orden de visita
+
+    def obtener_pagina_xobjects(page_idx):
+        """
+        Devuelve la variante con XObjects inyectados de la página, derivándola la primera vez que se pide.
 
-    def display_page(page_idx):
+        :param page_idx: Índice de la página.
+        :return: Página de pdfplumber, o None si la página no tiene XObjects de formulario.
         """
-        Muestra la página del PDF indicada, detecta las tablas presentes,
-        dibuja recuadros alrededor de ellas y procesa los contenidos.
+        if pdf_modificado_xobjects:
+            return pdf_modificado_xobjects.pages[page_idx]
+        if page_idx not in paginas_xobjects:
+            pagina_bytes = InyectarXObjects.inline_xobjects_single_page(pdf_pikepdf, page_idx)
+            paginas_xobjects[page_idx] = pdfplumber.open(pagina_bytes).pages[0] if pagina_bytes else None
+        return paginas_xobjects[page_idx]
+
+    def obtener_pagina_sin_texto(page_idx):
+        """
+        Devuelve la variante sin texto de la página (para los recortes), derivándola la primera vez que se pide.
 
-        :param page_idx: Índice de la página a mostrar.
+        :param page_idx: Índice de la página.
+        :return: Documento fitz de una sola página sin texto.
         """
-        ax.clear()
-        ax.axis("off")
-        page = pdf_original.pages[page_idx]
-        # Usar XObjects si están disponibles para mejorar detección
-        page_xobjects = pdf_modificado_xobjects.pages[page_idx] if pdf_modificado_xobjects else pdf_original.pages[page_idx]
-        
-        # Convertir la página en una imagen para visualizarla
-        page_image = page.to_image(resolution=72)
-        pil_img = page_image.original
-        img_array = np.array(pil_img)
-        ax.imshow(img_array)
+        if page_idx not in paginas_sin_texto:
+            paginas_sin_texto[page_idx] = fitz.open(stream=eliminar_texto_pagina(pdf_pikepdf, page_idx), filetype="pdf")
+        return paginas_sin_texto[page_idx]
+
+    def completar_tabla(resultado, tabla_pendiente):
+        """
+        Termina el procesamiento de una tabla: convierte las celdas a coordenadas del PDF, asigna el
+        texto y agrega la tabla a las procesadas del resultado de su página.
+
+        :param resultado: Diccionario del resultado de la página (ver detectar_tablas_pagina).
+        :param tabla_pendiente: Diccionario con el índice, bbox, ruta de la tabla, palabras y la tabla
+                                vectorial o el resultado de la detección raster (o su futuro).
+        """
+        x0, top, x1, bottom = tabla_pendiente["bbox"]
+        tabla_actual = tabla_pendiente["tabla_actual"]
+        effective_pdf_rect = None
+        if tabla_pendiente["vectorial"] is not None:
+            # Las celdas vectoriales ya están en coordenadas del PDF
+            tabla_generada, coordenadas_celdas_convertidas = tabla_pendiente["vectorial"]
+        else:
+            deteccion = tabla_pendiente["deteccion"]
+            if tabla_pendiente["ruta_imagen"] is not None:
+                # Detección en paralelo: esperar al hilo y eliminar el recorte temporal
+                deteccion = deteccion.result()
+                os.remove(tabla_pendiente["ruta_imagen"])
+            (tabla_generada, coordenadas_celdas, centros_celdas, image_width,
+             image_height, dimensiones_tabla) = deteccion
+            coordenadas_celdas_convertidas = []
+            # Si se detectaron celdas, convertir sus coordenadas a la escala del PDF
+            if len(coordenadas_celdas) > 0:
+                dimensiones_imagen = (0, 0, image_width, image_height)
+                (coordenadas_celdas_convertidas, effective_pdf_rect) = convertir_coordenadas_imagen_a_pdf(
+                    coordenadas_celdas, x0, top, x1, bottom, dimensiones_imagen,
+                    left_margin=3, top_margin=5, right_margin=4, bottom_margin=4
+                )
+                if Config.DEBUG_PRINTS:
+                    print("effective_pdf_rect", effective_pdf_rect)
+                if Config.DEBUG_PRINTS:
+                    print("Centros de celdas:", centros_celdas)
+                    print("Centros convertidos:", coordenadas_celdas_convertidas)
+        if Config.DEBUG_PRINTS:
+            RtHTML.mostrar_html_pyqt(tabla_generada, tabla_actual)
+        if len(coordenadas_celdas_convertidas) > 0:
+            # Asignar el texto a cada celda usando la variante nueva
+            nueva_estructura_tabla = asignar_texto_a_estructura_new(tabla_generada, coordenadas_celdas_convertidas, tabla_pendiente["palabras"])
+            if Config.DEBUG_PRINTS:
+                print("Nueva estructura generada:", nueva_estructura_tabla)
+                RtHTML.mostrar_html_pyqt(nueva_estructura_tabla, tabla_actual)
+            resultado["procesadas"].append({
+                "indice": tabla_pendiente["indice"],
+                "bbox": [x0, top, x1, bottom],
+                "rect_efectivo": list(effective_pdf_rect) if effective_pdf_rect else None,
+                "celdas": [list(celda) for celda in coordenadas_celdas_convertidas],
+                "estructura": nueva_estructura_tabla
+            })
+
+    def detectar_tablas_pagina(page_idx, page):
+        """
+        Detecta las tablas de la página, reconstruye sus celdas y les asigna el texto.
+
+        El resultado es serializable en JSON para poder guardarlo en la caché de tablas. En modo
+        paralelo, la detección raster de celdas de cada tabla queda encolada y la tabla se completa
+        después con completar_tabla.
+
+        :param page_idx: Índice de la página.
+        :param page: Página de pdfplumber del PDF original.
+        :return: Tuple (resultado, pendientes). El resultado es un diccionario con los recuadros de las tablas
+                 ("tablas"), si la página se procesa ("procesar") y las tablas procesadas ("procesadas"), cada una
+                 con su índice, bbox, rectángulo efectivo, celdas en coordenadas del PDF y estructura con el texto
+                 asignado. 'pendientes' es la lista de tablas que faltan por completar (vacía sin modo paralelo).
+        """
+        # Prefiltro: una página sin segmentos horizontales y verticales suficientes no puede tener una tabla
+        # En modo "auto" el prefiltro cuenta todos los segmentos, y el conteo se reutiliza para elegir el motor
+        candidata = True
+        horizontales = verticales = None
+        if Config.PREFILTRO_TABLAS:
+            inicio_prefiltro = time.perf_counter()
+            candidata, horizontales, verticales = PrefiltroDeTablas.pagina_puede_tener_tablas(
+                pdf_pikepdf.pages[page_idx], contar_todos=Config.MOTOR_LOCALIZACION_TABLAS == "auto")
+            segundos_prefiltro = time.perf_counter() - inicio_prefiltro
+            PerfilEjecucion.acumular("prefiltro_tablas", segundos_prefiltro)
+            PerfilEjecucion.registrar("prefiltro_tablas", pagina=page_idx + 1, candidata=candidata,
+                                      horizontales=horizontales, verticales=verticales,
+                                      segundos=round(segundos_prefiltro, 6))
 
         # Detectar tablas en la página mediante ambos métodos
-        tables = page.find_tables()
-        xtables = page_xobjects.find_tables()
+        tables = []
+        xtables = []
+        if candidata:
+            # Elegir el motor de localización (pdfplumber o raster) para la página
+            motor, segmentos = LocalizarTablasRaster.elegir_motor(pdf_pikepdf.pages[page_idx], horizontales, verticales)
+            if motor == "pdfplumber":
+                with PerfilEjecucion.medir("find_tables"):
+                    if Config.MOTOR_LOCALIZACION_TABLAS == "auto":
+                        recuadros = buscador_con_presupuesto.buscar_tablas(page, page_idx, Config.PRESUPUESTO_FIND_TABLES_S)
+                        if recuadros is None:
+                            motor = "raster"
+                            paginas_fuera_de_presupuesto.add(page_idx)
+                        else:
+                            # El proceso de búsqueda solo devuelve los recuadros: las tablas se asocian a la página
+                            tables = [LocalizarTablasRaster.TablaLocalizada(page, bbox) for bbox in recuadros]
+                    else:
+                        tables = page.find_tables()
+            if motor == "raster":
+                # La variante sin texto incluye el contenido de los XObjects, por lo que no se busca en ellos aparte
+                with PerfilEjecucion.medir("localizacion_raster"):
+                    tables = [LocalizarTablasRaster.TablaLocalizada(page, bbox)
+                              for bbox in LocalizarTablasRaster.localizar_tablas_raster(obtener_pagina_sin_texto(page_idx)[0])]
+            else:
+                # Usar XObjects si están disponibles para mejorar detección. La variante solo se deriva para páginas
+                # que se procesan y que tienen XObjects de formulario; las demás no aportan tablas adicionales.
+                page_xobjects = None
+                if Config.MOVIL or page_idx >= 2:
+                    page_xobjects = obtener_pagina_xobjects(page_idx)
+                if page_xobjects:
+                    with PerfilEjecucion.medir("find_tables_xobjects"):
+                        xtables = page_xobjects.find_tables()
+            PerfilEjecucion.registrar("motor_localizacion", pagina=page_idx + 1, motor=motor, segmentos=segmentos)
+        elif Config.DEBUG_PRINTS:
+            print(f"Página {page_idx + 1}: el prefiltro descarta la presencia de tablas")
         tables = tables + xtables
         
         if Config.DEBUG_PRINTS:
@@ -494,6 +715,12 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
         filtered_tables = [table for idx, table in enumerate(tables) if idx not in contained_tables]
         tables = filtered_tables
 
+        resultado = {
+            "tablas": [list(table.bbox) for table in tables],  # Recuadros de todas las tablas (visualización)
+            "procesar": False,                                 # Si las tablas de la página se procesaron
+            "procesadas": []                                   # Tablas con celdas detectadas y texto asignado
+        }
+        pendientes = []
         if not tables:
             if Config.DEBUG_PRINTS:
                 print("  No se han encontrado tablas en esta página.")
@@ -501,126 +728,160 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
             if Config.DEBUG_PRINTS:
                 print(f" Página {page_idx}, se ignora")
         else:
-            path_tablas = os.path.join(folder_path, "tablas_html")
-            if not os.path.exists(path_tablas):
-                os.mkdir(path_tablas)
-                if Config.DEBUG_PRINTS:
-                    print(f"Carpeta '{path_tablas}' creada con éxito.")
-            else:
-                if Config.DEBUG_PRINTS:
-                    print(f"La carpeta '{path_tablas}' ya existe.")
+            resultado["procesar"] = True
+            # Las palabras de la página se extraen una sola vez para todas sus tablas
+            words = page.extract_words(x_tolerance=3, y_tolerance=1)
             # Procesar cada tabla encontrada
             for table_idx, table in enumerate(tables):
                 x0, top, x1, bottom = table.bbox
                 if Config.DEBUG_PRINTS:
                     print(f"  - Tabla {table_idx + 1} | BBox = ({x0:.2f}, {top:.2f}) - ({x1:.2f}, {bottom:.2f})")
                 
-                # Extraer la estructura de la tabla (encabezados y filas)
-                data = table.extract()
-                if not data:
-                    if Config.DEBUG_PRINTS:
-                        print("    (Tabla vacía o sin contenido extraído)")
-                else:
-                    headers = data[0]
-                    rows = data[1:] if len(data) > 1 else []
-                    tabla_formateada = tabulate(rows, headers=headers, tablefmt="fancy_grid")
-                    if Config.DEBUG_PRINTS:
-                        print("    Contenido de la tabla:\n", tabla_formateada)
-                    # Extraer palabras presentes en el área de la tabla
-                    words = page.extract_words(x_tolerance=3, y_tolerance=1)
-                    words_in_table = [
-                        w for w in words
-                        if w['x0'] >= x0 and w['top'] >= top and w['x1'] <= x1 and w['bottom'] <= bottom
-                    ]
-
-                # Procesar encabezados y celdas para asignar el texto extraído
-                textos_pdf = []
-                procesadas = {}
-                for col_idx, header_text in enumerate(headers):
-                    if col_idx < len(table.rows[0].cells):
-                        header_cell = table.rows[0].cells[col_idx]
-                        if header_cell is None:
-                            continue
-                        cell_x0, cell_top, cell_x1, cell_bottom = header_cell
-                        centro_x = (cell_x0 + cell_x1) / 2
-                        centro_y = (cell_top + cell_bottom) / 2
-                        if Config.DEBUG_PRINTS:
-                            print(f"    - Encabezado ({col_idx}) | BBox: ({cell_x0:.2f}, {cell_top:.2f}) - ({cell_x1:.2f}, {cell_bottom:.2f})")
-                            print(f"      - Contenido: {header_text}")
-                        if (0, col_idx) in procesadas:
-                            continue
-                        textos_pdf.append((header_text, centro_x, centro_y))
-                        procesadas[(0, col_idx)] = True
-
-                for row_idx, row_data in enumerate(data[1:]):  # Saltar la fila de encabezados
-                    for col_idx, texto_celda in enumerate(row_data):
-                        try:
-                            cell = table.rows[row_idx + 1].cells[col_idx]
-                        except IndexError:
-                            continue
-                        if cell is None:
-                            continue
-                        cell_x0, cell_top, cell_x1, cell_bottom = cell
-                        if texto_celda is None:
-                            texto_celda = ""
-                        if Config.DEBUG_PRINTS:
-                            print(f"      Celda ({row_idx+1}, {col_idx}) | BBox: ({cell_x0:.2f}, {cell_top:.2f}) - ({cell_x1:.2f}, {cell_bottom:.2f})")
-                            print(f"        - Contenido: {texto_celda}")
-                        if texto_celda.strip():
-                            centro_x = (cell_x0 + cell_x1) / 2
-                            centro_y = (cell_top + cell_bottom) / 2
-                            textos_pdf.append((texto_celda, centro_x, centro_y))
-
-                # Definir la ruta temporal para guardar la imagen de la tabla
-                output_img_path = os.path.join(folder_path, "imagenTemporal.png")
+                # Mostrar el contenido extraído por pdfplumber (las tablas del motor raster no tienen contenido)
+                if Config.DEBUG_PRINTS and hasattr(table, "extract"):
+                    imprimir_contenido_tabla(table)
+
+                # Extraer palabras presentes en el área de la tabla
+                words_in_table = [
+                    w for w in words
+                    if w['x0'] >= x0 and w['top'] >= top and w['x1'] <= x1 and w['bottom'] <= bottom
+                ]
+
+                # Definir la ruta de la tabla (identificador de sus archivos de salida)
                 tabla_actual = os.path.join(output_folder, f"tabla_{page_idx + 1}_{table_idx + 1}.png")
-                # Recortar la tabla y obtener datos: imagen generada, coordenadas, dimensiones, etc.
-                (tabla_generada, coordenadas_celdas, centros_celdas, image_width,
-                 image_height, dimensiones_tabla) = crop_and_save_image(pdf_sin_texto, page_idx, (x0, top, x1, bottom), output_img_path, tabla_actual, lista_tablas)
+
+                # Intentar reconstruir las celdas directamente desde la geometría vectorial de la página
+                tabla_vectorial = None
+                if Config.DETECCION_VECTORIAL:
+                    tabla_vectorial = DetectarCeldasVectoriales.generar_tabla_vectorial(table.page, table.bbox, tabla_actual)
+
+                tabla_pendiente = {
+                    "indice": table_idx,
+                    "bbox": [x0, top, x1, bottom],
+                    "tabla_actual": tabla_actual,
+                    "palabras": words_in_table,
+                    "vectorial": tabla_vectorial,
+                    "deteccion": None,
+                    "ruta_imagen": None
+                }
+                if tabla_vectorial is None:
+                    if paralelo:
+                        # Cada tabla encolada necesita su propio recorte temporal
+                        ruta_imagen = os.path.join(folder_path, f"imagenTemporal_{page_idx + 1}_{table_idx + 1}.png")
+                        recortar_tabla(obtener_pagina_sin_texto(page_idx), 0, (x0, top, x1, bottom), ruta_imagen)
+                        tabla_pendiente["deteccion"] = ejecutor.submit(RtHTML.image_to_HTML, ruta_imagen, tabla_actual)
+                        tabla_pendiente["ruta_imagen"] = ruta_imagen
+                    else:
+                        # Recortar la tabla y obtener datos: imagen generada, coordenadas, dimensiones, etc.
+                        output_img_path = os.path.join(folder_path, "imagenTemporal.png")
+                        tabla_pendiente["deteccion"] = crop_and_save_image(obtener_pagina_sin_texto(page_idx), 0, (x0, top, x1, bottom), output_img_path, tabla_actual, lista_tablas)
+
+                if paralelo:
+                    pendientes.append(tabla_pendiente)
+                else:
+                    completar_tabla(resultado, tabla_pendiente)
+
+        return resultado, pendientes
+
+
+    def registrar_resultado(page_idx, resultado, dibujar=True):
+        """
+        Dibuja el resultado de la etapa de tablas de la página, encola el guardado del HTML de cada tabla
+        (ver PersistenciaTablasHTML) y lo conserva para la escritura de llaves al final del proceso.
+
+        :param page_idx: Índice de la página.
+        :param resultado: Diccionario devuelto por detectar_tablas_pagina (o leído de la caché).
+        :param dibujar: Si es False no se dibujan los recuadros (la página ya no está en pantalla).
+        """
+        if resultado["procesar"] and persistencia_tablas.modo == "archivos":
+            path_tablas = persistencia_tablas.path_tablas
+            if not os.path.exists(path_tablas):
+                os.mkdir(path_tablas)
                 if Config.DEBUG_PRINTS:
-                    RtHTML.mostrar_html_pyqt(tabla_generada, tabla_actual)
-                # Si se detectaron celdas, convertir sus coordenadas a la escala del PDF
-                if len(coordenadas_celdas) > 0:
-                    dimensiones_imagen = (0, 0, image_width, image_height)
-                    (coordenadas_celdas_convertidas, effective_pdf_rect) = convertir_coordenadas_imagen_a_pdf(
-                        coordenadas_celdas, x0, top, x1, bottom, dimensiones_imagen,
-                        left_margin=3, top_margin=5, right_margin=4, bottom_margin=4
-                    )
-                    # Mostrar el rectángulo efectivo (en azul) sobre la imagen para depuración
-                    if Config.DEBUG_PRINTS:
-                        print("effective_pdf_rect", effective_pdf_rect)
-                    pdf_x0, pdf_y0, pdf_x1, pdf_y1 = effective_pdf_rect
-                    width_effective_pdf = pdf_x1 - pdf_x0
-                    height_effective_pdf = pdf_y1 - pdf_y0
-                    rect_effective = Rectangle((pdf_x0, pdf_y0), width_effective_pdf, height_effective_pdf,
-                                               edgecolor="blue", facecolor="none", linewidth=1.5)
-                    ax.add_patch(rect_effective)
-                    if Config.DEBUG_PRINTS:
-                        print("Centros de celdas:", centros_celdas)
-                        print("Centros convertidos:", coordenadas_celdas_convertidas)
-                    # Dibujar los recuadros de cada celda en verde
-                    for id_celda, x_original, y_original, w_original, h_original in coordenadas_celdas_convertidas:
-                        rect = Rectangle((x_original, y_original), w_original, h_original,
-                                         edgecolor="green", facecolor="none", linewidth=0.5)
-                        ax.add_patch(rect)
-                    # Asignar el texto a cada celda usando la variante nueva y guardar la estructura en HTML
-                    nueva_estructura_tabla = asignar_texto_a_estructura_new(tabla_generada, coordenadas_celdas_convertidas, words_in_table)
-                    if Config.DEBUG_PRINTS:
-                        print("Nueva estructura generada:", nueva_estructura_tabla)
-                    RtHTML.guardar_tabla(nueva_estructura_tabla, tabla_actual, folder_path, path_tablas)
-                    if Config.DEBUG_PRINTS:
-                        RtHTML.mostrar_html_pyqt(nueva_estructura_tabla, tabla_actual)
-                    lista_tablas.append(tabla_generada)
-                    # Agregar datos de recorte a crop_data para procesamiento posterior
-                    crop_data.append((page_idx, (table_idx, x0 - 3, top - 4, x1 + 6, bottom + 4)))
+                    print(f"Carpeta '{path_tablas}' creada con éxito.")
+            else:
+                if Config.DEBUG_PRINTS:
+                    print(f"La carpeta '{path_tablas}' ya existe.")
+
+        for tabla in resultado["procesadas"]:
+            # Mostrar el rectángulo efectivo (en azul) sobre la imagen para depuración
+            if dibujar and tabla["rect_efectivo"]:
+                pdf_x0, pdf_y0, pdf_x1, pdf_y1 = tabla["rect_efectivo"]
+                rect_effective = Rectangle((pdf_x0, pdf_y0), pdf_x1 - pdf_x0, pdf_y1 - pdf_y0,
+                                           edgecolor="blue", facecolor="none", linewidth=1.5)
+                ax.add_patch(rect_effective)
+            # Dibujar los recuadros de cada celda en verde
+            for id_celda, x_original, y_original, w_original, h_original in (tabla["celdas"] if dibujar else []):
+                rect = Rectangle((x_original, y_original), w_original, h_original,
+                                 edgecolor="green", facecolor="none", linewidth=0.5)
+                ax.add_patch(rect)
+            # Guardar la estructura en HTML (la escritura se hace en el hilo de persistencia)
+            tabla_actual = os.path.join(output_folder, f"tabla_{page_idx + 1}_{tabla['indice'] + 1}.png")
+            persistencia_tablas.guardar(tabla["estructura"], tabla_actual)
+            # Generar el Markdown de la tabla directamente desde la estructura (el HTML queda para revisión)
+            llave_tabla = f"Llave_Unica_Tabla_{page_idx + 1}_{tabla['indice'] + 1}"
+            tablas_markdown[llave_tabla] = RtMD.generar_markdown_tabla(tabla["estructura"])
+            if page_idx not in resultados_paginas:
+                lista_tablas.append(tabla["estructura"])
 
         # Dibujar un recuadro rojo para cada tabla detectada (para visualización)
-        for t in tables:
-            x0, top, x1, bottom = t.bbox
+        for x0, top, x1, bottom in (resultado["tablas"] if dibujar else []):
             rect_w, rect_h = x1 - x0, bottom - top
             rect = Rectangle((x0, top), rect_w, rect_h, edgecolor="red", facecolor="none", linewidth=2)
             ax.add_patch(rect)
 
+        # Al volver a una página, su resultado reemplaza al anterior en lugar de duplicarse
+        resultados_paginas[page_idx] = resultado
+
+    def display_page(page_idx):
+        """
+        Muestra la página del PDF indicada, detecta las tablas presentes,
+        dibuja recuadros alrededor de ellas y procesa los contenidos.
+
+        Si el resultado de la página está en la caché de tablas (misma página, misma versión del
+        detector y misma configuración), se reutiliza sin volver a detectar.
+
+        :param page_idx: Índice de la página a mostrar.
+        """
+        ax.clear()
+        ax.axis("off")
+        page = pdf_original.pages[page_idx]
+        
+        # Convertir la página en una imagen para visualizarla
+        page_image = page.to_image(resolution=72)
+        pil_img = page_image.original
+        img_array = np.array(pil_img)
+        ax.imshow(img_array)
+
+        clave = None
+        resultado = None
+        if Config.CACHE_TABLAS:
+            with PerfilEjecucion.medir("cache_tablas"):
+                clave = CacheTablas.clave_pagina(pdf_pikepdf.pages[page_idx], Config.MOVIL or page_idx >= 2)
+                resultado = CacheTablas.leer(clave)
+            PerfilEjecucion.registrar("cache_tablas", pagina=page_idx + 1, acierto=resultado is not None)
+        pendientes = []
+        if resultado is None:
+            paginas_fuera_de_presupuesto.discard(page_idx)
+            resultado, pendientes = detectar_tablas_pagina(page_idx, page)
+            if page_idx in paginas_fuera_de_presupuesto:
+                clave = None  # El resultado depende del tiempo de 'find_tables' en esta ejecución: no se guarda
+            if not paralelo:
+                CacheTablas.escribir(clave, resultado)
+        else:
+            clave = None  # El resultado ya está en la caché
+            if Config.DEBUG_PRINTS:
+                print(f"Página {page_idx + 1}: resultado de tablas tomado de la caché")
+
+        if paralelo:
+            # La página se registra al final, junto con las demás y en el mismo orden de visita
+            paginas_pendientes.pop(page_idx, None)
+            paginas_pendientes[page_idx] = (clave, resultado, pendientes)
+            for x0, top, x1, bottom in resultado["tablas"]:
+                ax.add_patch(Rectangle((x0, top), x1 - x0, bottom - top, edgecolor="red", facecolor="none", linewidth=2))
+        else:
+            registrar_resultado(page_idx, resultado)
+
         # Configurar límites del eje para que coincidan con las dimensiones de la página
         ax.set_xlim([0, page.width])
         ax.set_ylim([page.height, 0])
@@ -632,6 +893,19 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
             plt.show()
         fig.canvas.draw()
 
+    def completar_paginas_pendientes():
+        """
+        Espera la detección en paralelo de todas las tablas encoladas y registra las páginas en orden
+        de visita (y sus tablas en orden), igual que en el procesamiento secuencial.
+        """
+        for page_idx, (clave, resultado, pendientes) in paginas_pendientes.items():
+            for tabla_pendiente in pendientes:
+                completar_tabla(resultado, tabla_pendiente)
+            CacheTablas.escribir(clave, resultado)
+            registrar_resultado(page_idx, resultado, dibujar=False)
+        paginas_pendientes.clear()
+        ejecutor.shutdown()
+
     def next_page(event):
         """
         Callback para pasar a la siguiente página del PDF.
@@ -642,17 +916,31 @@ def show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev,
             display_page(current_page_idx)
         else:
             # Cuando se llega a la última página, se procesa el PDF final
+            if paralelo:
+                completar_paginas_pendientes()
+            # Las tablas están completas: el HTML se termina de escribir mientras continúa el proceso
+            persistencia_tablas.finalizar()
+            buscador_con_presupuesto.cerrar()
             pdf_bytes_llaves_tabla_escrita = pdf_bytes
+            # Datos de recorte de cada tabla procesada, en orden de página
+            crop_data = [
+                (p_idx, (tabla["indice"], x0 - 3, top - 4, x1 + 6, bottom + 4))
+                for p_idx in sorted(resultados_paginas)
+                for tabla in resultados_paginas[p_idx]["procesadas"]
+                for x0, top, x1, bottom in [tabla["bbox"]]
+            ]
             if len(crop_data) > 0:
                 pdf_bytes_llaves_tabla_escrita = EYELDT.eliminar_elementos_area(crop_data, pdf_bytes, folder_path)
-                crop_data.clear()
+                resultados_paginas.clear()
                 print("TABLAS OBTENIDAS CON ÉXITO.")
             print("INICIANDO LA OBTENCIÓN DE IMÁGENES.")
             Extraer_Imagenes.extraer_imagenes(pdf_bytes_llaves_tabla_escrita, folder_path)
             pdf_bytes_llaves_tabla_imagenes = EliminarYEscribirImagenes.eliminar_imagenes_y_agregar_llaves(pdf_bytes_llaves_tabla_escrita, folder_path)
-            string_tablas_remplazadas = PasarTextoPlanoAMarkdown.main(pdf_bytes_llaves_tabla_imagenes, folder_path)
             EnviarImagenesAChatGPT.enviar_Imagenes_A_GPT(os.path.join(folder_path, "imagenes_extraidas"))
-            RemplazarImagenesDeMarkdown.remplazar_imagenes_en_md(string_tablas_remplazadas, folder_path)
+            persistencia_tablas.esperar()
+            # Markdown página a página, con las tablas y los textos de las imágenes ya reemplazados
+            PasarTextoPlanoAMarkdown.main(pdf_bytes_llaves_tabla_imagenes, folder_path, tablas_markdown)
+            PerfilEjecucion.guardar(folder_path)
             print("PROCESO TERMINADO!")
             os.startfile(os.path.abspath(folder_path))
             exit()
@@ -690,7 +978,7 @@ def main(pdf_bytes, folder_path, fig, ax, bprev, bnext, pdf_xobjects, come_from=
     :param ax: Objeto eje de Matplotlib.
     :param bprev: Botón para ir a la página anterior.
     :param bnext: Botón para ir a la página siguiente.
-    :param pdf_xobjects: PDF con XObjects inyectados.
+    :param pdf_xobjects: PDF con XObjects inyectados, o None para derivarlos por página bajo demanda.
     :param come_from: Flag opcional para ajustar el comportamiento (por ejemplo, en depuración).
     """
     show_pdfplumber_tables_with_buttons(pdf_bytes, folder_path, fig, ax, bprev, bnext, pdf_xobjects, come_from)
@@ -724,8 +1012,7 @@ if __name__ == "__main__":
     3. Crea una carpeta de salida basada en el nombre del archivo PDF si no existe.
     4. Abre el PDF usando pdfplumber y lo convierte a un objeto BytesIO compatible con PyMuPDF.
     5. Configura la interfaz gráfica con botones "Anterior" y "Siguiente".
-    6. Llama al método InyectarXObjects.main para procesar el PDF.
-    7. Ejecuta la función `main` con todos los objetos inicializados.
+    6. Ejecuta la función `main` con todos los objetos inicializados.
     """
 
     if len(sys.argv) > 1:
@@ -765,9 +1052,6 @@ if __name__ == "__main__":
         bprev = Button(ax_prev, 'Anterior')
         bnext = Button(ax_next, 'Siguiente')
 
-        # Procesa el PDF usando una función externa para inyectar XObjects, guardando el resultado
-        pdf_xobjects = InyectarXObjects.main(pdf_bytes, folder_path)
-
-    # Llama a la función principal pasando todos los objetos necesarios
-    main(pdf_bytes, folder_path, fig, ax, bprev, bnext, pdf_xobjects)
+    # Llama a la función principal pasando todos los objetos necesarios; los XObjects se inyectan por página bajo demanda
+    main(pdf_bytes, folder_path, fig, ax, bprev, bnext, None)
 
@@ -0,0 +1,242 @@
+"""
+ExtraerTextoPyMuPDF.py
+
+Motor de extracción de texto por página basado en PyMuPDF (fitz), alternativo a pdfplumber
+(page.extract_text) para la etapa de Markdown (ver Config.MOTOR_TEXTO).
+
+El texto se arma a partir de los caracteres de page.get_text("rawdict") (bloques, líneas, spans y
+caracteres) con el mismo procedimiento que usa pdfplumber sin layout, para que limpiar_texto reciba
+la misma entrada:
+  - Los caracteres se agrupan en líneas por su borde superior (tolerancia de 3 puntos, agrupando
+    valores consecutivos) y se ordenan por X dentro de cada línea.
+  - Las palabras se separan en los espacios y cuando la distancia al carácter anterior supera la
+    tolerancia horizontal.
+  - Las palabras se vuelven a agrupar en líneas por su borde superior y se unen con espacios.
+El borde superior de cada carácter se calcula como lo hace pdfminer (origen, tamaño y descendente
+de la fuente), y las ligaduras se expanden igual que en pdfplumber.
+
+La negrilla se detecta con las banderas de fuente de cada span (fitz.TEXT_FONT_BOLD), en lugar de
+inferirla del nombre de la fuente con expresiones regulares como ObtenerTextoPlano.extraer_atributos_pikepdf.
+
+Las diferencias con pdfplumber se deben a la decodificación de las fuentes: PyMuPDF convierte glifos que
+pdfminer deja como "(cid:N)", y lee el texto de algunos XObjects de formulario que pdfminer omite.
+La función comparar_con_pdfplumber (y el bloque principal) mide la paridad y el rendimiento de ambos
+motores sobre un conjunto de PDFs.
+"""
+
+import difflib
+import sys
+import time
+
+import fitz  # PyMuPDF
+import pdfplumber
+from pdfplumber.utils.text import LIGATURES
+
+# Sin espacios sintéticos (solo los del PDF), sin recorte a la página (como pdfplumber) y con las
+# ligaduras como un solo carácter
+FLAGS_TEXTO = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_INHIBIT_SPACES
+
+
+def caracteres_pagina(page):
+    """
+    Obtiene los caracteres de la página con la geometría que usa pdfplumber.
+
+    :param page: Página de PyMuPDF.
+    :return: Lista de tuplas (texto, x0, x1, top, vertical, negrilla), en el orden del flujo de contenido.
+    """
+    caracteres = []
+    for bloque in page.get_text("rawdict", flags=FLAGS_TEXTO)["blocks"]:
+        if bloque["type"] != 0:
+            continue
+        for linea in bloque["lines"]:
+            dir_x, dir_y = linea["dir"]
+            vertical = not (dir_x > 0 and abs(dir_y) < 1e-6)
+            for span in linea["spans"]:
+                negrilla = bool(span["flags"] & fitz.TEXT_FONT_BOLD)
+                # Altura de la caja según pdfminer: desde el descendente hasta un tamaño de fuente por encima
+                alto = span["size"] * (1 + span["descender"])
+                x_anterior = None
+                for caracter in span["chars"]:
+                    x0, _, x1, _ = caracter["bbox"]
+                    # Los glifos de varios caracteres (ligaduras) se reparten el ancho y el último puede quedar
+                    # una fracción antes del siguiente glifo; se mantiene el orden del span
+                    if x_anterior is not None and x_anterior - 0.5 < x0 < x_anterior:
+                        x0 = x_anterior
+                    x_anterior = x0
+                    caracteres.append((caracter["c"], x0, x1, caracter["origin"][1] - alto, vertical, negrilla))
+    return caracteres
+
+
+def agrupar(valores, tolerancia):
+    """
+    Agrupa valores cercanos como pdfplumber (cluster_list): los valores ordenados se separan en un nuevo
+    grupo cuando la diferencia con el anterior supera la tolerancia.
+
+    :param valores: Iterable de números.
+    :param tolerancia: Diferencia máxima entre valores consecutivos del mismo grupo.
+    :return: Diccionario {valor: número de grupo}, con los grupos numerados en orden creciente.
+    """
+    grupos = {}
+    grupo = -1
+    anterior = None
+    for valor in sorted(set(valores)):
+        if anterior is None or valor - anterior > tolerancia:
+            grupo += 1
+        grupos[valor] = grupo
+        anterior = valor
+    return grupos
+
+
+def palabras_pagina(page, x_tolerancia=3, y_tolerancia=3):
+    """
+    Agrupa los caracteres de la página en palabras, recorriendo las líneas de arriba hacia abajo.
+
+    :param page: Página de PyMuPDF.
+    :param x_tolerancia: Distancia horizontal máxima entre caracteres de una misma palabra.
+    :param y_tolerancia: Tolerancia vertical para agrupar caracteres en líneas.
+    :return: Lista de tuplas (texto, top, negrilla) de cada palabra; negrilla es True si todos sus
+             caracteres están en negrilla.
+    """
+    caracteres = caracteres_pagina(page)
+
+    # Como pdfplumber, se procesan por separado los tramos consecutivos de texto horizontal y vertical
+    tramos = []
+    for caracter in caracteres:
+        if tramos and tramos[-1][0] == caracter[4]:
+            tramos[-1][1].append(caracter)
+        else:
+            tramos.append((caracter[4], [caracter]))
+
+    palabras = []
+    for vertical, tramo in tramos:
+        # Texto horizontal: líneas por borde superior, orden por X; texto vertical: líneas por X, orden por Y
+        clave_linea = 1 if vertical else 3
+        clave_orden = 3 if vertical else 1
+        grupos = agrupar((caracter[clave_linea] for caracter in tramo), x_tolerancia if vertical else y_tolerancia)
+        lineas = {}
+        for caracter in tramo:
+            lineas.setdefault(grupos[caracter[clave_linea]], []).append(caracter)
+
+        for grupo in sorted(lineas):
+            palabra = []
+            for caracter in sorted(lineas[grupo], key=lambda c: (c[clave_orden], c[2])):
+                if caracter[0].isspace():
+                    if palabra:
+                        palabras.append(palabra)
+                    palabra = []
+                elif palabra and not vertical and (
+                        caracter[1] < palabra[-1][1]
+                        or caracter[1] > palabra[-1][2] + x_tolerancia
+                        or caracter[3] > palabra[-1][3] + y_tolerancia):
+                    palabras.append(palabra)
+                    palabra = [caracter]
+                elif palabra and vertical and (
+                        caracter[3] < palabra[-1][3]
+                        or caracter[3] > palabra[-1][3] + y_tolerancia * 4
+                        or caracter[1] > palabra[-1][1] + x_tolerancia):
+                    palabras.append(palabra)
+                    palabra = [caracter]
+                else:
+                    palabra.append(caracter)
+            if palabra:
+                palabras.append(palabra)
+
+    return [
+        ("".join(c[0] for c in palabra), min(c[3] for c in palabra), all(c[5] for c in palabra))
+        for palabra in palabras
+    ]
+
+
+def texto_pagina(page, marcar_negrilla=False, y_tolerancia=3):
+    """
+    Extrae el texto de una página con el mismo formato que pdfplumber (page.extract_text()).
+
+    :param page: Página de PyMuPDF.
+    :param marcar_negrilla: Si es True, los tramos de palabras en negrilla se encierran en '**' (Markdown).
+    :param y_tolerancia: Tolerancia vertical para agrupar las palabras en líneas.
+    :return: Texto de la página, con las líneas separadas por '\\n' (cadena vacía si no tiene texto).
+    """
+    palabras = palabras_pagina(page, y_tolerancia=y_tolerancia)
+    grupos = agrupar((top for _, top, _ in palabras), y_tolerancia)
+    lineas = {}
+    for palabra in palabras:
+        lineas.setdefault(grupos[palabra[1]], []).append(palabra)
+
+    textos_lineas = []
+    for grupo in sorted(lineas):
+        partes = []
+        en_negrilla = False
+        for texto, _, negrilla in lineas[grupo]:
+            if marcar_negrilla and negrilla != en_negrilla:
+                if negrilla:
+                    texto = "**" + texto
+                else:
+                    partes[-1] += "**"
+                en_negrilla = negrilla
+            partes.append(texto)
+        if en_negrilla:
+            partes[-1] += "**"
+        textos_lineas.append(" ".join(partes))
+
+    texto = "\n".join(textos_lineas)
+    for ligadura, expansion in LIGATURES.items():
+        texto = texto.replace(ligadura, expansion)
+    return texto
+
+
+def comparar_con_pdfplumber(rutas_pdf, max_paginas=None):
+    """
+    Compara el texto y el tiempo de extracción de este motor con pdfplumber sobre un conjunto de PDFs.
+
+    :param rutas_pdf: Lista de rutas de PDFs.
+    :param max_paginas: Número máximo de páginas por PDF (None para todas).
+    :return: Diccionario con el número de páginas, las páginas con texto idéntico, la similitud media
+             (difflib) y los segundos de cada motor, además de las páginas distintas (ruta, página, similitud).
+    """
+    paginas = iguales = 0
+    similitud_total = 0.0
+    segundos_pdfplumber = segundos_pymupdf = 0.0
+    distintas = []
+    for ruta in rutas_pdf:
+        with pdfplumber.open(ruta) as pdf, fitz.open(ruta) as documento:
+            for indice, pagina_pdfplumber in enumerate(pdf.pages[:max_paginas]):
+                inicio = time.perf_counter()
+                esperado = pagina_pdfplumber.extract_text() or ""
+                pagina_pdfplumber.close()
+                medio = time.perf_counter()
+                obtenido = texto_pagina(documento[indice])
+                fin = time.perf_counter()
+                segundos_pdfplumber += medio - inicio
+                segundos_pymupdf += fin - medio
+
+                paginas += 1
+                if esperado == obtenido:
+                    iguales += 1
+                    similitud_total += 1.0
+                else:
+                    similitud = difflib.SequenceMatcher(None, esperado, obtenido, autojunk=False).ratio()
+                    similitud_total += similitud
+                    distintas.append((ruta, indice + 1, round(similitud, 4)))
+
+    return {
+        "paginas": paginas,
+        "iguales": iguales,
+        "similitud_media": similitud_total / paginas if paginas else 1.0,
+        "segundos_pdfplumber": segundos_pdfplumber,
+        "segundos_pymupdf": segundos_pymupdf,
+        "distintas": distintas,
+    }
+
+
+# Bloque principal: compara ambos motores sobre los PDFs indicados en la línea de comandos.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python ExtraerTextoPyMuPDF.py archivo1.pdf [archivo2.pdf ...]")
+        sys.exit(1)
+    resultado = comparar_con_pdfplumber(sys.argv[1:])
+    for ruta, pagina, similitud in resultado["distintas"]:
+        print(f"Distinta: {ruta} página {pagina} (similitud {similitud})")
+    print(f"Páginas: {resultado['paginas']}, idénticas: {resultado['iguales']}, "
+          f"similitud media: {resultado['similitud_media']:.4f}")
+    print(f"pdfplumber: {resultado['segundos_pdfplumber']:.2f} s, PyMuPDF: {resultado['segundos_pymupdf']:.2f} s "
+          f"({resultado['segundos_pdfplumber'] / max(resultado['segundos_pymupdf'], 1e-9):.1f}x)")
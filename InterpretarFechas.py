@@ -0,0 +1,71 @@
+"""
+InterpretarFechas.py
+
+Interpretación rápida de las fechas en español que aparecen en los encabezados de las ofertas
+("23 de mayo de 2017", "23/05/2017" y "23-05-2017"), con dateparser solo como respaldo.
+
+Los formatos conocidos se reconocen con patrones compilados y una tabla fija de meses, sin pasar por
+dateparser (cuya importación tarda cerca de un tercio de segundo y cada llamada alrededor de un
+milisegundo). Las cadenas que no corresponden exactamente a uno de esos formatos, o cuya fecha no
+existe en el calendario, se entregan a dateparser.parse(texto, languages=['es']), que solo se importa
+la primera vez que hace falta. Los resultados se memorizan por cadena de entrada.
+
+El resultado es el mismo datetime que devolvería dateparser para esos formatos (con la hora en cero).
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Nombres de los meses en español (en minúsculas), incluidas las variantes usadas en las ofertas
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+    "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+# "dd de <mes> de yyyy"
+PATRON_FECHA_TEXTO = re.compile(r"\s*(\d{1,2})\s+de\s+([a-záéíóú]+)\s+de\s+(\d{4})\s*", re.IGNORECASE)
+# "dd/mm/yyyy" y "dd-mm-yyyy" (día antes del mes, como en español)
+PATRON_FECHA_NUMERICA = re.compile(r"\s*(\d{1,2})([/-])(\d{1,2})\2(\d{4})\s*")
+
+
+def interpretar_fecha_rapida(texto):
+    """
+    Interpreta la fecha si corresponde exactamente a uno de los formatos conocidos.
+
+    :param texto: Cadena con la fecha.
+    :return: datetime con la fecha, o None si la cadena no tiene un formato conocido o la fecha no existe.
+    """
+    coincidencia = PATRON_FECHA_TEXTO.fullmatch(texto)
+    if coincidencia:
+        dia, mes, anio = coincidencia.group(1), MESES.get(coincidencia.group(2).lower()), coincidencia.group(3)
+    else:
+        coincidencia = PATRON_FECHA_NUMERICA.fullmatch(texto)
+        if not coincidencia:
+            return None
+        dia, mes, anio = coincidencia.group(1), int(coincidencia.group(3)), coincidencia.group(4)
+
+    if mes is None:
+        return None
+    try:
+        return datetime(int(anio), mes, int(dia))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def interpretar_fecha(texto):
+    """
+    Interpreta una fecha en español, equivalente a dateparser.parse(texto, languages=['es']).
+
+    Se intenta primero con interpretar_fecha_rapida; si no se reconoce, se usa dateparser.
+
+    :param texto: Cadena con la fecha.
+    :return: datetime con la fecha, o None si no se pudo interpretar.
+    """
+    fecha = interpretar_fecha_rapida(texto)
+    if fecha is not None:
+        return fecha
+
+    import dateparser  # Importación diferida: solo se carga si se necesita el respaldo
+    return dateparser.parse(texto, languages=['es'])
@@ -1,7 +1,6 @@
 import re
 import numpy as np
 import pikepdf
-import fitz  # PyMuPDF
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import io
@@ -101,13 +100,159 @@ def process_tokens(tokens):
 
 # ===== Función para inyectar los XObjects calculados =====
 
+def has_form_xobjects(page):
+    """
+    Indica si la página tiene XObjects de formulario (no imágenes) en sus recursos,
+    es decir, si la inyección de XObjects puede cambiar su contenido.
+    """
+    resources = page.get("/Resources")
+    if resources is None or "/XObject" not in resources:
+        return False
+    for xobj_name in list(resources["/XObject"].keys()):
+        xobj = resources["/XObject"][xobj_name]
+        if isinstance(xobj, pikepdf.Stream) and xobj.get("/Subtype") != "/Image":
+            return True
+    return False
+
+def inline_xobjects_page(pdf, page):
+    """
+    Calcula para cada XObject (no imagen) invocado en la página la transformación final
+    (usando la CTM de invocación y la matriz interna) y deduce un transformador T_inj que
+    mapea el /BBox interno al bounding box final. Luego inyecta el contenido del XObject,
+    envuelto con ese operador de transformación, al final del stream principal de la página.
+    Retorna True si la página fue modificada.
+    """
+    if page.get("/Contents") is None:
+        return False
+    if isinstance(page.Contents, pikepdf.Array):
+        original_content = ""
+        for obj in page.Contents:
+            try:
+                original_content += obj.read_bytes().decode("latin1", errors="ignore") + "\n"
+            except Exception:
+                continue
+    else:
+        original_content = page.Contents.read_bytes().decode("latin1", errors="ignore")
+    
+    # Procesar el stream para obtener las invocaciones de XObjects
+    tokens = tokenize_content(original_content)
+    xobject_usages = process_tokens(tokens)
+    inline_content = ""
+    
+    # Acceder a los recursos de la página
+    resources = page.get("/Resources")
+    if resources is None or "/XObject" not in resources:
+        return False
+    xobjects = resources["/XObject"]
+
+    for usage in xobject_usages:
+        xobj_name, ctm_content = usage
+        # Solo procesamos los XObjects que estén en Resources y que no sean imágenes
+        xobj = xobjects.get(xobj_name)
+        if xobj is None:
+            continue
+        subtype = xobj.get("/Subtype")
+        if subtype == "/Image":
+            continue
+        bbox = xobj.get("/BBox")
+        if bbox is None:
+            continue
+        # Convertir /BBox a float
+        orig_x0, orig_y0, orig_x1, orig_y1 = (float(bbox[0]), float(bbox[1]),
+                                                float(bbox[2]), float(bbox[3]))
+        # Obtener la matriz interna, si existe, o usar la identidad
+        matrix = xobj.get("/Matrix")
+        if matrix is not None:
+            matrix = [float(v) for v in matrix]
+            internal_matrix = make_matrix(*matrix)
+        else:
+            internal_matrix = np.identity(3)
+        
+        # La CTM final aplicada al XObject
+        final_ctm = ctm_content.dot(internal_matrix)
+        
+        # Calcular las 4 esquinas del /BBox original
+        corners = [(orig_x0, orig_y0), (orig_x0, orig_y1),
+                   (orig_x1, orig_y0), (orig_x1, orig_y1)]
+        transformed_corners = [apply_matrix(final_ctm, pt) for pt in corners]
+        xs = [pt[0] for pt in transformed_corners]
+        ys = [pt[1] for pt in transformed_corners]
+        final_bbox = (min(xs), min(ys), max(xs), max(ys))
+        final_width = final_bbox[2] - final_bbox[0]
+        final_height = final_bbox[3] - final_bbox[1]
+        
+        if (orig_x1 - orig_x0) == 0 or (orig_y1 - orig_y0) == 0:
+            continue
+        scale_x = final_width / (orig_x1 - orig_x0)
+        scale_y = final_height / (orig_y1 - orig_y0)
+        trans_x = final_bbox[0] - orig_x0 * scale_x
+        trans_y = final_bbox[1] - orig_y0 * scale_y
+
+        # Cadena de transformación a inyectar (se envuelve con q ... Q)
+        transform_str = f"{scale_x} 0 0 {scale_y} {trans_x} {trans_y} cm\n"
+        try:
+            xobj_content = xobj.read_bytes().decode("latin1", errors="ignore")
+        except Exception:
+            continue
+        inline_piece = "q\n" + transform_str + xobj_content + "\nQ\n"
+        inline_content += inline_piece
+        
+        # Información de depuración
+        if Config.DEBUG_PRINTS:
+            print(f"XObject {xobj_name}:")
+            print(f"  /BBox original: ({orig_x0:.2f}, {orig_y0:.2f}, {orig_x1:.2f}, {orig_y1:.2f})")
+            print("  CTM de invocación (contenido):")
+            print(ctm_content)
+            print("  /Matrix interna:")
+            print(internal_matrix)
+            print("  CTM final aplicada:")
+            print(final_ctm)
+            insertion_point = apply_matrix(final_ctm, (0, 0))
+            print(f"  Punto de inserción: ({insertion_point[0]:.2f}, {insertion_point[1]:.2f})")
+            print(f"  Bounding box final: ({final_bbox[0]:.2f}, {final_bbox[1]:.2f}, {final_bbox[2]:.2f}, {final_bbox[3]:.2f})")
+            print(f"  Dimensiones finales: {final_width:.2f} x {final_height:.2f}")
+            print(f"  Factor de escala aplicado: ({scale_x:.4f}, {scale_y:.4f})")
+            print(f"  Traslación aplicada: ({trans_x:.2f}, {trans_y:.2f})\n")
+    
+    # Si se han generado inyecciones, anexarlas al stream original de la página
+    if inline_content:
+        new_content = original_content + "\n" + inline_content
+        new_stream = pdf.make_stream(new_content.encode("latin1"))
+        page.Contents = new_stream
+        return True
+    return False
+
+def extract_single_page(pdf, page_index):
+    """
+    Crea un PDF nuevo (pikepdf) que contiene solo una copia de la página indicada,
+    de modo que se pueda modificar sin alterar el documento original.
+    """
+    single = pikepdf.new()
+    single.pages.append(pdf.pages[page_index])
+    return single
+
+def inline_xobjects_single_page(pdf, page_index):
+    """
+    Deriva bajo demanda la variante con XObjects inyectados de una sola página.
+    Retorna un BytesIO con un PDF de una página, o None si la página no tiene
+    XObjects de formulario (en cuyo caso la variante sería idéntica a la original).
+    """
+    if not has_form_xobjects(pdf.pages[page_index]):
+        return None
+    single = extract_single_page(pdf, page_index)
+    if not inline_xobjects_page(single, single.pages[0]):
+        single.close()
+        return None
+    single_bytes = io.BytesIO()
+    single.save(single_bytes)
+    single.close()
+    single_bytes.seek(0)
+    return single_bytes
+
 def inline_xobjects_with_transform(pdf_bytes, output_pdf_path):
     """
-    Abre el PDF desde un objeto BytesIO, calcula para cada XObject (no imagen) la transformación
-    final (usando la CTM de invocación y la matriz interna) y deduce un transformador
-    T_inj que mapea el /BBox interno al bounding box final. Luego inyecta el contenido
-    del XObject, envuelto con ese operador de transformación, en el stream principal de
-    la página en el punto de inserción calculado.
+    Abre el PDF desde un objeto BytesIO e inyecta en cada página el contenido de sus
+    XObjects (no imagen) con la transformación correspondiente (ver inline_xobjects_page).
     Se guarda el PDF modificado en output_pdf_path.
     """
     # Asegurarse de estar al inicio del stream
@@ -115,109 +260,9 @@ def inline_xobjects_with_transform(pdf_bytes, output_pdf_path):
     
     # Abrir con pikepdf usando el BytesIO
     with pikepdf.open(pdf_bytes) as pdf:
-        # Para visualización opcional, abrimos también con PyMuPDF
-        pdf_bytes.seek(0)
-        doc_fitz = fitz.open("pdf", stream=pdf_bytes.getvalue())
-        
         # Recorremos cada página del PDF
         for page in pdf.pages:
-            if page.get("/Contents") is None:
-                continue
-            if isinstance(page.Contents, pikepdf.Array):
-                original_content = ""
-                for obj in page.Contents:
-                    try:
-                        original_content += obj.read_bytes().decode("latin1", errors="ignore") + "\n"
-                    except Exception:
-                        continue
-            else:
-                original_content = page.Contents.read_bytes().decode("latin1", errors="ignore")
-            
-            # Procesar el stream para obtener las invocaciones de XObjects
-            tokens = tokenize_content(original_content)
-            xobject_usages = process_tokens(tokens)
-            inline_content = ""
-            
-            # Acceder a los recursos de la página
-            resources = page.get("/Resources")
-            if resources is None or "/XObject" not in resources:
-                continue
-            xobjects = resources["/XObject"]
-
-            for usage in xobject_usages:
-                xobj_name, ctm_content = usage
-                # Solo procesamos los XObjects que estén en Resources y que no sean imágenes
-                xobj = xobjects.get(xobj_name)
-                if xobj is None:
-                    continue
-                subtype = xobj.get("/Subtype")
-                if subtype == "/Image":
-                    continue
-                bbox = xobj.get("/BBox")
-                if bbox is None:
-                    continue
-                # Convertir /BBox a float
-                orig_x0, orig_y0, orig_x1, orig_y1 = (float(bbox[0]), float(bbox[1]),
-                                                        float(bbox[2]), float(bbox[3]))
-                # Obtener la matriz interna, si existe, o usar la identidad
-                matrix = xobj.get("/Matrix")
-                if matrix is not None:
-                    matrix = [float(v) for v in matrix]
-                    internal_matrix = make_matrix(*matrix)
-                else:
-                    internal_matrix = np.identity(3)
-                
-                # La CTM final aplicada al XObject
-                final_ctm = ctm_content.dot(internal_matrix)
-                
-                # Calcular las 4 esquinas del /BBox original
-                corners = [(orig_x0, orig_y0), (orig_x0, orig_y1),
-                           (orig_x1, orig_y0), (orig_x1, orig_y1)]
-                transformed_corners = [apply_matrix(final_ctm, pt) for pt in corners]
-                xs = [pt[0] for pt in transformed_corners]
-                ys = [pt[1] for pt in transformed_corners]
-                final_bbox = (min(xs), min(ys), max(xs), max(ys))
-                final_width = final_bbox[2] - final_bbox[0]
-                final_height = final_bbox[3] - final_bbox[1]
-                
-                if (orig_x1 - orig_x0) == 0 or (orig_y1 - orig_y0) == 0:
-                    continue
-                scale_x = final_width / (orig_x1 - orig_x0)
-                scale_y = final_height / (orig_y1 - orig_y0)
-                trans_x = final_bbox[0] - orig_x0 * scale_x
-                trans_y = final_bbox[1] - orig_y0 * scale_y
-
-                # Cadena de transformación a inyectar (se envuelve con q ... Q)
-                transform_str = f"{scale_x} 0 0 {scale_y} {trans_x} {trans_y} cm\n"
-                try:
-                    xobj_content = xobj.read_bytes().decode("latin1", errors="ignore")
-                except Exception:
-                    continue
-                inline_piece = "q\n" + transform_str + xobj_content + "\nQ\n"
-                inline_content += inline_piece
-                
-                # Información de depuración
-                if Config.DEBUG_PRINTS:
-                    print(f"XObject {xobj_name}:")
-                    print(f"  /BBox original: ({orig_x0:.2f}, {orig_y0:.2f}, {orig_x1:.2f}, {orig_y1:.2f})")
-                    print("  CTM de invocación (contenido):")
-                    print(ctm_content)
-                    print("  /Matrix interna:")
-                    print(internal_matrix)
-                    print("  CTM final aplicada:")
-                    print(final_ctm)
-                    insertion_point = apply_matrix(final_ctm, (0, 0))
-                    print(f"  Punto de inserción: ({insertion_point[0]:.2f}, {insertion_point[1]:.2f})")
-                    print(f"  Bounding box final: ({final_bbox[0]:.2f}, {final_bbox[1]:.2f}, {final_bbox[2]:.2f}, {final_bbox[3]:.2f})")
-                    print(f"  Dimensiones finales: {final_width:.2f} x {final_height:.2f}")
-                    print(f"  Factor de escala aplicado: ({scale_x:.4f}, {scale_y:.4f})")
-                    print(f"  Traslación aplicada: ({trans_x:.2f}, {trans_y:.2f})\n")
-            
-            # Si se han generado inyecciones, anexarlas al stream original de la página
-            if inline_content:
-                new_content = original_content + "\n" + inline_content
-                new_stream = pdf.make_stream(new_content.encode("latin1"))
-                page.Contents = new_stream
+            inline_xobjects_page(pdf, page)
 
         # pdf.save(output_pdf_path)
     # print(f"PDF modificado guardado en: {output_pdf_path}")
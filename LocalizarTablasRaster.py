@@ -0,0 +1,310 @@
+"""
+LocalizarTablasRaster.py
+
+Motor alternativo a pdfplumber 'find_tables' para localizar las tablas de una página.
+
+En páginas con miles de segmentos vectoriales pequeños (bordes decorativos, gráficos), el análisis
+de intersecciones de pdfplumber se vuelve muy lento. Este motor trabaja sobre un render de baja
+resolución de la página sin texto:
+1. Se binariza el render y se extraen las líneas horizontales y verticales con aperturas morfológicas.
+2. Se unen ambas máscaras y se buscan componentes conexas (cada rejilla de líneas es una componente).
+3. Se conservan las componentes con al menos dos líneas horizontales y dos verticales, y se devuelven
+   sus recuadros en coordenadas del PDF.
+
+El motor se elige con Config.MOTOR_LOCALIZACION_TABLAS ("pdfplumber", el valor por defecto, "raster" o
+"auto"). En modo "auto" se usa el motor raster cuando la página tiene demasiados segmentos o cuando
+'find_tables' supera el presupuesto de tiempo; solo este modo inicia el proceso de búsqueda con presupuesto. La función comparar_motores permite medir ambos motores sobre
+los mismos documentos.
+"""
+
+import io
+import multiprocessing
+import sys
+import time
+
+import cv2
+import fitz
+import numpy as np
+import pdfplumber
+import pikepdf
+from tabulate import tabulate
+
+import Config
+import PrefiltroDeTablas
+
+# Tiempo máximo (en segundos) que se espera a que el proceso de búsqueda abra el PDF
+ARRANQUE_BUSQUEDA_MAXIMO_S = 60
+
+
+class TablaLocalizada:
+    """
+    Tabla localizada por el motor raster o por 'find_tables' en el proceso de búsqueda (ver
+    BuscadorConPresupuesto). Expone los mismos atributos que usa el resto del proceso de las tablas
+    de pdfplumber: 'bbox' (x0, top, x1, bottom) y 'page' (página de pdfplumber).
+    """
+
+    def __init__(self, page, bbox):
+        self.page = page
+        self.bbox = bbox
+
+    def __repr__(self):
+        return f"TablaLocalizada(bbox={self.bbox})"
+
+
+def contar_lineas(perfil):
+    """
+    Cuenta los tramos consecutivos con valor verdadero de un perfil booleano (número de líneas distintas).
+    """
+    perfil = perfil.astype(np.int8)
+    return int(np.count_nonzero(np.diff(perfil, prepend=0) == 1))
+
+
+def localizar_tablas_raster(pagina_fitz, dpi=96, longitud_minima_pt=20, umbral_gris=230):
+    """
+    Localiza las tablas (rejillas de líneas) de una página renderizada a baja resolución.
+
+    :param pagina_fitz: Página de PyMuPDF (idealmente de la variante sin texto).
+    :param dpi: Resolución del render.
+    :param longitud_minima_pt: Longitud mínima (en puntos) de una línea de la tabla.
+    :param umbral_gris: Nivel de gris por debajo del cual un píxel se considera tinta.
+    :return: Lista de recuadros (x0, top, x1, bottom) en coordenadas del PDF, de arriba a abajo.
+    """
+    zoom = dpi / 72
+    pix = pagina_fitz.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    gris = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    binaria = np.where(gris < umbral_gris, 255, 0).astype(np.uint8)
+
+    # Extraer las líneas horizontales y verticales con aperturas morfológicas
+    longitud = max(8, int(longitud_minima_pt * zoom))
+    horizontales = cv2.morphologyEx(binaria, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (longitud, 1)))
+    verticales = cv2.morphologyEx(binaria, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, longitud)))
+
+    # Unir las líneas que se tocan y buscar las rejillas como componentes conexas
+    rejilla = cv2.dilate(cv2.bitwise_or(horizontales, verticales), np.ones((3, 3), np.uint8))
+    n, _, stats, _ = cv2.connectedComponentsWithStats(rejilla, connectivity=8)
+
+    origen_x, origen_y = pagina_fitz.cropbox.x0, pagina_fitz.cropbox.y0
+    recuadros = []
+    for i in range(1, n):
+        x, y, w, h = stats[i, cv2.CC_STAT_LEFT], stats[i, cv2.CC_STAT_TOP], stats[i, cv2.CC_STAT_WIDTH], stats[i, cv2.CC_STAT_HEIGHT]
+        if w < longitud or h < longitud:
+            continue
+        # Una tabla necesita al menos dos líneas horizontales y dos verticales
+        if contar_lineas(horizontales[y:y + h, x:x + w].any(axis=1)) < 2:
+            continue
+        if contar_lineas(verticales[y:y + h, x:x + w].any(axis=0)) < 2:
+            continue
+        recuadros.append((x / zoom + origen_x, y / zoom + origen_y, (x + w) / zoom + origen_x, (y + h) / zoom + origen_y))
+
+    recuadros.sort(key=lambda r: (r[1], r[0]))
+    if Config.DEBUG_PRINTS:
+        print(f"Motor raster: {len(recuadros)} tabla(s) localizada(s)")
+    return recuadros
+
+
+def proceso_busqueda(conexion, pdf_bytes):
+    """
+    Bucle del proceso de búsqueda de BuscadorConPresupuesto: abre el PDF una sola vez y responde a cada
+    índice de página recibido con los recuadros de las tablas de 'find_tables' (o con la excepción producida).
+
+    :param conexion: Extremo del proceso de la conexión (multiprocessing.Pipe).
+    :param pdf_bytes: Bytes del PDF original.
+    """
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        conexion.send(("listo", None))
+        while True:
+            try:
+                page_idx = conexion.recv()
+            except EOFError:
+                break
+            page = pdf.pages[page_idx]
+            try:
+                respuesta = ("tablas", [tuple(tabla.bbox) for tabla in page.find_tables()])
+            except Exception as e:
+                respuesta = ("error", e)
+            page.close()  # Liberar los objetos de la página ya analizada
+            try:
+                conexion.send(respuesta)
+            except Exception as e:
+                # La excepción no se puede serializar: se envía su descripción
+                conexion.send(("error", RuntimeError(f"{type(respuesta[1]).__name__}: {respuesta[1]} ({e})")))
+
+
+class BuscadorConPresupuesto:
+    """
+    Ejecuta pdfplumber 'find_tables' en un proceso aparte con un límite de tiempo.
+
+    El proceso trabaja sobre su propia instancia de pdfplumber del documento, que abre una sola vez y
+    reutiliza entre páginas, y solo devuelve los recuadros de las tablas. Si se supera el presupuesto, el
+    proceso se termina (un hilo abandonado seguiría ejecutando 'find_tables' en Python y compitiendo por el
+    GIL con el resto del proceso) y la siguiente página inicia uno nuevo. El arranque del proceso no se
+    descuenta del presupuesto. Si el proceso no se puede iniciar, las búsquedas se hacen en el proceso
+    actual, sin presupuesto (como en el modo "pdfplumber").
+    """
+
+    def __init__(self, pdf_bytes):
+        """
+        :param pdf_bytes: Bytes del PDF original.
+        """
+        self.pdf_bytes = pdf_bytes
+        self.proceso = None
+        self.conexion = None
+        self.disponible = True  # False si el proceso de búsqueda no se pudo iniciar
+
+    def iniciar(self):
+        """
+        Inicia el proceso de búsqueda y espera a que abra el PDF (como máximo ARRANQUE_BUSQUEDA_MAXIMO_S).
+
+        :return: True si el proceso quedó listo.
+        """
+        contexto = multiprocessing.get_context("spawn")
+        try:
+            self.conexion, conexion_proceso = contexto.Pipe()
+            self.proceso = contexto.Process(target=proceso_busqueda, args=(conexion_proceso, self.pdf_bytes), daemon=True)
+            self.proceso.start()
+            conexion_proceso.close()
+            if self.conexion.poll(ARRANQUE_BUSQUEDA_MAXIMO_S):
+                self.conexion.recv()
+                return True
+        except (EOFError, OSError) as e:
+            if Config.DEBUG_PRINTS:
+                print(f"No se pudo iniciar el proceso de búsqueda de tablas: {e}")
+        self.cerrar()
+        return False
+
+    def buscar_tablas(self, page, page_idx, presupuesto):
+        """
+        :param page: Página de pdfplumber (solo se usa si el proceso de búsqueda no está disponible).
+        :param page_idx: Índice de la página.
+        :param presupuesto: Tiempo máximo en segundos.
+        :return: Lista de recuadros (x0, top, x1, bottom) de las tablas de la página, o None si se superó
+                 el presupuesto o el proceso de búsqueda terminó durante la búsqueda.
+        """
+        if self.proceso is None and self.disponible:
+            self.disponible = self.iniciar()
+        if not self.disponible:
+            return [tuple(tabla.bbox) for tabla in page.find_tables()]
+
+        try:
+            self.conexion.send(page_idx)
+            if not self.conexion.poll(presupuesto):
+                if Config.DEBUG_PRINTS:
+                    print(f"Página {page_idx + 1}: 'find_tables' superó el presupuesto de {presupuesto} s")
+                self.cerrar()
+                return None
+            tipo, valor = self.conexion.recv()
+        except (EOFError, OSError) as e:
+            if Config.DEBUG_PRINTS:
+                print(f"El proceso de búsqueda de tablas terminó durante la búsqueda: {e}")
+            self.cerrar()
+            return None
+        if tipo == "error":
+            raise valor
+        return valor
+
+    def cerrar(self):
+        """
+        Termina el proceso de búsqueda, si existe. La siguiente búsqueda inicia uno nuevo.
+        """
+        if self.proceso is not None and self.proceso.pid is not None:
+            self.proceso.terminate()
+            self.proceso.join()
+        if self.conexion is not None:
+            self.conexion.close()
+        self.proceso = self.conexion = None
+
+
+def elegir_motor(page_pikepdf, horizontales=None, verticales=None):
+    """
+    Decide el motor de localización de la página según Config.MOTOR_LOCALIZACION_TABLAS.
+
+    En modo "auto" se elige el motor raster si la página tiene más segmentos que
+    Config.UMBRAL_SEGMENTOS_RASTER; si no, se usa pdfplumber (con presupuesto de tiempo).
+
+    :param page_pikepdf: Página de pikepdf.
+    :param horizontales: Número total de segmentos horizontales de la página, si ya se contaron (por ejemplo
+                         en el prefiltro con contar_todos=True); si no se indican, se cuentan aquí.
+    :param verticales: Número total de segmentos verticales de la página, si ya se contaron.
+    :return: Tuple (motor, segmentos), donde motor es "pdfplumber" o "raster" y segmentos es el
+             número de segmentos contados (None si no se contaron).
+    """
+    motor = Config.MOTOR_LOCALIZACION_TABLAS
+    if motor != "auto":
+        return motor, None
+    if horizontales is None or verticales is None:
+        try:
+            horizontales, verticales = PrefiltroDeTablas.contar_segmentos(page_pikepdf, minimo=None)
+        except pikepdf.PdfError:
+            return "pdfplumber", None
+    segmentos = horizontales + verticales
+    return ("raster" if segmentos > Config.UMBRAL_SEGMENTOS_RASTER else "pdfplumber"), segmentos
+
+
+def iou(a, b):
+    """
+    Intersección sobre unión de dos recuadros (x0, top, x1, bottom).
+    """
+    ix0, iy0 = max(a[0], b[0]), max(a[1], b[1])
+    ix1, iy1 = min(a[2], b[2]), min(a[3], b[3])
+    interseccion = max(0, ix1 - ix0) * max(0, iy1 - iy0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - interseccion
+    return interseccion / union if union > 0 else 0.0
+
+
+def comparar_motores(rutas_pdf, umbral_iou=0.8):
+    """
+    Compara ambos motores de localización sobre los mismos documentos: tiempo por página,
+    número de tablas de cada motor y cuántas coinciden (IoU >= umbral_iou).
+
+    El motor raster se mide sobre la variante sin texto de cada página, como en el proceso real.
+
+    :param rutas_pdf: Lista de rutas de PDFs.
+    :param umbral_iou: IoU mínimo para considerar que dos recuadros son la misma tabla.
+    :return: Lista de filas [documento, página, segmentos, t_pdfplumber, t_raster, n_pdfplumber, n_raster, coincidencias].
+    """
+    # Importación diferida: ExtraerTablasSinTextoPDF importa este módulo
+    import ExtraerTablasSinTextoPDF
+
+    filas = []
+    for ruta in rutas_pdf:
+        with open(ruta, "rb") as archivo:
+            datos = archivo.read()
+        pdf_plumber = pdfplumber.open(io.BytesIO(datos))
+        pdf_pikepdf = pikepdf.open(io.BytesIO(datos))
+        for page_idx, page in enumerate(pdf_plumber.pages):
+            horizontales, verticales = PrefiltroDeTablas.contar_segmentos(pdf_pikepdf.pages[page_idx], minimo=None)
+
+            inicio = time.perf_counter()
+            tablas_plumber = [t.bbox for t in page.find_tables()]
+            t_plumber = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            with fitz.open(stream=ExtraerTablasSinTextoPDF.eliminar_texto_pagina(pdf_pikepdf, page_idx), filetype="pdf") as sin_texto:
+                tablas_raster = localizar_tablas_raster(sin_texto[0])
+            t_raster = time.perf_counter() - inicio
+
+            coincidencias = sum(1 for a in tablas_plumber if any(iou(a, b) >= umbral_iou for b in tablas_raster))
+            filas.append([ruta, page_idx + 1, horizontales + verticales, round(t_plumber, 4), round(t_raster, 4),
+                          len(tablas_plumber), len(tablas_raster), coincidencias])
+        pdf_plumber.close()
+        pdf_pikepdf.close()
+
+    encabezados = ["Documento", "Página", "Segmentos", "t pdfplumber (s)", "t raster (s)",
+                   "Tablas pdfplumber", "Tablas raster", "Coincidencias"]
+    print(tabulate(filas, headers=encabezados, tablefmt="fancy_grid"))
+    total_plumber = sum(f[3] for f in filas)
+    total_raster = sum(f[4] for f in filas)
+    total_tablas = sum(f[5] for f in filas)
+    total_coincidencias = sum(f[7] for f in filas)
+    print(f"Tiempo total pdfplumber: {total_plumber:.3f} s | raster: {total_raster:.3f} s")
+    if total_tablas:
+        print(f"Tablas de pdfplumber encontradas por el motor raster: {total_coincidencias}/{total_tablas}")
+    return filas
+
+
+if __name__ == "__main__":
+    # Uso: python LocalizarTablasRaster.py documento1.pdf [documento2.pdf ...]
+    if len(sys.argv) > 1:
+        comparar_motores(sys.argv[1:])
+    else:
+        print("Uso: python LocalizarTablasRaster.py documento1.pdf [documento2.pdf ...]")
@@ -0,0 +1,309 @@
+"""
+ModeloCeldas.py
+
+Modelo compacto de la geometría de las celdas de una tabla, compartido por la detección (raster y
+vectorial), la malla, la conversión a coordenadas del PDF, la estructura y la asignación de texto.
+
+Celdas guarda las celdas como columnas de NumPy (identificador, x, y, ancho, alto y centroide) en lugar
+de listas de tuplas o diccionarios por celda. Para el código que las recorre, una instancia se comporta
+como la lista de tuplas (id_celda, x, y, w, h) de siempre: se puede iterar, indexar y medir con len().
+Los recortes de imagen de cada celda son vistas que solo se crean cuando se piden.
+
+Cuadricula guarda la malla (líneas X e Y y el borde de la tabla) y calcula las posiciones, los tamaños
+y los centros de todas sus celdas como matrices.
+"""
+
+import numpy as np
+
+# Tamaño máximo (en intervalos) del mapa de etiquetas de Celdas.buscar; con más, la búsqueda es directa
+LIMITE_MAPA_ETIQUETAS = 4_000_000
+
+
+class Celdas:
+    """
+    Celdas de una tabla en columnas de NumPy.
+
+    Atributos: ids, x, y, w, h (y opcionalmente cx, cy: centroides) con una posición por celda.
+    """
+
+    def __init__(self, ids, x, y, w, h, cx=None, cy=None, imagen=None):
+        """
+        :param ids: Identificadores de las celdas.
+        :param x: Coordenada X del borde izquierdo de cada celda.
+        :param y: Coordenada Y del borde superior de cada celda.
+        :param w: Ancho de cada celda.
+        :param h: Alto de cada celda.
+        :param cx: Coordenada X del centroide de cada celda (opcional).
+        :param cy: Coordenada Y del centroide de cada celda (opcional).
+        :param imagen: Imagen de la que se obtienen los recortes de las celdas (opcional).
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.w = np.asarray(w)
+        self.h = np.asarray(h)
+        self.cx = None if cx is None else np.asarray(cx)
+        self.cy = None if cy is None else np.asarray(cy)
+        self.imagen = imagen
+
+    @classmethod
+    def desde_tuplas(cls, coordenadas_celdas):
+        """
+        Crea el modelo a partir de una lista de tuplas (id_celda, x, y, w, h).
+        """
+        if len(coordenadas_celdas) == 0:
+            return cls([], [], [], [], [])
+        ids, x, y, w, h = zip(*coordenadas_celdas)
+        return cls(ids, x, y, w, h)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        # Se devuelven escalares de Python para que la aritmética del código existente no cambie
+        return zip(self.ids.tolist(), self.x.tolist(), self.y.tolist(), self.w.tolist(), self.h.tolist())
+
+    def __getitem__(self, k):
+        return self.ids[k].item(), self.x[k].item(), self.y[k].item(), self.w[k].item(), self.h[k].item()
+
+    def __repr__(self):
+        return f"Celdas({list(self)})"
+
+    def seleccionar(self, indices):
+        """
+        Devuelve las celdas indicadas (array de posiciones o máscara booleana), en ese orden.
+        """
+        return Celdas(self.ids[indices], self.x[indices], self.y[indices], self.w[indices], self.h[indices],
+                      None if self.cx is None else self.cx[indices],
+                      None if self.cy is None else self.cy[indices], self.imagen)
+
+    def centros(self):
+        """
+        :return: Lista de tuplas (id_celda, cX, cY) con el centroide de cada celda.
+        """
+        return list(zip(self.ids.tolist(), self.cx.tolist(), self.cy.tolist()))
+
+    def recortes(self):
+        """
+        :return: Secuencia perezosa con el recorte de la imagen de cada celda.
+        """
+        return Recortes(self)
+
+    def limites(self):
+        """
+        :return: Tuple (xt1, xt2, yt1, yt2) con el área que ocupan todas las celdas
+                 ((inf, 0, inf, 0) si no hay celdas).
+        """
+        if len(self) == 0:
+            return float('inf'), 0, float('inf'), 0
+        return (self.x.min().item(), (self.x + self.w).max().item(),
+                self.y.min().item(), (self.y + self.h).max().item())
+
+    def transformar(self, escala_x, escala_y, origen_x, origen_y):
+        """
+        Aplica a todas las celdas la transformación afín x' = origen_x + x * escala_x,
+        w' = w * escala_x (y lo mismo en Y), por ejemplo para pasar de píxeles a coordenadas del PDF.
+
+        :return: Nuevas Celdas con las coordenadas transformadas (sin centroides ni imagen).
+        """
+        return Celdas(self.ids, origen_x + self.x * escala_x, origen_y + self.y * escala_y,
+                      self.w * escala_x, self.h * escala_y)
+
+    def buscar(self, px, py):
+        """
+        Busca, para cada punto, la primera celda (en el orden del modelo) cuyo recuadro lo contiene,
+        con los bordes incluidos.
+
+        Los bordes de todas las celdas (ordenados y sin repetir) dividen el plano en intervalos
+        elementales; se pinta un mapa de etiquetas con la primera celda que cubre cada intervalo y cada
+        punto se ubica con búsqueda binaria sobre los bordes. Los puntos que caen justo sobre un borde
+        (o todos, si el mapa excede LIMITE_MAPA_ETIQUETAS) se comparan directamente contra las celdas.
+
+        :param px: Array con las coordenadas X de los puntos.
+        :param py: Array con las coordenadas Y de los puntos.
+        :return: Tuple (posiciones, encontrados): posición de la celda de cada punto y máscara de los
+                 puntos que caen dentro de alguna celda.
+        """
+        px = np.asarray(px, dtype=np.float64).ravel()
+        py = np.asarray(py, dtype=np.float64).ravel()
+        posiciones = np.zeros(len(px), dtype=np.int64)
+        encontrados = np.zeros(len(px), dtype=bool)
+        if len(self) == 0 or len(px) == 0:
+            return posiciones, encontrados
+
+        x_fin = self.x + self.w
+        y_fin = self.y + self.h
+        bordes_x = np.unique(np.concatenate([self.x, x_fin]))
+        bordes_y = np.unique(np.concatenate([self.y, y_fin]))
+
+        if (len(bordes_x) - 1) * (len(bordes_y) - 1) > LIMITE_MAPA_ETIQUETAS:
+            directos = np.arange(len(px))
+        else:
+            # Mapa de etiquetas de los intervalos elementales (la primera celda queda encima)
+            etiquetas = np.full((len(bordes_y) - 1, len(bordes_x) - 1), -1, dtype=np.int64)
+            columnas_ini = np.searchsorted(bordes_x, self.x).tolist()
+            columnas_fin = np.searchsorted(bordes_x, x_fin).tolist()
+            filas_ini = np.searchsorted(bordes_y, self.y).tolist()
+            filas_fin = np.searchsorted(bordes_y, y_fin).tolist()
+            for k in range(len(self) - 1, -1, -1):
+                etiquetas[filas_ini[k]:filas_fin[k], columnas_ini[k]:columnas_fin[k]] = k
+
+            # Intervalo elemental de cada punto
+            ix = np.searchsorted(bordes_x, px, side="right") - 1
+            iy = np.searchsorted(bordes_y, py, side="right") - 1
+            sobre_borde_x = (ix >= 0) & (bordes_x[np.maximum(ix, 0)] == px)
+            sobre_borde_y = (iy >= 0) & (bordes_y[np.maximum(iy, 0)] == py)
+            interiores = np.flatnonzero((ix >= 0) & (ix < len(bordes_x) - 1) & ~sobre_borde_x
+                                        & (iy >= 0) & (iy < len(bordes_y) - 1) & ~sobre_borde_y)
+            etiqueta = etiquetas[iy[interiores], ix[interiores]]
+            posiciones[interiores] = np.maximum(etiqueta, 0)
+            encontrados[interiores] = etiqueta >= 0
+            directos = np.flatnonzero(sobre_borde_x | sobre_borde_y)
+
+        # Comparación directa, por bloques para acotar la memoria
+        for inicio in range(0, len(directos), 4096):
+            bloque = directos[inicio:inicio + 4096]
+            bx = px[bloque, np.newaxis]
+            by = py[bloque, np.newaxis]
+            dentro = (bx >= self.x) & (bx <= x_fin) & (by >= self.y) & (by <= y_fin)
+            posiciones[bloque] = dentro.argmax(axis=1)
+            encontrados[bloque] = dentro.any(axis=1)
+        return posiciones, encontrados
+
+    def agrupar(self, posiciones, encontrados, *claves):
+        """
+        Ordena los puntos encontrados por ID de celda y, dentro de cada ID, por las claves indicadas
+        (la primera clave es la principal; los empates conservan el orden original de los puntos).
+
+        :param posiciones: Posiciones de las celdas de cada punto (ver buscar).
+        :param encontrados: Máscara de los puntos que caen dentro de alguna celda (ver buscar).
+        :param claves: Arrays con las claves de ordenamiento de cada punto.
+        :return: Tuple (orden, ids): índices de los puntos encontrados en ese orden y el ID de la
+                 celda de cada uno.
+        """
+        indices = np.flatnonzero(encontrados)
+        ids = self.ids[posiciones[indices]]
+        orden = np.lexsort(tuple(np.asarray(clave)[indices] for clave in reversed(claves)) + (ids,))
+        return indices[orden], ids[orden]
+
+
+class Recortes:
+    """
+    Recortes de las celdas sobre la imagen del modelo. Cada recorte es una vista que se crea al pedirla.
+    """
+
+    def __init__(self, celdas):
+        self.celdas = celdas
+
+    def __len__(self):
+        return len(self.celdas)
+
+    def __getitem__(self, k):
+        _, x, y, w, h = self.celdas[k]
+        return self.celdas.imagen[y:y + h, x:x + w]
+
+    def __iter__(self):
+        return (self[k] for k in range(len(self)))
+
+
+def como_celdas(coordenadas_celdas):
+    """
+    Devuelve el modelo de celdas, creándolo si se recibe una lista de tuplas (id_celda, x, y, w, h).
+    """
+    if isinstance(coordenadas_celdas, Celdas):
+        return coordenadas_celdas
+    return Celdas.desde_tuplas(coordenadas_celdas)
+
+
+class Cuadricula:
+    """
+    Malla de la tabla: cada celda de la malla inicia en una línea y termina en la siguiente; la última
+    fila y la última columna se extienden hasta el alto y el ancho indicados.
+
+    Para el código que recorre la cuadricula como matriz, cuadricula[i][j] devuelve el diccionario
+    con claves "x", "y", "w" y "h" de la celda de la malla.
+    """
+
+    def __init__(self, lineas_x, lineas_y, ancho, alto):
+        """
+        :param lineas_x: Lista ordenada de coordenadas X de la malla.
+        :param lineas_y: Lista ordenada de coordenadas Y de la malla.
+        :param ancho: Coordenada X donde termina la última columna.
+        :param alto: Coordenada Y donde termina la última fila.
+        """
+        self.lineas_x = list(lineas_x)
+        self.lineas_y = list(lineas_y)
+        self.anchos = [fin - x for x, fin in zip(self.lineas_x, self.lineas_x[1:] + [ancho])]
+        self.altos = [fin - y for y, fin in zip(self.lineas_y, self.lineas_y[1:] + [alto])]
+
+    @property
+    def filas(self):
+        return len(self.lineas_y)
+
+    @property
+    def columnas(self):
+        return len(self.lineas_x)
+
+    def __len__(self):
+        return self.filas
+
+    def __getitem__(self, i):
+        y, h = self.lineas_y[i], self.altos[i]
+        return [{"x": x, "y": y, "w": w, "h": h} for x, w in zip(self.lineas_x, self.anchos)]
+
+    def centros(self):
+        """
+        :return: Tuple (centros_x, centros_y) de matrices (filas, columnas) con el centro de cada celda de la malla.
+        """
+        centros_x = np.asarray(self.lineas_x) + np.asarray(self.anchos) / 2
+        centros_y = np.asarray(self.lineas_y) + np.asarray(self.altos) / 2
+        return np.broadcast_to(centros_x, (self.filas, self.columnas)), np.broadcast_to(centros_y[:, np.newaxis], (self.filas, self.columnas))
+
+    def etiquetar(self, celdas):
+        """
+        Pinta un mapa de etiquetas (filas x columnas) con la posición de la celda detectada que contiene
+        el centro de cada celda de la malla (la primera en el orden del modelo, con los bordes incluidos),
+        o -1 si ninguna lo contiene.
+
+        Como los centros de la malla están ordenados, el rango de filas y columnas que cubre cada celda
+        detectada se obtiene por búsqueda binaria, y se pinta como un bloque. Las celdas se pintan de la
+        última a la primera para que, si se superponen, quede la primera.
+
+        :param celdas: ModeloCeldas.Celdas detectadas.
+        :return: Matriz de enteros (filas, columnas) con las posiciones de las celdas en el modelo.
+        """
+        etiquetas = np.full((self.filas, self.columnas), -1, dtype=np.int64)
+        if len(celdas) == 0 or etiquetas.size == 0:
+            return etiquetas
+        centros_x = np.asarray(self.lineas_x) + np.asarray(self.anchos) / 2
+        centros_y = np.asarray(self.lineas_y) + np.asarray(self.altos) / 2
+
+        if np.any(np.diff(centros_x) < 0) or np.any(np.diff(centros_y) < 0):
+            # Malla no ordenada (la última línea queda después del borde): búsqueda directa
+            malla_x, malla_y = self.centros()
+            posiciones, encontradas = celdas.buscar(malla_x.ravel(), malla_y.ravel())
+            etiquetas.ravel()[encontradas] = posiciones[encontradas]
+            return etiquetas
+
+        columnas_ini = np.searchsorted(centros_x, celdas.x, side="left").tolist()
+        columnas_fin = np.searchsorted(centros_x, celdas.x + celdas.w, side="right").tolist()
+        filas_ini = np.searchsorted(centros_y, celdas.y, side="left").tolist()
+        filas_fin = np.searchsorted(centros_y, celdas.y + celdas.h, side="right").tolist()
+        for k in range(len(celdas) - 1, -1, -1):
+            etiquetas[filas_ini[k]:filas_fin[k], columnas_ini[k]:columnas_fin[k]] = k
+        return etiquetas
+
+
+def como_cuadricula(cuadricula):
+    """
+    Devuelve la malla como ModeloCeldas.Cuadricula, creándola si se recibe una matriz (lista de listas)
+    de diccionarios con claves "x", "y", "w" y "h".
+    """
+    if isinstance(cuadricula, Cuadricula):
+        return cuadricula
+    if len(cuadricula) == 0 or len(cuadricula[0]) == 0:
+        return Cuadricula([], [], 0, 0)
+    primera_fila = cuadricula[0]
+    primera_columna = [fila[0] for fila in cuadricula]
+    return Cuadricula([celda["x"] for celda in primera_fila], [celda["y"] for celda in primera_columna],
+                      primera_fila[-1]["x"] + primera_fila[-1]["w"], primera_columna[-1]["y"] + primera_columna[-1]["h"])
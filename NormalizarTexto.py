@@ -0,0 +1,211 @@
+"""
+NormalizarTexto.py
+
+Normalización del texto extraído de cada página con reglas precompiladas, compartida por
+PasarTextoPlanoAMarkdown.limpiar_texto y por ObtenerTextoPlano (extraer_texto y combinar_y_fusionar_streams).
+
+Cada cadena de normalización es una lista ordenada de reglas (patrón compilado, reemplazo, literales).
+Los literales son los fragmentos de texto de los que depende la regla: si ninguno aparece en el texto, la
+regla no puede coincidir y se omite sin recorrer el texto con la expresión regular (la búsqueda de una
+subcadena es mucho más rápida que un recorrido del motor de expresiones regulares). Así, por ejemplo, en
+una página sin subrayados, sin "Pagina X" ni encabezados "OFERTA" solo se aplican las reglas necesarias.
+Las reglas sin literales (None) se aplican siempre. La unificación de espacios de ObtenerTextoPlano se hace
+con str.split y str.join en lugar de una expresión regular.
+
+Las reglas compatibles no se fusionan en una sola expresión con una función de reemplazo: la llamada a la
+función en Python por cada coincidencia resulta más lenta que varias sustituciones con plantilla, que se
+resuelven por completo en C.
+
+Las funciones reciben el texto de una página (o de un flujo de contenido) a la vez. La función
+comparar_con_original (y el bloque principal) verifica que las cadenas producen el mismo resultado que las
+expresiones originales y mide el tiempo de ambas, sobre una página de oferta de ejemplo o sobre el texto de
+los PDFs indicados.
+"""
+
+import re
+import sys
+import time
+
+# Reglas de limpiar_texto (texto de página para la conversión a Markdown), en orden
+REGLAS_MARKDOWN = [
+    (re.compile(r'_{2,}'), '', ('__',)),  # Eliminar subrayados repetidos
+    (re.compile(r'\n{2,}'), '\n', ('\n\n',)),  # Reducir saltos de línea
+    (re.compile(r'(Pagina\s\d+)'), r'# \1', ('Pagina',)),  # Convertir "Pagina X" en un encabezado
+    # Encabezados secundarios; equivale a r'\b(OFERTA .+|POLÍTICAS GENERALES)\b', con el límite de palabra inicial
+    # verificado después de la primera letra para que el patrón empiece con un literal (búsqueda más rápida)
+    (re.compile(r'(O(?<!\wO)FERTA .+|P(?<!\wP)OLÍTICAS GENERALES)\b'), r'## \1', ('OFERTA ', 'POLÍTICAS GENERALES')),
+    (re.compile(r'-\s'), r'* ', ('-',)),  # Formatear listas a sintaxis Markdown
+]
+
+# Reglas comunes de ObtenerTextoPlano, en orden. Entre la primera y las siguientes se unifican los espacios
+# (ver unificar_espacios).
+REGLAS_PARENTESIS = [
+    (re.compile(r'\s*\([-0-9.]+\)\s*'), '', ('(',)),  # Eliminar números entre paréntesis
+]
+
+REGLAS_PALABRAS_PEGADAS = [
+    (re.compile(r'(?<! )([A-Za-z])([A-Z])'), r'\1 \2', None),  # Separar palabras pegadas
+]
+
+REGLAS_FLUJO_PDF = REGLAS_PALABRAS_PEGADAS + [
+    (re.compile(r'\b(\w+)\s+\1\b', re.IGNORECASE), r'\1', None),  # Eliminar duplicados consecutivos
+    (re.compile(r'(\d)\s+\.(?=\d)'), r'\1.', ('.',)),  # Corregir separaciones en números
+    (re.compile(r'(\d)\s+(\d)'), r'\1\2', None),
+    (re.compile(r'(\d+)\.\s*'), r'\n\1. ', ('.',)),  # Forzar salto de línea antes de numeraciones
+]
+
+
+def aplicar_reglas(texto, reglas):
+    """
+    Aplica las reglas al texto, en orden, omitiendo las que no pueden coincidir.
+
+    :param texto: Texto de una página o de un flujo de contenido.
+    :param reglas: Lista de (patrón compilado, reemplazo, literales o None).
+    :return: Texto normalizado.
+    """
+    for patron, reemplazo, literales in reglas:
+        if literales is None or any(literal in texto for literal in literales):
+            texto = patron.sub(reemplazo, texto)
+    return texto
+
+
+def unificar_espacios(texto):
+    """
+    Reemplaza cada tramo de espacios por un solo espacio y elimina los de los extremos; equivale a
+    re.sub(r'\\s+', ' ', texto).strip() (\\s y str.isspace reconocen los mismos caracteres), sin
+    recorrer el texto con el motor de expresiones regulares.
+
+    :param texto: Texto a unificar.
+    :return: Texto con los espacios unificados.
+    """
+    return " ".join(texto.split())
+
+
+def normalizar_markdown(texto):
+    """
+    Normaliza el texto de una página para la conversión a Markdown (ver PasarTextoPlanoAMarkdown.limpiar_texto).
+
+    :param texto: Texto de la página.
+    :return: Texto normalizado, sin espacios en los extremos.
+    """
+    return aplicar_reglas(texto, REGLAS_MARKDOWN).strip()
+
+
+def normalizar_pagina_pdf(texto):
+    """
+    Elimina los números entre paréntesis, unifica los espacios y separa las palabras pegadas
+    (ver ObtenerTextoPlano.combinar_y_fusionar_streams).
+
+    :param texto: Texto de la página.
+    :return: Texto normalizado.
+    """
+    texto = unificar_espacios(aplicar_reglas(texto, REGLAS_PARENTESIS))
+    return aplicar_reglas(texto, REGLAS_PALABRAS_PEGADAS)
+
+
+def normalizar_flujo_pdf(texto):
+    """
+    Normaliza el texto de un flujo de contenido: además de normalizar_pagina_pdf, elimina duplicados
+    consecutivos, corrige las separaciones en números y separa las numeraciones en líneas
+    (ver ObtenerTextoPlano.extraer_texto).
+
+    :param texto: Texto del flujo de contenido.
+    :return: Texto normalizado.
+    """
+    texto = unificar_espacios(aplicar_reglas(texto, REGLAS_PARENTESIS))
+    return aplicar_reglas(texto, REGLAS_FLUJO_PDF)
+
+
+# Página de oferta de ejemplo para el micro-benchmark
+PAGINA_OFERTA = """PCAM 1023 CAMPAÑA HBO Y MAX TODO CLARO 12 MESES Y NO TODO CLARO 6 MESES
+AMBOS CON 50 % DE DESCUENTO PARA RED HFC_FTTH Y EN DTH UNIDAD DE MERCADO MASIVO
+Emisión: 23 de mayo de 2017. Vigencia: 1 de marzo de 2025 al 31 de marzo de 2025. Versión: 62.
+Ciudades: HFC_FTTH_DTH. NACIONAL.
+______________________________________________
+
+
+OFERTA HBO MAX 12 MESES CON 50 % DE DESCUENTO
+- Aplica para clientes nuevos y existentes (1) de la red HFC y FTTH.
+- El descuento se mantiene durante 12 meses - no acumulable con otras ofertas.
+- Tarifa plena a partir del mes 13: $ 29.900 IVA incluido.
+POLÍTICAS GENERALES
+- La oferta aplica únicamente para personas naturales.
+- Sujeto a cobertura técnica y disponibilidad (2).
+
+Pagina 3
+"""
+
+
+def _limpiar_texto_original(texto):
+    texto = re.sub(r'_{2,}', '', texto)
+    texto = re.sub(r'\n{2,}', '\n', texto)
+    texto = re.sub(r'(Pagina\s\d+)', r'# \1', texto)
+    texto = re.sub(r'\b(OFERTA .+|POLÍTICAS GENERALES)\b', r'## \1', texto)
+    texto = re.sub(r'-\s', r'* ', texto)
+    return texto.strip()
+
+
+def _pagina_pdf_original(texto):
+    texto = re.sub(r'\s*\([-0-9.]+\)\s*', '', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return re.sub(r'(?<! )([A-Za-z])([A-Z])', r'\1 \2', texto)
+
+
+def _flujo_pdf_original(texto):
+    texto = _pagina_pdf_original(texto)
+    texto = re.sub(r'\b(\w+)\s+\1\b', r'\1', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'(\d)\s+\.(?=\d)', r'\1.', texto)
+    texto = re.sub(r'(\d)\s+(\d)', r'\1\2', texto)
+    return re.sub(r'(\d+)\.\s*', r'\n\1. ', texto)
+
+
+CADENAS = [
+    ("markdown", normalizar_markdown, _limpiar_texto_original),
+    ("pagina_pdf", normalizar_pagina_pdf, _pagina_pdf_original),
+    ("flujo_pdf", normalizar_flujo_pdf, _flujo_pdf_original),
+]
+
+
+def comparar_con_original(textos, repeticiones=20):
+    """
+    Verifica que cada cadena produce el mismo resultado que la secuencia original de re.sub con patrones
+    en línea, y mide el tiempo de ambas versiones.
+
+    :param textos: Lista de textos (por ejemplo, el texto de cada página de un PDF).
+    :param repeticiones: Número de veces que se procesa la lista para medir el tiempo.
+    :return: Diccionario {nombre de la cadena: (textos distintos, segundos originales, segundos con reglas)}.
+    """
+    resultado = {}
+    for nombre, funcion, original in CADENAS:
+        distintos = sum(1 for texto in textos if funcion(texto) != original(texto))
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for texto in textos:
+                original(texto)
+        medio = time.perf_counter()
+        for _ in range(repeticiones):
+            for texto in textos:
+                funcion(texto)
+        fin = time.perf_counter()
+        resultado[nombre] = (distintos, medio - inicio, fin - medio)
+    return resultado
+
+
+# Bloque principal: micro-benchmark sobre la página de oferta de ejemplo o sobre las páginas de los PDFs indicados.
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import pdfplumber
+
+        textos_paginas = []
+        for ruta in sys.argv[1:]:
+            with pdfplumber.open(ruta) as pdf:
+                for page in pdf.pages:
+                    textos_paginas.append(page.extract_text() or "")
+                    page.close()
+    else:
+        textos_paginas = [PAGINA_OFERTA * repeticion for repeticion in (1, 2, 4)] * 30
+    print(f"Páginas: {len(textos_paginas)}, caracteres: {sum(len(texto) for texto in textos_paginas)}")
+    for nombre, (distintos, segundos_original, segundos_reglas) in comparar_con_original(textos_paginas).items():
+        print(f"{nombre}: {distintos} textos distintos, original: {segundos_original:.3f} s, "
+              f"reglas: {segundos_reglas:.3f} s ({segundos_original / max(segundos_reglas, 1e-9):.1f}x)")
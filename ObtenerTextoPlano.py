@@ -4,6 +4,7 @@ import io
 import zlib
 import pdfplumber
 import Config
+import NormalizarTexto
 import os
 import sys
 
@@ -135,22 +136,10 @@ def extraer_texto(decoded_data):
     text_positions.sort(reverse=True, key=lambda x: x[0])
     texto_final = " ".join([text for _, text in text_positions])
     
-    # Aplicar correcciones adicionales al texto resultante:
-    # - Eliminar números entre paréntesis
-    texto_final = re.sub(r'\s*\([-0-9.]+\)\s*', '', texto_final)
-    # - Reemplazar múltiples espacios por uno solo
-    texto_final = re.sub(r'\s+', ' ', texto_final).strip()
-    # - Separar palabras pegadas (por ejemplo, cuando se juntan letras mayúsculas)
-    texto_final = re.sub(r'(?<! )([A-Za-z])([A-Z])', r'\1 \2', texto_final)
-    # - Eliminar duplicados consecutivos
-    texto_final = re.sub(r'\b(\w+)\s+\1\b', r'\1', texto_final, flags=re.IGNORECASE)
-    # - Corregir separaciones en números
-    texto_final = re.sub(r'(\d)\s+\.(?=\d)', r'\1.', texto_final)
-    texto_final = re.sub(r'(\d)\s+(\d)', r'\1\2', texto_final)
-    # - Forzar salto de línea antes de numeraciones
-    texto_final = re.sub(r'(\d+)\.\s*', r'\n\1. ', texto_final)
-
-    return texto_final
+    # Aplicar correcciones adicionales al texto resultante (reglas precompiladas de NormalizarTexto):
+    # eliminar números entre paréntesis, unificar espacios, separar palabras pegadas, eliminar duplicados
+    # consecutivos, corregir separaciones en números y forzar salto de línea antes de numeraciones
+    return NormalizarTexto.normalizar_flujo_pdf(texto_final)
 
 
 def procesar_stream(obj, page_number, key):
@@ -219,10 +208,8 @@ def combinar_y_fusionar_streams(pdf, page):
     
     # Unir el texto extraído de todos los streams y limpiar algunos posibles artefactos
     final_text = " ".join(combined_texts)
-    final_text = re.sub(r'\s*\([-0-9.]+\)\s*', '', final_text)  # Eliminar números entre paréntesis
-    final_text = re.sub(r'\s+', ' ', final_text).strip()
-    final_text = re.sub(r'(?<! )([A-Za-z])([A-Z])', r'\1 \2', final_text)
-    return final_text
+    # Eliminar números entre paréntesis, unificar espacios y separar palabras pegadas
+    return NormalizarTexto.normalizar_pagina_pdf(final_text)
 
 
 def convertir_pdf_a_texto(pdf_bytes, output_txt_path):
@@ -1,5 +1,5 @@
 import re
-import dateparser
+import InterpretarFechas
 from datetime import datetime
 
 def extract_policy_data(title_text, content_text):
@@ -24,7 +24,7 @@ def extract_policy_data(title_text, content_text):
        - "Fecha Vigencia": Se intenta capturar un rango de fechas (vigencia).
 
     4. Normalización de fechas:
-       - Se utiliza el módulo dateparser para interpretar las fechas extraídas y convertirlas 
+       - Se utiliza InterpretarFechas (con dateparser como respaldo) para interpretar las fechas extraídas y convertirlas 
          al formato "dd de Month de yyyy" (en español).
 
     5. Formateo final:
@@ -74,7 +74,7 @@ def extract_policy_data(title_text, content_text):
     # 7. Normalizar las fechas extraídas para los campos "Emisión" y "Fecha Vigencia"
     for key in ["Emisión", "Fecha Vigencia"]:
         if data[key] != "Desconocida":
-            parsed_date = dateparser.parse(data[key], languages=['es'])
+            parsed_date = InterpretarFechas.interpretar_fecha(data[key])
             if parsed_date:
                 data[key] = parsed_date.strftime("%d de %B de %Y")
     
@@ -1,22 +1,25 @@
 import pdfplumber
+import fitz  # PyMuPDF
 import os
 import io
 import Config
 import sys
 import re
-import pypandoc
+import ConvertidorPandoc
+import InterpretarFechas
+import NormalizarTexto
+import ExtraerTextoPyMuPDF
 import RemplazarTablasDeMarkdown
-# pypandoc.download_pandoc()
-try:
-    # Intenta obtener la ruta de Pandoc. Si no se encuentra, lo descarga.
-    pypandoc.get_pandoc_path()
-except OSError:
-    print("[INFO] Pandoc no encontrado, descargando...")
-    pypandoc.download_pandoc()
-
-import dateparser
+import RemplazarImagenesDeMarkdown
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from datetime import datetime
 
+# PDF, motor y opción de negrilla de cada proceso de extracción de texto (ver iniciar_proceso_extraccion)
+_pdf_proceso = None
+_motor_proceso = None
+
 def extract_header_data(content_text):
     """
     Extrae información del encabezado de un documento a partir de un bloque de texto.
@@ -28,7 +31,7 @@ def extract_header_data(content_text):
       - Se buscan y extraen los valores de "Para", "De" y "Asunto" mediante expresiones regulares.
       - Se asigna "Nombre" al valor de "Asunto".
       - Se busca y extrae el campo "Fecha Vigencia".
-      - Se normalizan las fechas de vigencia utilizando el módulo dateparser, formateándolas en "dd de Month de yyyy".
+      - Se normalizan las fechas de vigencia con InterpretarFechas (dateparser como respaldo), formateándolas en "dd de Month de yyyy".
       - Se generan dos cadenas en formato Markdown: un título y un cuerpo de contenido.
     
     :param content_text: Cadena de texto que se utiliza como contenido del encabezado.
@@ -74,11 +77,11 @@ def extract_header_data(content_text):
         data["Fecha Vigencia"] = match.group(1).strip()
         content_text = content_text.replace(match.group(0), '', 1)
     
-    # Normalizar la fecha de vigencia, si se extrajo, utilizando dateparser
+    # Normalizar la fecha de vigencia, si se extrajo (InterpretarFechas, con dateparser como respaldo)
     if data["Fecha Vigencia"] != "Desconocida":
         date_matches = re.findall(r'\d{1,2}\s*de\s*[a-zA-Z]+\s*de\s*\d{4}', data["Fecha Vigencia"])
         if date_matches and len(date_matches) == 2:
-            formatted_dates = [dateparser.parse(date, languages=['es']).strftime("%d de %B de %Y") for date in date_matches]
+            formatted_dates = [InterpretarFechas.interpretar_fecha(date).strftime("%d de %B de %Y") for date in date_matches]
             data["Fecha Vigencia"] = f"{formatted_dates[0]} al {formatted_dates[1]}"
     
     # Formatear la salida en Markdown: se genera un título y se listan los campos con negritas.
@@ -134,10 +137,10 @@ def extract_policy_data(title_text, content_text):
         if match:
             data[key] = match.group(1).strip()
     
-    # Normalizar las fechas para "Emisión" y "Fecha Vigencia" usando dateparser
+    # Normalizar las fechas para "Emisión" y "Fecha Vigencia" (InterpretarFechas, con dateparser como respaldo)
     for key in ["Emisión", "Fecha Vigencia"]:
         if data[key] != "Desconocida":
-            parsed_date = dateparser.parse(data[key], languages=['es'])
+            parsed_date = InterpretarFechas.interpretar_fecha(data[key])
             if parsed_date:
                 data[key] = parsed_date.strftime("%d de %B de %Y")
     
@@ -148,36 +151,131 @@ def extract_policy_data(title_text, content_text):
     return markdown_title_output, markdown_title_content
 
 
-def convertir_pdf_a_markdown(pdf_bytes):
+def abrir_pdf_texto(datos_pdf, motor):
     """
-    Convierte un PDF a texto en formato Markdown.
+    Abre el PDF con el motor de extracción de texto indicado.
+
+    :param datos_pdf: Bytes del PDF.
+    :param motor: "pdfplumber" o "pymupdf" (ver Config.MOTOR_TEXTO).
+    :return: Documento abierto (pdfplumber.PDF o fitz.Document), utilizable como gestor de contexto.
+    """
+    if motor == "pymupdf":
+        return fitz.open(stream=datos_pdf, filetype="pdf")
+    return pdfplumber.open(io.BytesIO(datos_pdf))
+
+
+def extraer_texto_pagina(pdf, indice, motor, negrilla=False):
+    """
+    Extrae el texto de una página del PDF abierto con abrir_pdf_texto.
+
+    :param pdf: Documento abierto.
+    :param indice: Índice de la página.
+    :param motor: Motor con el que se abrió el documento.
+    :param negrilla: Con PyMuPDF, marcar en Markdown ('**') el texto en negrilla.
+    :return: Texto de la página (None o cadena vacía si no tiene texto).
+    """
+    if motor == "pymupdf":
+        return ExtraerTextoPyMuPDF.texto_pagina(pdf[indice], negrilla)
+    page = pdf.pages[indice]
+    text = page.extract_text()
+    page.close()  # Liberar los objetos de la página ya procesada
+    return text
+
+
+def iniciar_proceso_extraccion(datos_pdf, motor, negrilla):
+    """
+    Inicializa un proceso de extracción de texto: abre el PDF una sola vez para todas sus tareas.
+
+    :param datos_pdf: Bytes del PDF.
+    :param motor: Motor de extracción de texto.
+    :param negrilla: Marcar el texto en negrilla (ver extraer_texto_pagina).
+    """
+    global _pdf_proceso, _motor_proceso
+    _pdf_proceso = abrir_pdf_texto(datos_pdf, motor)
+    _motor_proceso = (motor, negrilla)
+
+
+def extraer_rango_paginas(inicio, fin):
+    """
+    Extrae el texto de un rango de páginas con el PDF abierto por el proceso.
+
+    :param inicio: Índice de la primera página del rango.
+    :param fin: Índice siguiente a la última página del rango.
+    :return: Lista con el texto de cada página del rango.
+    """
+    return [extraer_texto_pagina(_pdf_proceso, indice, *_motor_proceso) for indice in range(inicio, fin)]
+
+
+def textos_paginas(pdf_bytes):
+    """
+    Extrae el texto de cada página del PDF, en orden de página, con el motor de Config.MOTOR_TEXTO
+    (pdfplumber o PyMuPDF, ver ExtraerTextoPyMuPDF).
+
+    Si el documento tiene al menos Config.PAGINAS_MINIMAS_EXTRACCION_PARALELA páginas y hay más de un
+    proceso disponible (Config.PROCESOS_EXTRACCION_TEXTO), las páginas se reparten en rangos de
+    Config.PAGINAS_POR_TAREA_EXTRACCION entre varios procesos, cada uno con su propia copia del PDF
+    abierta una sola vez. Los rangos se entregan en orden a medida que terminan, de modo que las
+    primeras páginas (y el encabezado) se procesan sin esperar al resto del documento. Si los procesos
+    no se pueden usar, las páginas restantes se extraen en el proceso actual.
 
-    Procedimiento:
-      1. Se reinicia el flujo de pdf_bytes y se crea una copia como BytesIO.
-      2. Se abre el PDF usando pdfplumber.
-      3. Se itera sobre las páginas del PDF, extrayendo el texto de cada página.
-      4. Para las primeras páginas, se utiliza el encabezado para extraer información (por ejemplo, mediante extract_policy_data).
-         En modo no móvil se toma la información de las dos primeras páginas; en modo móvil se trata de forma diferente.
-      5. Se utiliza Pandoc para convertir el texto extraído a Markdown (para páginas a partir de la segunda).
-      6. Finalmente, se devuelve el texto completo en Markdown.
-    
     :param pdf_bytes: Objeto BytesIO que contiene el PDF.
-    :return: String con el contenido del PDF convertido a Markdown.
+    :return: Generador del texto de cada página (None si la página no tiene texto).
     """
     pdf_bytes.seek(0)
-    pdf_copy = io.BytesIO(pdf_bytes.getvalue())
-    pdf = pdfplumber.open(pdf_copy)
+    datos_pdf = pdf_bytes.getvalue()
+    motor = Config.MOTOR_TEXTO
+    negrilla = Config.NEGRILLA_MOTOR_TEXTO
+    siguiente = 0  # Primera página aún no entregada
+
+    with abrir_pdf_texto(datos_pdf, motor) as pdf:
+        total_paginas = pdf.page_count if motor == "pymupdf" else len(pdf.pages)
+        tamano_tarea = max(1, Config.PAGINAS_POR_TAREA_EXTRACCION)
+        procesos = min(Config.PROCESOS_EXTRACCION_TEXTO, -(-total_paginas // tamano_tarea))
+
+        if procesos > 1 and total_paginas >= Config.PAGINAS_MINIMAS_EXTRACCION_PARALELA:
+            try:
+                with ProcessPoolExecutor(max_workers=procesos, initializer=iniciar_proceso_extraccion,
+                                         initargs=(datos_pdf, motor, negrilla)) as ejecutor:
+                    futuros = [ejecutor.submit(extraer_rango_paginas, inicio, min(inicio + tamano_tarea, total_paginas))
+                               for inicio in range(0, total_paginas, tamano_tarea)]
+                    for futuro in futuros:
+                        for text in futuro.result():
+                            siguiente += 1
+                            yield text
+            except (BrokenProcessPool, OSError) as e:
+                if Config.DEBUG_PRINTS:
+                    print(f"No se pudo extraer el texto en paralelo, se continúa en serie desde la página {siguiente + 1}: {e}")
+
+        for indice in range(siguiente, total_paginas):
+            yield extraer_texto_pagina(pdf, indice, motor, negrilla)
+
+
+def paginas_markdown(pdf_bytes):
+    """
+    Genera el contenido Markdown del PDF página a página.
+
+    Procedimiento:
+      1. Se obtiene el texto de cada página, en orden (textos_paginas). En documentos largos el texto se
+         extrae en paralelo, y cada página se procesa apenas están listas ella y las anteriores.
+      2. Para las primeras páginas, se utiliza el encabezado para extraer información (por ejemplo, mediante extract_policy_data).
+         En modo no móvil se toma la información de las dos primeras páginas; en modo móvil se trata de forma diferente.
+      3. Se utiliza Pandoc para convertir el texto extraído a Markdown (para páginas a partir de la segunda).
+         Las páginas se convierten en lotes de Config.PAGINAS_POR_LOTE_MARKDOWN, cada uno en una sola
+         invocación de Pandoc (ConvertidorPandoc.convertir_lote), y se entregan en orden al terminar cada lote.
 
-    markdown_text = ""
+    :param pdf_bytes: Objeto BytesIO que contiene el PDF.
+    :return: Generador de cadenas Markdown (el encabezado y cada página convertida), en orden.
+    """
+    # Segmentos del lote actual en orden: (texto, True si se debe convertir con Pandoc)
+    segmentos = []
     encabezado = []
 
-    for i, page in enumerate(pdf.pages):
-        text = page.extract_text()
+    for i, text in enumerate(textos_paginas(pdf_bytes)):
         if Config.DEBUG_PRINTS:
             print("--" * 50)
             print("Texto extraido\n")
             print("--" * 50)
-        
+
         if text:
             # Preprocesar el texto extraído antes de convertirlo a Markdown
             text = limpiar_texto(text)
@@ -188,26 +286,53 @@ def convertir_pdf_a_markdown(pdf_bytes):
                 if i == 1:
                     # Obtener datos de política a partir del encabezado
                     title, content = extract_policy_data(encabezado[0], encabezado[1])
-                    markdown_text += f"{title}\r\n\n\n{content}\n\n"
+                    segmentos.append((f"{title}\r\n\n\n{content}\n\n", False))
             else:
                 # En modo móvil, se utiliza extract_header_data (definida en otro módulo) para extraer encabezado
                 if i == 0:
                     if Config.DEBUG_PRINTS:
                         print(text)
                     title, content = extract_header_data(text)
-                    markdown_text += f"{title}\r\n\n\n{content}\n\n"
+                    segmentos.append((f"{title}\r\n\n\n{content}\n\n", False))
                 elif i == 1:
-                    markdown_text += pypandoc.convert_text(text, 'md', format='markdown')
-            
+                    segmentos.append((text, True))
+
             if i > 1:
                 # Para el resto de las páginas, convertir directamente a Markdown usando Pandoc
-                markdown_text += pypandoc.convert_text(text, 'md', format='markdown')
-                if Config.DEBUG_PRINTS:
-                    print("--" * 50)
-                    print("Texto MD\n", markdown_text.encode("utf-8", errors="ignore").decode("utf-8"))
-                    print("--" * 50)
+                segmentos.append((text, True))
+
+        if sum(convertir for _, convertir in segmentos) >= Config.PAGINAS_POR_LOTE_MARKDOWN:
+            yield from convertir_segmentos(segmentos)
+            segmentos = []
+
+    yield from convertir_segmentos(segmentos)
+
+
+def convertir_segmentos(segmentos):
+    """
+    Convierte con Pandoc, en un solo lote, los segmentos pendientes y los entrega en orden.
+
+    :param segmentos: Lista de tuplas (texto, True si se debe convertir con Pandoc).
+    :return: Generador de cadenas Markdown.
+    """
+    convertidos = iter(ConvertidorPandoc.convertir_lote([texto for texto, convertir in segmentos if convertir]))
+    for texto, convertir in segmentos:
+        markdown = next(convertidos) if convertir else texto
+        if Config.DEBUG_PRINTS:
+            print("--" * 50)
+            print("Texto MD\n", markdown.encode("utf-8", errors="ignore").decode("utf-8"))
+            print("--" * 50)
+        yield markdown
+
 
-    return markdown_text
+def convertir_pdf_a_markdown(pdf_bytes):
+    """
+    Convierte un PDF a texto en formato Markdown (el documento completo, ver paginas_markdown).
+
+    :param pdf_bytes: Objeto BytesIO que contiene el PDF.
+    :return: String con el contenido del PDF convertido a Markdown.
+    """
+    return "".join(paginas_markdown(pdf_bytes))
 
 
 def limpiar_texto(texto):
@@ -224,41 +349,60 @@ def limpiar_texto(texto):
     :param texto: Cadena de texto extraída del PDF.
     :return: Texto preprocesado listo para conversión a Markdown.
     """
-    texto = re.sub(r'_{2,}', '', texto)  # Eliminar subrayados repetidos
-    texto = re.sub(r'\n{2,}', '\n', texto)  # Reducir saltos de línea
-    texto = re.sub(r'(Pagina\s\d+)', r'# \1', texto)  # Convertir "Pagina X" en un encabezado
-    texto = re.sub(r'\b(OFERTA .+|POLÍTICAS GENERALES)\b', r'## \1', texto)  # Encabezados secundarios
-    texto = re.sub(r'-\s', r'* ', texto)  # Formatear listas a sintaxis Markdown
-    return texto.strip()
+    # Reglas precompiladas; se omiten las que no pueden coincidir en la página (ver NormalizarTexto)
+    return NormalizarTexto.normalizar_markdown(texto)
+
+
+def escribir_segmentos(segmentos, archivo):
+    """
+    Escribe cada segmento en el archivo a medida que pasa y lo entrega a la etapa siguiente.
+
+    :param segmentos: Iterable de cadenas de Markdown.
+    :param archivo: Archivo abierto en modo texto.
+    :return: Generador de los mismos segmentos.
+    """
+    for segmento in segmentos:
+        archivo.write(segmento)
+        yield segmento
 
 
-def main(pdf_bytes, folder_path):
+def main(pdf_bytes, folder_path, tablas_markdown=None):
     """
     Función principal para procesar un PDF y convertir su contenido a Markdown.
-    
-    Se obtiene el contenido en Markdown mediante convertir_pdf_a_markdown y luego se guarda
-    en dos archivos:
+
+    El Markdown se genera página a página (paginas_markdown) y cada página pasa por las etapas
+    siguientes antes de procesar la próxima, escribiéndose en cada archivo a medida que avanza:
       - "markdown_puro.md": Contenido Markdown sin separar por líneas.
       - "markdown_tablas_remplazadas.md": Versión del Markdown después de reemplazar las tablas.
-    
+      - "markdown_imagenes_remplazadas.md": Versión final, después de reemplazar además los textos de las
+        imágenes (de la carpeta "imagenes_extraidas", que debe estar completa antes de llamar a main).
+
     :param pdf_bytes: Objeto BytesIO del PDF a procesar.
     :param folder_path: Ruta de la carpeta donde se guardarán los archivos resultantes.
-    :return: Markdown final con las tablas reemplazadas.
+    :param tablas_markdown: Diccionario {llave única: Markdown de la tabla} generado en memoria por la etapa
+                            de tablas. Si no se recibe, las tablas se convierten desde los HTML de "tablas_html"
+                            (o de "tablas_html.zip").
+    :return: Ruta del archivo con el Markdown final.
     """
-    markdown_result = convertir_pdf_a_markdown(pdf_bytes)
-    # Guardar versión "pura" en un archivo
-    with open(os.path.join(folder_path, "markdown_puro.md"), 'w', encoding='utf-8') as f:
-        f.write("".join(markdown_result.split("\n")))
-    # Si existe una carpeta de tablas HTML, se procede al reemplazo en el Markdown
-    if os.path.exists(os.path.join(folder_path, "tablas_html")):
-        markdown_result_tablas_remplazadas = RemplazarTablasDeMarkdown.remplazar_tablas_en_md("".join(markdown_result.split("\n")), folder_path)
-    else:
-        markdown_result_tablas_remplazadas = "".join(markdown_result.split("\n"))
-    # Guardar la versión final con las tablas reemplazadas
-    with open(os.path.join(folder_path, "markdown_tablas_remplazadas.md"), 'w', encoding='utf-8') as f:
-        f.write(markdown_result_tablas_remplazadas)
-    
-    return markdown_result_tablas_remplazadas
+    ruta_final = os.path.join(folder_path, "markdown_imagenes_remplazadas.md")
+    with open(os.path.join(folder_path, "markdown_puro.md"), 'w', encoding='utf-8') as f_puro, \
+            open(os.path.join(folder_path, "markdown_tablas_remplazadas.md"), 'w', encoding='utf-8') as f_tablas, \
+            open(ruta_final, 'w', encoding='utf-8') as f_final:
+        # Versión "pura": cada página sin separar por líneas
+        segmentos = escribir_segmentos(("".join(pagina.split("\n")) for pagina in paginas_markdown(pdf_bytes)), f_puro)
+        # Reemplazar las tablas con el Markdown en memoria o, si no se recibió, desde la carpeta de tablas HTML
+        if tablas_markdown is not None:
+            segmentos = RemplazarTablasDeMarkdown.remplazar_tablas_en_flujo(segmentos, folder_path, tablas_markdown)
+        elif os.path.exists(os.path.join(folder_path, "tablas_html")) or os.path.exists(os.path.join(folder_path, "tablas_html.zip")):
+            segmentos = RemplazarTablasDeMarkdown.remplazar_tablas_en_flujo(segmentos, folder_path)
+        segmentos = escribir_segmentos(segmentos, f_tablas)
+        # Reemplazar los textos de las imágenes
+        if os.path.exists(folder_path + r"\imagenes_extraidas"):
+            segmentos = RemplazarImagenesDeMarkdown.remplazar_imagenes_en_flujo(segmentos, folder_path)
+        for segmento in segmentos:
+            f_final.write(segmento)
+
+    return ruta_final
 
 
 def pdfplumber_to_fitz(pdf):
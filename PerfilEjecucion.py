@@ -0,0 +1,98 @@
+"""
+PerfilEjecucion.py
+
+Perfil de ejecución del proceso de curación: acumula el tiempo consumido por cada etapa y los
+eventos relevantes (por ejemplo, la decisión del prefiltro de tablas en cada página) para poder
+revisar al final de la ejecución dónde se gastó el tiempo.
+
+El perfil se guarda como 'perfil_ejecucion.json' en la carpeta de resultados.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import Config
+
+_tiempos = {}   # etapa -> {"segundos": total acumulado, "llamadas": número de mediciones}
+_eventos = []   # Lista de diccionarios con los eventos registrados, en orden
+
+
+def reiniciar():
+    """
+    Descarta todos los tiempos y eventos acumulados (inicio de una nueva ejecución).
+    """
+    _tiempos.clear()
+    _eventos.clear()
+
+
+def acumular(etapa, segundos):
+    """
+    Suma un tiempo medido a la etapa indicada.
+
+    :param etapa: Nombre de la etapa.
+    :param segundos: Tiempo consumido, en segundos.
+    """
+    datos = _tiempos.setdefault(etapa, {"segundos": 0.0, "llamadas": 0})
+    datos["segundos"] += segundos
+    datos["llamadas"] += 1
+
+
+@contextmanager
+def medir(etapa):
+    """
+    Context manager que mide el tiempo del bloque y lo acumula en la etapa indicada.
+
+    :param etapa: Nombre de la etapa.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        acumular(etapa, time.perf_counter() - inicio)
+
+
+def registrar(etapa, **datos):
+    """
+    Registra un evento puntual (decisiones, contadores, etc.) asociado a una etapa.
+
+    :param etapa: Nombre de la etapa.
+    :param datos: Datos del evento (deben ser serializables en JSON).
+    """
+    evento = {"etapa": etapa}
+    evento.update(datos)
+    _eventos.append(evento)
+
+
+def resumen():
+    """
+    Construye el resumen del perfil.
+
+    :return: Diccionario con los tiempos por etapa (ordenados de mayor a menor) y los eventos.
+    """
+    tiempos = {
+        etapa: {"segundos": round(datos["segundos"], 6), "llamadas": datos["llamadas"]}
+        for etapa, datos in sorted(_tiempos.items(), key=lambda item: item[1]["segundos"], reverse=True)
+    }
+    return {"tiempos": tiempos, "eventos": list(_eventos)}
+
+
+def guardar(folder_path):
+    """
+    Guarda el perfil en 'perfil_ejecucion.json' dentro de la carpeta indicada.
+
+    :param folder_path: Carpeta de resultados.
+    :return: Ruta del archivo generado, o None si el perfil está desactivado.
+    """
+    if not Config.PERFIL_EJECUCION:
+        return None
+    datos = resumen()
+    ruta = os.path.join(folder_path, "perfil_ejecucion.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    if Config.DEBUG_PRINTS:
+        for etapa, tiempo in datos["tiempos"].items():
+            print(f"{etapa}: {tiempo['segundos']:.3f} s ({tiempo['llamadas']} llamadas)")
+        print(f"Perfil de ejecución guardado en: {ruta}")
+    return ruta
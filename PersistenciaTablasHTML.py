@@ -0,0 +1,97 @@
+"""
+PersistenciaTablasHTML.py
+
+Escritura del HTML de las tablas detectadas fuera del bucle de detección.
+
+El HTML de cada tabla se guarda para revisión (y como fuente alternativa del Markdown de las tablas,
+ver RemplazarTablasDeMarkdown). En lugar de abrir y escribir un archivo por tabla dentro del bucle, las
+tablas se entregan a un hilo de escritura, de acuerdo con Config.PERSISTENCIA_TABLAS:
+  - "archivos": un archivo "tabla_<página>_<n>.html" por tabla en la carpeta "tablas_html", como antes,
+    escrito por el hilo mientras continúa la detección.
+  - "lote": todas las tablas de la ejecución se escriben juntas al final, en el archivo comprimido
+    "tablas_html.zip" (una entrada "tabla_<página>_<n>.html" por tabla, con el índice del propio ZIP).
+
+Si una tabla se vuelve a guardar (por ejemplo, al volver a una página), la última versión reemplaza a la anterior.
+"""
+
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import Config
+import RenderizarTablaHTML as RtHTML
+
+# Archivo comprimido con las tablas de la ejecución (modo "lote"), dentro de la carpeta de resultados
+ARCHIVO_LOTE = "tablas_html.zip"
+
+
+def escribir_lote(ruta_archivo, tablas):
+    """
+    Escribe todas las tablas en un archivo ZIP, una entrada HTML por tabla.
+
+    :param ruta_archivo: Ruta del archivo ZIP.
+    :param tablas: Diccionario {nombre del archivo sin extensión: estructura de la tabla}.
+    """
+    ruta_temporal = ruta_archivo + ".tmp"
+    with zipfile.ZipFile(ruta_temporal, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        for nombre, tabla in tablas.items():
+            with archivo.open(nombre + ".html", "w") as entrada, \
+                    io.TextIOWrapper(entrada, encoding="utf-8", newline="") as texto:
+                texto.writelines(RtHTML.fragmentos_html_tabla(tabla))
+    # Reemplazar el archivo anterior solo cuando el nuevo está completo
+    os.replace(ruta_temporal, ruta_archivo)
+
+
+class PersistenciaTablas:
+    """
+    Guarda el HTML de las tablas de una ejecución con un hilo de escritura (ver el encabezado del módulo).
+    """
+
+    def __init__(self, folder_path, modo=None):
+        """
+        :param folder_path: Carpeta de resultados de la ejecución.
+        :param modo: "archivos" o "lote" (por defecto, Config.PERSISTENCIA_TABLAS).
+        """
+        self.folder_path = folder_path
+        self.modo = modo or Config.PERSISTENCIA_TABLAS
+        self.path_tablas = os.path.join(folder_path, "tablas_html")
+        self.tablas = {}  # Modo "lote": nombre -> estructura, en orden de primer registro
+        self.ejecutor = ThreadPoolExecutor(max_workers=1)  # Un solo hilo: las escrituras se hacen en orden
+        self.futuros = []
+
+    def guardar(self, tabla, tabla_actual):
+        """
+        Registra una tabla para guardarla. La estructura no se debe modificar después de registrarla.
+
+        :param tabla: Estructura de la tabla (lista de listas de celdas).
+        :param tabla_actual: Identificador de la tabla (por ejemplo, la ruta de su recorte), del que se
+                             obtiene el nombre del archivo.
+        """
+        if self.modo == "lote":
+            nombre = RtHTML.nombre_archivo_tabla(tabla_actual)
+            self.tablas[nombre] = tabla
+            return
+
+        os.makedirs(self.path_tablas, exist_ok=True)
+        self.futuros.append(self.ejecutor.submit(RtHTML.guardar_tabla, tabla, tabla_actual, self.folder_path, self.path_tablas))
+
+    def finalizar(self):
+        """
+        Cierra el registro de tablas. En modo "lote" encola la escritura del archivo con todas las tablas.
+        No espera a que terminen las escrituras (ver esperar).
+        """
+        if self.modo == "lote" and self.tablas:
+            ruta_archivo = os.path.join(self.folder_path, ARCHIVO_LOTE)
+            self.futuros.append(self.ejecutor.submit(escribir_lote, ruta_archivo, dict(self.tablas)))
+            if Config.DEBUG_PRINTS:
+                print(f"{len(self.tablas)} tablas en cola para guardarse en: {ruta_archivo}")
+        self.ejecutor.shutdown(wait=False)
+
+    def esperar(self):
+        """
+        Espera a que terminen todas las escrituras encoladas. Si alguna falló, se propaga su excepción.
+        """
+        for futuro in self.futuros:
+            futuro.result()
+        self.futuros.clear()
@@ -0,0 +1,147 @@
+"""
+PrefiltroDeTablas.py
+
+Prefiltro barato para decidir si una página puede contener una tabla con líneas (ruled table)
+antes de ejecutar el análisis completo de pdfplumber (layout + find_tables).
+
+Se recorre el flujo de contenido de la página con pikepdf (sin construir el layout) y se cuentan
+los segmentos horizontales y verticales que efectivamente se dibujan: líneas de trayectos (m/l/h)
+y rectángulos (re), aplicando la matriz de transformación (cm, q/Q) y entrando en los XObjects de
+formulario. Una página sin al menos dos segmentos horizontales y dos verticales no puede formar
+una cuadrícula, por lo que la detección de tablas se omite.
+"""
+
+import pikepdf
+
+import Config
+
+# Operadores que pintan el trayecto actual (trazo y/o relleno)
+OPERADORES_PINTAR = {"S", "s", "f", "F", "f*", "B", "B*", "b", "b*"}
+
+
+def multiplicar_matrices(m1, m2):
+    """
+    Multiplica dos matrices afines en notación PDF [a b c d e f] (m1 x m2).
+    """
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + b1 * c2, a1 * b2 + b1 * d2,
+            c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+            e1 * a2 + f1 * c2 + e2, e1 * b2 + f1 * d2 + f2)
+
+
+def transformar_punto(ctm, x, y):
+    """
+    Aplica la matriz ctm al punto (x, y).
+    """
+    a, b, c, d, e, f = ctm
+    return a * x + c * y + e, b * x + d * y + f
+
+
+def contar_segmentos(page, minimo=2, tolerancia=1, longitud_minima=3):
+    """
+    Cuenta los segmentos horizontales y verticales dibujados en la página (incluyendo XObjects de formulario).
+
+    El recorrido se detiene en cuanto se alcanzan 'minimo' segmentos de cada orientación.
+
+    :param page: Página de pikepdf.
+    :param minimo: Número de segmentos de cada orientación a partir del cual se deja de contar
+                   (None para contar todos los segmentos de la página).
+    :param tolerancia: Desviación máxima (en puntos) para considerar un segmento horizontal o vertical.
+    :param longitud_minima: Longitud mínima (en puntos) de un segmento para contarlo.
+    :return: Tuple (horizontales, verticales).
+    """
+    conteo = {"h": 0, "v": 0}
+    visitados = set()  # XObjects de formulario en la pila de recorrido actual
+
+    def agregar_segmento(p0, p1):
+        dx, dy = abs(p1[0] - p0[0]), abs(p1[1] - p0[1])
+        if dy <= tolerancia and dx >= longitud_minima:
+            conteo["h"] += 1
+        elif dx <= tolerancia and dy >= longitud_minima:
+            conteo["v"] += 1
+
+    def suficiente():
+        return minimo is not None and conteo["h"] >= minimo and conteo["v"] >= minimo
+
+    def recorrer(objeto, recursos, ctm):
+        pila = []
+        segmentos = []          # Segmentos del trayecto actual (en coordenadas de página)
+        actual = inicio = None  # Punto actual e inicio del subtrayecto (en coordenadas de usuario)
+        for instruccion in pikepdf.parse_content_stream(objeto):
+            operador = str(instruccion.operator)
+            operandos = instruccion.operands
+            try:
+                if operador == "q":
+                    pila.append(ctm)
+                elif operador == "Q":
+                    if pila:
+                        ctm = pila.pop()
+                elif operador == "cm":
+                    ctm = multiplicar_matrices(tuple(float(v) for v in operandos), ctm)
+                elif operador == "m":
+                    actual = inicio = (float(operandos[0]), float(operandos[1]))
+                elif operador == "l":
+                    punto = (float(operandos[0]), float(operandos[1]))
+                    if actual is not None:
+                        segmentos.append((transformar_punto(ctm, *actual), transformar_punto(ctm, *punto)))
+                    actual = punto
+                elif operador in ("c", "v", "y"):
+                    actual = (float(operandos[-2]), float(operandos[-1]))
+                elif operador == "h":
+                    if actual is not None and inicio is not None:
+                        segmentos.append((transformar_punto(ctm, *actual), transformar_punto(ctm, *inicio)))
+                    actual = inicio
+                elif operador == "re":
+                    x, y, w, h = (float(v) for v in operandos)
+                    esquinas = [transformar_punto(ctm, *p) for p in ((x, y), (x + w, y), (x + w, y + h), (x, y + h))]
+                    segmentos.extend(zip(esquinas, esquinas[1:] + esquinas[:1]))
+                    actual = inicio = (x, y)
+                elif operador in OPERADORES_PINTAR:
+                    for p0, p1 in segmentos:
+                        agregar_segmento(p0, p1)
+                    segmentos = []
+                    if suficiente():
+                        return
+                elif operador == "n":
+                    segmentos = []
+                elif operador == "Do":
+                    xobjects = recursos.get("/XObject") if recursos is not None else None
+                    xobj = xobjects.get(str(operandos[0])) if xobjects is not None else None
+                    if xobj is None or xobj.get("/Subtype") != "/Form" or xobj.objgen in visitados:
+                        continue
+                    # Solo se evita la recursión cíclica; un mismo formulario puede dibujarse varias veces
+                    visitados.add(xobj.objgen)
+                    matriz = xobj.get("/Matrix")
+                    ctm_form = ctm if matriz is None else multiplicar_matrices(tuple(float(v) for v in matriz), ctm)
+                    recorrer(xobj, xobj.get("/Resources", recursos), ctm_form)
+                    visitados.discard(xobj.objgen)
+                    if suficiente():
+                        return
+            except (ValueError, TypeError, IndexError):
+                # Operandos mal formados: se ignora la instrucción
+                continue
+
+    recorrer(page, page.get("/Resources"), (1, 0, 0, 1, 0, 0))
+    return conteo["h"], conteo["v"]
+
+
+def pagina_puede_tener_tablas(page, minimo=2, contar_todos=False):
+    """
+    Indica si la página puede contener una tabla con líneas.
+
+    Ante cualquier error al leer el flujo de contenido se devuelve True, para no omitir tablas.
+
+    :param page: Página de pikepdf.
+    :param minimo: Número mínimo de segmentos horizontales y verticales necesarios.
+    :param contar_todos: Si es True se cuentan todos los segmentos de la página en lugar de detenerse al
+                         alcanzar el mínimo (para reutilizar el conteo, ver LocalizarTablasRaster.elegir_motor).
+    :return: Tuple (candidata, horizontales, verticales).
+    """
+    try:
+        horizontales, verticales = contar_segmentos(page, minimo=None if contar_todos else minimo)
+    except pikepdf.PdfError as e:
+        if Config.DEBUG_PRINTS:
+            print(f"No se pudo analizar el contenido de la página para el prefiltro: {e}")
+        return True, None, None
+    return horizontales >= minimo and verticales >= minimo, horizontales, verticales
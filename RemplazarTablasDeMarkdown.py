@@ -1,126 +1,164 @@
 import os
+import zipfile
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 import markdownify
 import Config
+import SustituirLlavesMarkdown
 
 import os
 from bs4 import BeautifulSoup
 
-def limpiar_tablas_combinadas(html_content):
+# Número máximo de tablas convertidas que se memorizan (se descartan primero las más antiguas)
+MEMO_MAXIMO = 4096
+
+_memo = {}
+
+
+@lru_cache(maxsize=None)
+def parser_disponible(parser):
     """
-    Recibe una cadena de contenido HTML y devuelve el mismo contenido modificado,
-    de forma que se "descombinan" las celdas de las tablas que tienen atributos rowspan/colspan.
-    
+    Verifica que el parser de BeautifulSoup indicado se pueda usar. "lxml" es opcional: si no está
+    instalado, se usa "html.parser" (el de la biblioteca estándar).
+
+    :param parser: Nombre del parser ("html.parser" o "lxml", ver Config.PARSER_HTML_TABLAS).
+    :return: Nombre del parser a usar.
+    """
+    if parser == "lxml" and importlib.util.find_spec("lxml") is None:
+        if Config.DEBUG_PRINTS:
+            print("lxml no está instalado, las tablas se leen con html.parser")
+        return "html.parser"
+    return parser
+
+
+def descombinar_tablas(soup):
+    """
+    Modifica el documento de forma que se "descombinan" las celdas de las tablas que tienen atributos rowspan/colspan.
+
     Para ello, se sigue el siguiente procedimiento:
-      1. Se parsea el HTML utilizando BeautifulSoup.
-      2. Se buscan todas las tablas (<table>).
-      3. Para cada tabla, se obtienen las filas (<tr>) de primer nivel (sin recursión).
-      4. Se calcula el número máximo de columnas de la tabla, considerando el atributo colspan de cada celda.
-      5. Se crea una matriz (lista de listas) que representa la tabla expandida; cada sublista corresponde a una fila.
-      6. Se recorren las filas originales y se colocan las celdas en la matriz respetando los valores de rowspan y colspan,
+      1. Se buscan todas las tablas (<table>).
+      2. Para cada tabla, se obtienen las filas (<tr>) de primer nivel (sin recursión), incluidas las de sus
+         secciones <thead>, <tbody> y <tfoot> (lxml ubica las filas en un <tbody> implícito), y las celdas de cada fila.
+      3. Se calcula el número máximo de columnas de la tabla, considerando el atributo colspan de cada celda.
+      4. Se crea una matriz (lista de listas) que representa la tabla expandida; cada sublista corresponde a una fila.
+         Junto con la matriz se lleva la cuenta de las celdas asignadas en cada fila, de modo que para saber si una
+         fila está completa (o vacía) no hace falta recorrer sus celdas.
+      5. Se recorren las filas originales y se colocan las celdas en la matriz respetando los valores de rowspan y colspan,
          replicando el contenido en las celdas "vacías" que reemplazan a las originales combinadas.
-      7. Se eliminan las filas originales y se reconstruye la tabla nueva a partir de la matriz.
-    
-    :param html_content: Cadena con el contenido HTML original.
-    :return: Cadena con el HTML resultante en que las celdas combinadas han sido "descombinadas".
-    """
-    soup = BeautifulSoup(html_content, "html.parser")
-    tablas = soup.find_all("table")
+      6. Se eliminan las filas originales y se reconstruye la tabla nueva a partir de la matriz, en el mismo
+         elemento que contenía las filas.
 
-    for tabla in tablas:
+    :param soup: Documento de BeautifulSoup (se modifica).
+    """
+    for tabla in soup.find_all("table"):
         filas = tabla.find_all("tr", recursive=False)
+        for seccion in tabla.find_all(["thead", "tbody", "tfoot"], recursive=False):
+            filas += seccion.find_all("tr", recursive=False)
 
         # Si la tabla tiene una sola fila, se omite su procesamiento
         if len(filas) <= 1:
             continue
 
+        # Celdas de cada fila: (contenido, rowspan, colspan). Se conserva el texto tal cual.
+        celdas_filas = [
+            [(celda.get_text(strip=False), int(celda.get("rowspan", 1)), int(celda.get("colspan", 1)))
+             for celda in fila.find_all(["td", "th"], recursive=False)]
+            for fila in filas
+        ]
+
         # ----------------------------------------------------------------
         # 1. Calcular el número máximo de columnas considerando colspans
         # ----------------------------------------------------------------
-        max_columnas = 0
-        for fila in filas:
-            celdas = fila.find_all(["td", "th"], recursive=False)
-            col_index = 0
-            for celda in celdas:
-                colspan = int(celda.get("colspan", 1))
-                col_index += colspan
-            max_columnas = max(max_columnas, col_index)
+        max_columnas = max(sum(colspan for _, _, colspan in celdas) for celdas in celdas_filas)
+
+        # Si las filas no tienen celdas, no hay nada que descombinar
+        if max_columnas <= 0:
+            continue
 
         # ----------------------------------------------------------------
         # 2. Crear la matriz (tabla_matriz) para ubicar las celdas expandidas
         # ----------------------------------------------------------------
         tabla_matriz = []  # Cada sublista es una "fila" de la tabla expandida
+        asignadas = []  # Número de celdas asignadas en cada fila de la matriz
 
         def obtener_fila_disponible(idx):
             """Asegura que exista una fila en la matriz en el índice 'idx'."""
             while len(tabla_matriz) <= idx:
                 tabla_matriz.append([None] * max_columnas)
+                asignadas.append(0)
             return tabla_matriz[idx]
 
         fila_expandida_idx = 0
 
         # Recorrer cada fila de la tabla original para volcar su contenido en la matriz
-        for fila in filas:
-            # Buscar una fila disponible en la matriz que aún tenga celdas sin asignar
-            while True:
+        for celdas in celdas_filas:
+            # Saltar las filas de la matriz que ya están completas (por celdas con rowspan de filas anteriores)
+            f_expandida = obtener_fila_disponible(fila_expandida_idx)
+            while asignadas[fila_expandida_idx] == max_columnas:
+                fila_expandida_idx += 1
                 f_expandida = obtener_fila_disponible(fila_expandida_idx)
-                if all(c is not None for c in f_expandida):
-                    fila_expandida_idx += 1
-                else:
-                    break
 
-            celdas = fila.find_all(["td", "th"], recursive=False)
             col_expandida_idx = 0
 
-            for celda in celdas:
-                rowspan = int(celda.get("rowspan", 1))
-                colspan = int(celda.get("colspan", 1))
-                contenido_celda = celda.get_text(strip=False)  # Se conserva el texto tal cual
-
-                # Buscar la primera columna libre en la fila actual de la matriz
-                while tabla_matriz[fila_expandida_idx][col_expandida_idx] is not None:
+            for contenido_celda, rowspan, colspan in celdas:
+                # Buscar la primera columna libre en la fila actual de la matriz (la búsqueda solo avanza)
+                while f_expandida[col_expandida_idx] is not None:
                     col_expandida_idx += 1
 
                 # Rellenar la matriz en la posición correspondiente considerando rowspan y colspan
-                for r in range(rowspan):
-                    fila_target = obtener_fila_disponible(fila_expandida_idx + r)
-                    for c in range(colspan):
-                        expand_col = col_expandida_idx + c
+                for r in range(fila_expandida_idx, fila_expandida_idx + rowspan):
+                    fila_target = obtener_fila_disponible(r)
+                    for expand_col in range(col_expandida_idx, col_expandida_idx + colspan):
                         if fila_target[expand_col] is None:
                             fila_target[expand_col] = contenido_celda
+                            asignadas[r] += 1
 
             fila_expandida_idx += 1
 
         # ----------------------------------------------------------------
         # 3. Reconstruir la tabla HTML sin rowspan ni colspan
         # ----------------------------------------------------------------
+        contenedor = filas[0].parent
+
         # Eliminar las filas originales de la tabla
         for child in tabla.find_all("tr"):
             child.decompose()
 
         # Para cada fila de la matriz, crear una nueva fila <tr> y asignar las celdas correspondientes
-        for fila_exp in tabla_matriz:
+        for fila_exp, celdas_asignadas in zip(tabla_matriz, asignadas):
             # Ignorar filas que están completamente vacías
-            if all(c is None for c in fila_exp):
+            if celdas_asignadas == 0:
                 continue
 
             nuevo_tr = soup.new_tag("tr")
-            tabla.append(nuevo_tr)
+            contenedor.append(nuevo_tr)
             for c in fila_exp:
                 nueva_celda = soup.new_tag("td")
                 nueva_celda.string = c if c is not None else ""
                 nuevo_tr.append(nueva_celda)
 
+
+def limpiar_tablas_combinadas(html_content, parser="html.parser"):
+    """
+    Recibe una cadena de contenido HTML y devuelve el mismo contenido modificado,
+    de forma que se "descombinan" las celdas de las tablas que tienen atributos rowspan/colspan
+    (ver descombinar_tablas).
+
+    :param html_content: Cadena con el contenido HTML original.
+    :param parser: Parser de BeautifulSoup ("html.parser" o "lxml").
+    :return: Cadena con el HTML resultante en que las celdas combinadas han sido "descombinadas".
+    """
+    soup = BeautifulSoup(html_content, parser)
+    descombinar_tablas(soup)
     return str(soup)
 
 
 def html_to_markdown(html_file_path):
     """
-    Lee un archivo HTML, lo limpia (descombinando las celdas de las tablas) y lo convierte a Markdown.
-
-    Procedimiento:
-      - Se lee el contenido del archivo HTML.
-      - Se llama a la función limpiar_tablas_combinadas para descomponer las celdas combinadas.
-      - Se utiliza markdownify para convertir el HTML resultante a Markdown.
+    Lee un archivo HTML y lo convierte a Markdown (ver convertir_tablas).
 
     :param html_file_path: Ruta del archivo HTML.
     :return: Cadena con el contenido convertido a Markdown.
@@ -128,54 +166,190 @@ def html_to_markdown(html_file_path):
     # Leer el archivo HTML
     with open(html_file_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
-    
-    # Limpiar el HTML descombinando las celdas
-    html_limpio = limpiar_tablas_combinadas(html_content)
-    
-    # Convertir el HTML limpio a Markdown utilizando markdownify
-    markdown_text = markdownify.markdownify(html_limpio)
-    
+
+    return convertir_tablas([html_content])[0]
+
+
+def convertir_html_a_markdown(html_content, parser=None):
+    """
+    Limpia un HTML (descombinando las celdas de las tablas) y lo convierte a Markdown.
+
+    Procedimiento:
+      - Se parsea el HTML con BeautifulSoup y el parser indicado (por defecto, Config.PARSER_HTML_TABLAS).
+      - Se llama a la función descombinar_tablas para descomponer las celdas combinadas.
+      - Se utiliza markdownify para convertir el documento resultante a Markdown, sin volver a generar
+        el HTML ni a parsearlo.
+
+    :param html_content: Cadena con el contenido HTML.
+    :param parser: Parser de BeautifulSoup ("html.parser" o "lxml") (opcional).
+    :return: Cadena con el contenido convertido a Markdown.
+    """
+    soup = BeautifulSoup(html_content, parser_disponible(parser or Config.PARSER_HTML_TABLAS))
+
+    # Descombinar las celdas
+    descombinar_tablas(soup)
+
+    # Convertir el documento a Markdown utilizando markdownify
+    markdown_text = markdownify.MarkdownConverter().convert_soup(soup)
+
     return markdown_text
 
 
-def remplazar_tablas_en_md(markdown_result, folder_path):
+def _clave(html_content, parser):
+    return parser, hashlib.sha256(html_content.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def convertir_tablas(htmls):
+    """
+    Convierte una lista de HTML de tablas a Markdown (ver convertir_html_a_markdown).
+
+    Las conversiones se memorizan en el proceso por el hash SHA-256 del HTML (y el parser usado). Si quedan al
+    menos Config.TABLAS_MINIMAS_CONVERSION_PARALELA tablas pendientes (sin repetir) y hay más de un proceso
+    disponible (Config.PROCESOS_CONVERSION_TABLAS), se convierten repartidas entre varios procesos. Si los
+    procesos no se pueden usar, se convierten en el proceso actual.
+
+    :param htmls: Lista de cadenas HTML.
+    :return: Lista con el Markdown de cada tabla, en el mismo orden.
+    """
+    parser = parser_disponible(Config.PARSER_HTML_TABLAS)
+    claves = [_clave(html_content, parser) for html_content in htmls]
+    resultados = {}
+    pendientes = {}
+    for clave, html_content in zip(claves, htmls):
+        if clave in _memo:
+            resultados[clave] = _memo[clave]
+        elif clave not in pendientes:
+            pendientes[clave] = html_content
+
+    if pendientes:
+        convertidos = None
+        procesos = min(Config.PROCESOS_CONVERSION_TABLAS, len(pendientes))
+        if procesos > 1 and len(pendientes) >= Config.TABLAS_MINIMAS_CONVERSION_PARALELA:
+            try:
+                with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                    convertidos = list(ejecutor.map(convertir_html_a_markdown, pendientes.values(),
+                                                    [parser] * len(pendientes),
+                                                    chunksize=-(-len(pendientes) // (procesos * 4))))
+            except (BrokenProcessPool, OSError) as e:
+                if Config.DEBUG_PRINTS:
+                    print(f"No se pudieron convertir las tablas en paralelo, se convierten en serie: {e}")
+        if convertidos is None:
+            convertidos = [convertir_html_a_markdown(html_content, parser) for html_content in pendientes.values()]
+
+        for clave, convertido in zip(pendientes, convertidos):
+            resultados[clave] = convertido
+            _memo[clave] = convertido
+        while len(_memo) > MEMO_MAXIMO:
+            del _memo[next(iter(_memo))]
+
+        if Config.DEBUG_PRINTS:
+            print(f"Tablas HTML: {len(pendientes)} convertidas a Markdown, {len(htmls) - len(pendientes)} desde memoria")
+
+    return [resultados[clave] for clave in claves]
+
+
+def cargador_html(disponibles, leer):
+    """
+    Crea la función que carga el Markdown de las tablas guardadas como HTML.
+
+    Si las tablas disponibles alcanzan para convertirlas en paralelo (ver convertir_tablas), la primera carga
+    convierte juntas todas las tablas disponibles y las siguientes las toman de la memoria. Si no, cada carga
+    lee y convierte solo las tablas pedidas.
+
+    :param disponibles: Colección de las llaves que tienen reemplazo.
+    :param leer: Función que recibe una lista de llaves y devuelve la lista con el HTML de cada una.
+    :return: Función que recibe una lista de llaves y devuelve el diccionario {llave: Markdown de la tabla}.
+    """
+    anticipadas = []
+    if Config.PROCESOS_CONVERSION_TABLAS > 1 and len(disponibles) >= Config.TABLAS_MINIMAS_CONVERSION_PARALELA:
+        anticipadas = list(disponibles)
+
+    def cargar(llaves):
+        pedidas = set(llaves)
+        lote = llaves + [llave for llave in anticipadas if llave not in pedidas]
+        anticipadas.clear()
+        return dict(zip(llaves, convertir_tablas(leer(lote))))
+
+    return cargar
+
+
+def fuente_tablas(folder_path, tablas_markdown=None):
+    """
+    Determina las llaves de tabla con reemplazo y la función que carga su Markdown.
+
+    :param folder_path: Ruta de la carpeta donde se encuentran los archivos HTML de las tablas (la carpeta
+                        "tablas_html" o, si no existe, el archivo "tablas_html.zip" de PersistenciaTablasHTML).
+    :param tablas_markdown: Diccionario {llave única: Markdown de la tabla} (opcional).
+    :return: Tuple (disponibles, cargar) para SustituirLlavesMarkdown.
+    """
+    if tablas_markdown is not None:
+        def cargar(llaves):
+            return tablas_markdown
+
+        return tablas_markdown, cargar
+
+    # Tablas guardadas en un solo archivo (Config.PERSISTENCIA_TABLAS = "lote"), indexadas por el ZIP
+    ruta_lote = os.path.join(folder_path, "tablas_html.zip")
+    if not os.path.isdir(folder_path + r"\tablas_html") and os.path.exists(ruta_lote):
+        with zipfile.ZipFile(ruta_lote) as archivo:
+            disponibles = SustituirLlavesMarkdown.llaves_en_nombres(archivo.namelist(), "Tabla", ".html")
+
+        def leer(llaves):
+            with zipfile.ZipFile(ruta_lote) as archivo:
+                return [archivo.read(disponibles[llave]).decode("utf-8") for llave in llaves]
+
+        return disponibles, cargador_html(disponibles, leer)
+
+    # Archivos HTML de la carpeta de tablas, indexados por su llave (sin leerlos todavía)
+    disponibles = SustituirLlavesMarkdown.llaves_en_carpeta(folder_path + r"\tablas_html", "Tabla", ".html")
+
+    def leer(llaves):
+        htmls = []
+        for llave in llaves:
+            with open(disponibles[llave], 'r', encoding='utf-8') as f:
+                htmls.append(f.read())
+        return htmls
+
+    return disponibles, cargador_html(disponibles, leer)
+
+
+def remplazar_tablas_en_flujo(segmentos, folder_path, tablas_markdown=None):
+    """
+    Reemplaza las llaves de tabla en una secuencia de segmentos de Markdown (una página a la vez),
+    con el mismo contenido que remplazar_tablas_en_md.
+
+    :param segmentos: Iterable de cadenas de Markdown con las marcas de posición.
+    :param folder_path: Ruta de la carpeta donde se encuentran los archivos HTML de las tablas.
+    :param tablas_markdown: Diccionario {llave única: Markdown de la tabla} (opcional).
+    :return: Generador de los segmentos con las tablas reemplazadas.
+    """
+    disponibles, cargar = fuente_tablas(folder_path, tablas_markdown)
+    return SustituirLlavesMarkdown.sustituir_en_flujo(segmentos, "Tabla", disponibles, cargar)
+
+
+def remplazar_tablas_en_md(markdown_result, folder_path, tablas_markdown=None, salida=None):
     """
     Reemplaza en el contenido Markdown (markdown_result) las marcas de posición (llaves únicas) correspondientes
-    a tablas por el contenido de las tablas convertidas desde HTML.
+    a tablas por el contenido de las tablas en Markdown.
 
     Procedimiento:
-      - Se define la ruta de la carpeta "tablas_html" dentro de folder_path.
-      - Se listan los archivos HTML en la carpeta.
-      - Para cada archivo HTML:
-          a. Se convierte el HTML a Markdown utilizando la función html_to_markdown.
-          b. Se genera una llave única a partir del nombre del archivo (ignorando el primer carácter y la extensión).
-          c. Se reemplazan las ocurrencias de la llave en el contenido Markdown original por el Markdown convertido.
+      - Si se recibe tablas_markdown (Markdown generado en memoria a partir de la estructura de cada tabla,
+        ver RenderizarTablaMarkdown), se usa directamente.
+      - Si no, se listan los archivos HTML de la carpeta "tablas_html" dentro de folder_path. La llave única se
+        genera a partir del nombre del archivo (ignorando el primer carácter y la extensión). Los archivos
+        cuya llave aparece en el documento se leen y se convierten con la función convertir_tablas (si son
+        suficientes para convertirlos en paralelo, se convierten todos juntos, ver cargador_html).
+      - El documento se recorre una sola vez (SustituirLlavesMarkdown.sustituir_llaves) y cada llave se
+        reemplaza por la llave seguida del Markdown de la tabla.
       - Se retorna el contenido Markdown final con los reemplazos realizados.
 
     :param markdown_result: Cadena original en Markdown que contiene marcas de posición para tablas.
     :param folder_path: Ruta de la carpeta donde se encuentran los archivos HTML de las tablas.
+    :param tablas_markdown: Diccionario {llave única: Markdown de la tabla} (opcional).
+    :param salida: Archivo abierto donde se escribe el resultado a medida que se arma (opcional).
     :return: Cadena con el Markdown modificado, en el que se han reemplazado las marcas de posición
              por el contenido de las tablas.
     """
-    # Definir la ruta de la carpeta donde se encuentran los archivos HTML
-    ruta_carpeta = folder_path + r"\tablas_html"
-
-    # Listar los archivos HTML en la carpeta
-    archivos_html = [f for f in os.listdir(ruta_carpeta) if f.endswith(".html")]
-
-    # Iterar sobre cada archivo HTML encontrado
-    for archivo in archivos_html:
-        tabla_path = os.path.join(ruta_carpeta, archivo)
-        # Convertir el archivo HTML a Markdown
-        tabla_md = html_to_markdown(tabla_path)
-        # Generar una llave única para identificar la tabla en el Markdown original.
-        # Se toma el nombre del archivo, se elimina el primer carácter y la extensión.
-        llave_unica = "Llave_Unica_T" + archivo[1:].split(".html")[0]
-        if Config.DEBUG_PRINTS:
-            print(llave_unica)
-            print(markdown_result)
-        # Reemplazar la llave en el Markdown por la llave seguida del contenido de la tabla convertido
-        markdown_result = markdown_result.replace(llave_unica,
-                                                  f"\n\n{llave_unica}\n" + f"\n{tabla_md}\n\n")
-    
+    disponibles, cargar = fuente_tablas(folder_path, tablas_markdown)
+    markdown_result, _ = SustituirLlavesMarkdown.sustituir_llaves(markdown_result, "Tabla", disponibles, cargar, salida)
     return markdown_result
@@ -1,13 +1,25 @@
+import html
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtCore import QEventLoop
 import os
+import itertools
 import cv2
 import DetectarCentroidesDeCeldas as dcdc
+import DetectarCeldasProyeccion as dcp
+import DetectarCeldasComponentes as dcc_comp
 import ExtraerEstructuraDeTabla as eedt
 import Config
 
+# Detectores raster de celdas disponibles (se elige con Config.DETECTOR_CELDAS).
+# Todos reciben la ruta de la imagen y devuelven el mismo formato que dcdc.detectar_celdas.
+DETECTORES_CELDAS = {
+    "contornos": dcdc.detectar_celdas,
+    "proyeccion": dcp.detectar_celdas_proyeccion,
+    "componentes": dcc_comp.detectar_celdas_componentes,
+}
+
 class HTMLViewer(QMainWindow):
     """
     Ventana principal para mostrar contenido HTML usando un visor web (QWebEngineView).
@@ -51,38 +63,58 @@ class HTMLViewer(QMainWindow):
         self.event_loop.quit()
         event.accept()
 
-def generar_html_tabla(tabla):
+def fragmentos_html_tabla(tabla):
     """
-    Genera una cadena HTML que representa una tabla a partir de una estructura de datos.
+    Genera, fragmento a fragmento, el HTML que representa una tabla a partir de una estructura de datos.
     
     La estructura de 'tabla' se espera que sea una matriz (lista de listas) donde cada elemento
     es un diccionario que contiene, al menos, los siguientes campos:
-      - "contenido": Texto a mostrar en la celda.
+      - "contenido": Texto a mostrar en la celda. Se escapa ('&', '<', '>') para que cualquier parser
+        de HTML reconstruya el mismo texto.
       - "rowspan": Número de filas que la celda abarca (1 si no se fusiona con otras).
       - "colspan": Número de columnas que la celda abarca (1 si no se fusiona con otras).
       
     Se respetan los atributos rowspan y colspan. Se define un estilo básico con borde y alineación central.
+    Los fragmentos se entregan en orden para unirlos una sola vez o escribirlos directamente en un archivo,
+    sin concatenar la cadena completa celda por celda.
 
     :param tabla: Lista de listas que representa la estructura de la tabla.
-    :return: Cadena de texto con el HTML generado.
+    :return: Generador de los fragmentos del HTML.
     """
-    html = "<html><body>"
-    html += "<table border='1' style='border-collapse: collapse; text-align: center; width: 100%;'>\n"
+    yield "<html><body>"
+    yield "<table border='1' style='border-collapse: collapse; text-align: center; width: 100%;'>\n"
 
     # Procesar cada fila de la tabla
     for fila in tabla:
-        html += "  <tr>\n"
+        yield "  <tr>\n"
         # Procesar cada celda de la fila
         for celda in fila:
             # Solo se generan celdas que tengan valores positivos para rowspan y colspan
             if celda["rowspan"] > 0 and celda["colspan"] > 0:
-                html += f"    <td rowspan='{celda['rowspan']}' colspan='{celda['colspan']}' style='white-space: pre-line;'>{celda['contenido']}</td>\n"
-        html += "  </tr>\n"
+                yield f"    <td rowspan='{celda['rowspan']}' colspan='{celda['colspan']}' style='white-space: pre-line;'>{html.escape(celda['contenido'], quote=False)}</td>\n"
+        yield "  </tr>\n"
 
-    html += "</table>"
-    html += "</body></html>"
-    
-    return html
+    yield "</table>"
+    yield "</body></html>"
+
+def generar_html_tabla(tabla):
+    """
+    Genera una cadena HTML que representa una tabla a partir de una estructura de datos
+    (ver fragmentos_html_tabla).
+
+    :param tabla: Lista de listas que representa la estructura de la tabla.
+    :return: Cadena de texto con el HTML generado.
+    """
+    return "".join(fragmentos_html_tabla(tabla))
+
+def nombre_archivo_tabla(tabla_actual):
+    """
+    Obtiene el nombre (sin extensión) del archivo HTML de una tabla a partir de su identificador.
+
+    :param tabla_actual: Cadena o identificador de la tabla (por ejemplo, la ruta de su recorte).
+    :return: Nombre del archivo, por ejemplo "tabla_1_2".
+    """
+    return tabla_actual.split("\\")[-1].split(".")[0]
 
 def guardar_tabla(tabla, tabla_actual, folder_path, path_tablas):
     """
@@ -92,23 +124,22 @@ def guardar_tabla(tabla, tabla_actual, folder_path, path_tablas):
       - Se genera el contenido HTML de la tabla a partir de la estructura.
       - Se determina la ruta de salida, tomando como nombre el identificador 'tabla_actual'.
       - Se crea la carpeta de salida si no existe.
-      - Se guarda el contenido HTML en el archivo especificado.
+      - Se escribe el HTML en el archivo especificado a medida que se genera.
     
     :param tabla: Estructura de la tabla (lista de listas de celdas).
     :param tabla_actual: Cadena o identificador utilizado como parte del nombre de archivo.
     :param folder_path: Ruta de la carpeta principal.
     :param path_tablas: Subcarpeta o ruta para guardar los archivos HTML de tablas.
     """
-    html_content = generar_html_tabla(tabla)
     # Se determina el nombre del archivo a partir de la clave de la tabla
-    output_file = os.path.join(path_tablas, tabla_actual.split("\\")[-1].split(".")[0] + ".html")
+    output_file = os.path.join(path_tablas, nombre_archivo_tabla(tabla_actual) + ".html")
 
     # Crear la carpeta si no existe
     os.makedirs(folder_path, exist_ok=True)
 
     # Guardar el contenido HTML en el archivo
     with open(output_file, "w", encoding="utf-8") as file:
-        file.write(html_content)
+        file.writelines(fragmentos_html_tabla(tabla))
 
     if Config.DEBUG_PRINTS:
         print(f"Archivo guardado en: {output_file}")
@@ -139,7 +170,7 @@ def mostrar_html_todas_las_tablas(lista_de_tablas):
     """
     Muestra todas las tablas (una lista de estructuras de tabla) en una sola ventana PyQt.
     
-    Se concatena el HTML de todas las tablas, se crea un event loop para pausar la ejecución
+    Se une el HTML de todas las tablas en una sola operación, se crea un event loop para pausar la ejecución
     hasta que el usuario cierre la ventana, y se muestra el resultado en un QWebEngineView.
 
     :param lista_de_tablas: Lista de estructuras de tabla (cada una es una lista de listas).
@@ -148,11 +179,12 @@ def mostrar_html_todas_las_tablas(lista_de_tablas):
     if not app:
         app = QApplication(sys.argv)
 
-    # Construir el HTML concatenado de todas las tablas
-    html_content = "<html><body><h1>Tablas Detectadas</h1>"
-    for tabla in lista_de_tablas:
-        html_content += generar_html_tabla(tabla)
-    html_content += "</body></html>"
+    # Construir el HTML de todas las tablas uniendo sus fragmentos una sola vez
+    html_content = "".join(itertools.chain(
+        ["<html><body><h1>Tablas Detectadas</h1>"],
+        itertools.chain.from_iterable(fragmentos_html_tabla(tabla) for tabla in lista_de_tablas),
+        ["</body></html>"],
+    ))
 
     event_loop = QEventLoop()  # Crear un event loop para pausar la ejecución
     viewer = HTMLViewer(html_content, event_loop, "")
@@ -165,7 +197,8 @@ def image_to_HTML(path_image, tabla_actual):
     Procesa una imagen que contiene una tabla y devuelve la estructura de la tabla en HTML.
     
     Procedimiento:
-      - Se detectan las celdas en la imagen utilizando la función detectar_celdas del módulo dcdc.
+      - Se detectan las celdas en la imagen con el detector elegido en Config.DETECTOR_CELDAS
+        (contornos de dcdc por defecto, perfiles de proyección de dcp o componentes conexas de dcc_comp).
       - Se genera una malla (cuadrícula) sobre la imagen basándose en las coordenadas detectadas.
       - Se construye la estructura de la tabla (con atributos como rowspan y colspan) usando la función
         generar_estructura_tabla_new del módulo eedt.
@@ -176,7 +209,8 @@ def image_to_HTML(path_image, tabla_actual):
     :return: Una tupla con la estructura de la tabla, lista de coordenadas de celdas, centros de celdas, ancho y alto de la imagen, y las dimensiones de la tabla.
     """
     # Detectar celdas y obtener información sobre sus coordenadas y centroides
-    imagenes_celdas, coordenadas_celdas, centros_celdas, imagen_width, imagen_height, dimensiones_tabla = dcdc.detectar_celdas(path_image)
+    detectar_celdas = DETECTORES_CELDAS[Config.DETECTOR_CELDAS]
+    imagenes_celdas, coordenadas_celdas, centros_celdas, imagen_width, imagen_height, dimensiones_tabla = detectar_celdas(path_image)
 
     if Config.DEBUG_PRINTS:
         print("\nCantidad de celdas encontradas:\n", len(imagenes_celdas), "\n")
@@ -185,16 +219,7 @@ def image_to_HTML(path_image, tabla_actual):
     lineas_x, lineas_y, max_filas, max_columnas, imagen_malla, umbral_x, umbral_y = eedt.generar_malla(coordenadas_celdas, imagen_width, imagen_height)
 
     # Construir la cuadrícula con las coordenadas de cada celda de la malla
-    cuadricula = []
-    for i in range(len(lineas_y)):
-        fila = []
-        for j in range(len(lineas_x)):
-            x = lineas_x[j]
-            y = lineas_y[i]
-            w = lineas_x[j+1] - x if j < len(lineas_x) - 1 else imagen_width - x
-            h = lineas_y[i+1] - y if i < len(lineas_y) - 1 else imagen_height - y
-            fila.append({"x": x, "y": y, "w": w, "h": h})
-        cuadricula.append(fila)
+    cuadricula = eedt.construir_cuadricula(lineas_x, lineas_y, imagen_width, imagen_height)
 
     # Generar la estructura de la tabla a partir de la cuadricula y las celdas detectadas
     tabla_generada = eedt.generar_estructura_tabla_new(coordenadas_celdas, cuadricula, max_filas, max_columnas, imagen_width, imagen_height, tabla_actual)
@@ -0,0 +1,81 @@
+"""
+RenderizarTablaMarkdown.py
+
+Genera el Markdown de una tabla directamente a partir de su estructura en memoria (la misma matriz de
+diccionarios con "contenido", "rowspan" y "colspan" que usa RenderizarTablaHTML.generar_html_tabla),
+sin escribir el HTML a disco ni volver a leerlo y parsearlo con BeautifulSoup y markdownify.
+
+Las celdas combinadas se expanden sobre la malla: cada celda de la malla cubierta por una fusión
+repite el contenido de la celda principal, igual que RemplazarTablasDeMarkdown.limpiar_tablas_combinadas.
+El formato de salida (encabezado vacío, separador, normalización de espacios y escape de '*' y '_')
+es el mismo que produce markdownify para la tabla descombinada.
+"""
+
+import re
+
+# Mismas normalizaciones de espacios que aplica markdownify al texto de las celdas
+RE_SALTOS = re.compile(r'[\t \r\n]*[\r\n][\t \r\n]*')
+RE_ESPACIOS = re.compile(r'[\t ]+')
+
+
+def texto_celda(contenido):
+    """
+    Convierte el contenido de una celda al texto de la celda en Markdown: espacios normalizados,
+    '*' y '_' escapados y saltos de línea reemplazados por espacios.
+
+    :param contenido: Texto de la celda.
+    :return: Texto de la celda listo para la fila de la tabla Markdown.
+    """
+    texto = RE_ESPACIOS.sub(' ', RE_SALTOS.sub('\n', contenido))
+    texto = texto.replace('*', r'\*').replace('_', r'\_')
+    return texto.strip().replace('\n', ' ')
+
+
+def expandir_celdas(tabla):
+    """
+    Expande las celdas combinadas de la estructura sobre la malla.
+
+    :param tabla: Estructura de la tabla (lista de listas de diccionarios con "contenido", "rowspan" y "colspan").
+    :return: Matriz (lista de listas) con el texto de cada celda de la malla; las celdas cubiertas por una
+             fusión repiten el texto de la celda principal.
+    """
+    matriz = [[None] * len(fila) for fila in tabla]
+    for i, fila in enumerate(tabla):
+        for j, celda in enumerate(fila):
+            if celda["rowspan"] > 0 and celda["colspan"] > 0:
+                texto = texto_celda(celda["contenido"])
+                for r in range(i, min(i + celda["rowspan"], len(tabla))):
+                    fila_matriz = matriz[r]
+                    for c in range(j, min(j + celda["colspan"], len(fila_matriz))):
+                        # Si dos fusiones se superponen, se conserva la primera
+                        if fila_matriz[c] is None:
+                            fila_matriz[c] = texto
+    return [[texto if texto is not None else "" for texto in fila] for fila in matriz]
+
+
+def generar_markdown_tabla(tabla):
+    """
+    Genera el Markdown de una tabla a partir de su estructura.
+
+    La tabla no tiene fila de encabezado: se emite una fila de encabezado vacía y el separador, y a
+    continuación una fila por cada fila de la malla. Una tabla de una sola fila no se descombina (como en
+    la ruta HTML): cada celda aparece una vez, seguida de tantas columnas vacías como abarque.
+
+    :param tabla: Estructura de la tabla (lista de listas de celdas).
+    :return: Cadena con la tabla en Markdown (vacía si la tabla no tiene celdas).
+    """
+    if len(tabla) == 0 or len(tabla[0]) == 0:
+        return ""
+
+    if len(tabla) == 1:
+        celdas = [celda for celda in tabla[0] if celda["rowspan"] > 0 and celda["colspan"] > 0]
+        columnas = sum(celda["colspan"] for celda in celdas)
+        filas_md = ["|" + "".join(" " + texto_celda(celda["contenido"]) + " |" * celda["colspan"] for celda in celdas)]
+    else:
+        matriz = expandir_celdas(tabla)
+        columnas = len(matriz[0])
+        filas_md = ["|" + "".join(" " + texto + " |" for texto in fila) for fila in matriz]
+
+    encabezado = "| " + " | ".join([""] * columnas) + " |"
+    separador = "| " + " | ".join(["---"] * columnas) + " |"
+    return "\n".join([encabezado, separador] + filas_md)
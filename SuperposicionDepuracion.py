@@ -0,0 +1,108 @@
+"""
+SuperposicionDepuracion.py
+
+Registro diferido de las superposiciones de depuración (contornos, vértices, etiquetas, mallas).
+
+En lugar de copiar la imagen y dibujar sobre ella en cada paso de la detección, cada vista de
+depuración se representa con una Superposicion que solo guarda las primitivas de dibujo
+(llamadas a OpenCV y sus argumentos). La imagen se rasteriza únicamente cuando alguien la pide:
+una ventana de depuración (Config.DEBUG_IMAGES) o el volcado a disco (Config.DEPURACION_VOLCADO_DIR).
+
+Si no hay ningún consumidor, la superposición está inactiva y no se registra nada, por lo que en
+producción no se hace ningún trabajo de anotación.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+import Config
+
+_contador_volcados = 0  # Numeración de las imágenes volcadas (mantiene el orden de generación)
+
+
+def activa():
+    """
+    Indica si alguna vista de depuración consume las superposiciones.
+    """
+    return Config.DEBUG_IMAGES or bool(Config.DEPURACION_VOLCADO_DIR)
+
+
+class Superposicion:
+    """
+    Superposición de depuración con rasterizado diferido.
+
+    Las primitivas se dibujan en el orden en que se registraron sobre una copia de la imagen base
+    (convertida a BGR si es de un solo canal) o, si no hay base, sobre un lienzo blanco.
+    """
+
+    def __init__(self, nombre, base=None, forma=None):
+        """
+        :param nombre: Nombre de la vista (título de la ventana y nombre del archivo volcado).
+        :param base: Imagen de fondo (se guarda la referencia, no se copia).
+        :param forma: Tuple (alto, ancho) del lienzo blanco cuando no hay imagen base.
+        """
+        self.nombre = nombre
+        self.base = base
+        self.forma = forma
+        self.activa = activa()
+        self.primitivas = []
+
+    def _registrar(self, funcion, *args):
+        if self.activa:
+            self.primitivas.append((funcion, args))
+
+    def linea(self, p0, p1, color, grosor=1):
+        self._registrar(cv2.line, p0, p1, color, grosor)
+
+    def rectangulo(self, p0, p1, color, grosor=1):
+        self._registrar(cv2.rectangle, p0, p1, color, grosor)
+
+    def circulo(self, centro, radio, color, grosor=1):
+        self._registrar(cv2.circle, centro, radio, color, grosor)
+
+    def texto(self, texto, origen, escala, color, grosor=1):
+        self._registrar(cv2.putText, texto, origen, cv2.FONT_HERSHEY_SIMPLEX, escala, color, grosor)
+
+    def contornos(self, contornos, color, grosor=1):
+        # Se copia la lista porque el llamador puede reemplazar sus elementos después
+        self._registrar(cv2.drawContours, list(contornos), -1, color, grosor)
+
+    def renderizar(self):
+        """
+        Rasteriza la superposición.
+
+        :return: Imagen BGR con todas las primitivas dibujadas.
+        """
+        if self.base is None:
+            alto, ancho = self.forma
+            lienzo = np.full((alto, ancho, 3), 255, dtype=np.uint8)
+        elif self.base.ndim == 2:
+            lienzo = cv2.cvtColor(self.base, cv2.COLOR_GRAY2BGR)
+        else:
+            lienzo = self.base.copy()
+        for funcion, args in self.primitivas:
+            funcion(lienzo, *args)
+        return lienzo
+
+    def publicar(self, mostrar=None):
+        """
+        Entrega la superposición a los consumidores activos: la muestra con la función 'mostrar'
+        (si Config.DEBUG_IMAGES) y/o la guarda en Config.DEPURACION_VOLCADO_DIR.
+
+        :param mostrar: Función (nombre, imagen) usada para mostrar la imagen en pantalla.
+        :return: Imagen rasterizada, o None si la superposición está inactiva.
+        """
+        global _contador_volcados
+        if not self.activa:
+            return None
+        imagen = self.renderizar()
+        if Config.DEBUG_IMAGES and mostrar is not None:
+            mostrar(self.nombre, imagen)
+        if Config.DEPURACION_VOLCADO_DIR:
+            os.makedirs(Config.DEPURACION_VOLCADO_DIR, exist_ok=True)
+            _contador_volcados += 1
+            nombre_archivo = f"{_contador_volcados:05d}_{self.nombre.replace(' ', '_')}.png"
+            cv2.imwrite(os.path.join(Config.DEPURACION_VOLCADO_DIR, nombre_archivo), imagen)
+        return imagen
@@ -0,0 +1,150 @@
+"""
+SustituirLlavesMarkdown.py
+
+Sustitución en una sola pasada de las llaves únicas (Llave_Unica_Tabla_<página>_<n> y
+Llave_Unica_Imagen_<página>_<n>) que marcan en el Markdown la posición de las tablas y de las imágenes.
+
+En lugar de recorrer todos los archivos de tablas o imágenes y llamar a str.replace sobre el documento
+completo por cada uno, el documento se recorre una sola vez con un patrón compilado. Solo se cargan
+(y convierten) los reemplazos de las llaves que realmente aparecen, todos juntos en una sola llamada.
+La sustitución también puede aplicarse a una secuencia de segmentos (una página a la vez), de modo que
+el documento completo nunca tiene que estar en memoria.
+
+Como subproducto se informan las llaves del documento que no tienen reemplazo y los reemplazos
+disponibles cuya llave no aparece en el documento.
+"""
+
+import os
+import re
+
+import Config
+import PerfilEjecucion
+
+# Llave única de una tabla o de una imagen. Los números se toman completos, de modo que la llave
+# "..._1_1" no coincide con el comienzo de "..._1_10".
+PATRON_LLAVE = re.compile(r"Llave_Unica_(Tabla|Imagen)_\d+_\d+")
+
+
+def llaves_en_nombres(nombres, tipo, extension):
+    """
+    Asocia cada llave con el nombre del archivo que contiene su reemplazo.
+
+    La llave se forma a partir del nombre del archivo omitiendo su primer carácter y la extensión
+    (por ejemplo, "tabla_1_2.html" corresponde a "Llave_Unica_Tabla_1_2").
+
+    :param nombres: Nombres de los archivos de reemplazo.
+    :param tipo: "Tabla" o "Imagen".
+    :param extension: Extensión de los archivos de reemplazo (por ejemplo ".html").
+    :return: Diccionario {llave: nombre del archivo}.
+    """
+    return {
+        f"Llave_Unica_{tipo[0]}" + archivo[1:].split(extension)[0]: archivo
+        for archivo in nombres if archivo.endswith(extension)
+    }
+
+
+def llaves_en_carpeta(ruta_carpeta, tipo, extension):
+    """
+    Asocia cada llave con el archivo de la carpeta que contiene su reemplazo, sin leer los archivos
+    (ver llaves_en_nombres).
+
+    :param ruta_carpeta: Carpeta con los archivos de reemplazo.
+    :param tipo: "Tabla" o "Imagen".
+    :param extension: Extensión de los archivos de reemplazo (por ejemplo ".html").
+    :return: Diccionario {llave: ruta del archivo}.
+    """
+    return {
+        llave: os.path.join(ruta_carpeta, archivo)
+        for llave, archivo in llaves_en_nombres(os.listdir(ruta_carpeta), tipo, extension).items()
+    }
+
+
+def sustituir_en_flujo(segmentos, tipo, disponibles, cargar, reporte=None):
+    """
+    Reemplaza las llaves del tipo indicado en una secuencia de segmentos de Markdown (por ejemplo, una
+    página a la vez), entregando cada segmento reemplazado a medida que se procesa.
+
+    Procedimiento, para cada segmento:
+      1. Se recorre el segmento una sola vez con PATRON_LLAVE, separando los tramos de texto de las llaves.
+      2. Se cargan de una sola vez los reemplazos de las llaves encontradas que estén disponibles y que
+         no se hayan cargado en un segmento anterior.
+      3. Se entrega el segmento con cada llave reemplazada por la llave seguida de su contenido, dejando
+         sin cambios las llaves de otro tipo y las que no tienen reemplazo.
+
+    Una llave no se divide entre segmentos (cada llave pertenece al texto de una sola página).
+
+    :param segmentos: Iterable de cadenas de Markdown con las llaves.
+    :param tipo: "Tabla" o "Imagen".
+    :param disponibles: Colección de las llaves que tienen reemplazo (por ejemplo, un diccionario
+                        {llave: ruta} de llaves_en_carpeta o {llave: Markdown} ya en memoria).
+    :param cargar: Función que recibe una lista de llaves encontradas y devuelve el diccionario
+                   {llave: contenido} con su reemplazo.
+    :param reporte: Diccionario que, al agotar los segmentos, se completa con las llaves "sustituidas",
+                    "sin_reemplazo" (en el documento, sin contenido) y "sin_usar" (con contenido, ausentes
+                    del documento) (opcional).
+    :return: Generador de los segmentos con los reemplazos.
+    """
+    contenidos = {}
+    sin_reemplazo = {}
+    for segmento in segmentos:
+        # Tramos del segmento: texto literal o llave a reemplazar
+        tramos = []
+        nuevas = {}
+        inicio = 0
+        for coincidencia in PATRON_LLAVE.finditer(segmento):
+            if coincidencia.group(1) != tipo:
+                continue
+            llave = coincidencia.group(0)
+            if llave not in disponibles:
+                sin_reemplazo[llave] = True
+                continue
+            tramos.append(segmento[inicio:coincidencia.start()])
+            tramos.append((llave,))
+            if llave not in contenidos:
+                nuevas[llave] = True
+            inicio = coincidencia.end()
+
+        if not tramos:
+            yield segmento
+            continue
+        tramos.append(segmento[inicio:])
+
+        if nuevas:
+            contenidos.update(cargar(list(nuevas)))
+
+        yield "".join(
+            f"\n\n{tramo[0]}\n" + f"\n{contenidos[tramo[0]]}\n\n" if isinstance(tramo, tuple) else tramo
+            for tramo in tramos
+        )
+
+    datos = {
+        "sustituidas": len(contenidos),
+        "sin_reemplazo": list(sin_reemplazo),
+        "sin_usar": [llave for llave in disponibles if llave not in contenidos],
+    }
+    if reporte is not None:
+        reporte.update(datos)
+    PerfilEjecucion.registrar("sustitucion_llaves", tipo=tipo, **datos)
+    if Config.DEBUG_PRINTS:
+        print(f"Llaves de tipo {tipo}: {datos['sustituidas']} sustituidas, "
+              f"sin reemplazo: {datos['sin_reemplazo']}, reemplazos sin usar: {datos['sin_usar']}")
+
+
+def sustituir_llaves(markdown, tipo, disponibles, cargar, salida=None):
+    """
+    Reemplaza las llaves del tipo indicado en un documento completo (ver sustituir_en_flujo).
+
+    :param markdown: Contenido Markdown con las llaves.
+    :param tipo: "Tabla" o "Imagen".
+    :param disponibles: Colección de las llaves que tienen reemplazo.
+    :param cargar: Función que recibe la lista de llaves encontradas y devuelve el diccionario
+                   {llave: contenido} con su reemplazo. Solo se llama una vez.
+    :param salida: Archivo abierto en modo texto donde se escribe el resultado (opcional).
+    :return: Tuple (resultado, reporte): el Markdown con los reemplazos y el diccionario con las llaves
+             "sustituidas", "sin_reemplazo" y "sin_usar".
+    """
+    reporte = {}
+    resultado = "".join(sustituir_en_flujo([markdown], tipo, disponibles, cargar, reporte))
+    if salida is not None:
+        salida.write(resultado)
+    return resultado, reporte
@@ -28,49 +28,52 @@ def mostrar_imagen_redimensionada(name_image, image, max_ancho=1280, max_alto=72
     # Mostrar la imagen redimensionada
     cv2.imshow(name_image, image)
 
+def mascara_oscura(region, umbral=115):
+    """
+    Calcula la máscara de píxeles oscuros de una región.
+
+    Un píxel es oscuro si su valor (canal V de HSV, es decir, el máximo de los canales B, G y R)
+    no supera el umbral; por eso no es necesario convertir la imagen a HSV.
+
+    :param region: Región de la imagen (BGR o escala de grises).
+    :param umbral: Valor máximo para considerar un píxel oscuro.
+    :return: Máscara booleana con la forma (alto, ancho) de la región.
+    """
+    valor = region.max(axis=2) if region.ndim == 3 else region
+    return valor <= umbral
+
 def detectar_bordes_oscuros(image, axis):
     """
     Detecta bordes oscuros en la imagen y dibuja una línea en la posición del píxel más cercano al borde.
     
     La función analiza una región en uno de los bordes de la imagen (definido por el parámetro 'axis').
-    Se convierte la imagen a espacio de color HSV para facilitar la detección de píxeles oscuros.
     Dependiendo de 'axis' ("top", "bottom", "left" o "right"), se extraen las primeras filas/columnas
-    o las últimas filas/columnas, se crea una máscara para detectar píxeles oscuros y se determina la posición
-    del borde. Finalmente, se dibuja una línea negra (con grosor 2) a lo largo del borde detectado.
+    o las últimas filas/columnas, se crea una máscara de píxeles oscuros solo sobre esa franja y se
+    determina la posición del borde. Finalmente, se dibuja una línea negra (con grosor 2) a lo largo
+    del borde detectado.
     
-    :param image: Imagen en formato BGR (numpy array).
+    :param image: Imagen en formato BGR o escala de grises (numpy array).
     :param axis: Lado de la imagen a analizar ("top", "bottom", "left", o "right").
     """
     h, w = image.shape[:2]
     num_filas = 20  # Número de filas o columnas a analizar en el borde
 
-    # Convertir la imagen a HSV para una mejor detección de tonos oscuros
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-    # Definir el rango de colores que se consideran "oscuros"
-    lower_dark = np.array([0, 0, 0])
-    upper_dark = np.array([180, 255, 115])
-
-    # Extraer la región de interés dependiendo del lado
+    # Extraer la franja del borde dependiendo del lado y detectar sus píxeles oscuros
     if axis == "top":
-        region = hsv[:num_filas, :, :]
-        mask = cv2.inRange(region, lower_dark, upper_dark)
-        indices = np.column_stack(np.where(mask > 0))
+        mask = mascara_oscura(image[:num_filas, :])
+        indices = np.column_stack(np.where(mask))
         y = np.min(indices[:, 0]) if indices.size > 0 else 0
     elif axis == "bottom":
-        region = hsv[-num_filas:, :, :]
-        mask = cv2.inRange(region, lower_dark, upper_dark)
-        indices = np.column_stack(np.where(mask > 0))
+        mask = mascara_oscura(image[-num_filas:, :])
+        indices = np.column_stack(np.where(mask))
         y = h - (num_filas - np.max(indices[:, 0])) if indices.size > 0 else h - 1
     elif axis == "left":
-        region = hsv[:, :num_filas, :]
-        mask = cv2.inRange(region, lower_dark, upper_dark)
-        indices = np.column_stack(np.where(mask > 0))
+        mask = mascara_oscura(image[:, :num_filas])
+        indices = np.column_stack(np.where(mask))
         x = np.min(indices[:, 1]) if indices.size > 0 else 0
     elif axis == "right":
-        region = hsv[:, -num_filas:, :]
-        mask = cv2.inRange(region, lower_dark, upper_dark)
-        indices = np.column_stack(np.where(mask > 0))
+        mask = mascara_oscura(image[:, -num_filas:])
+        indices = np.column_stack(np.where(mask))
         x = w - (num_filas - np.max(indices[:, 1])) if indices.size > 0 else w - 1
     else:
         return
@@ -85,33 +88,35 @@ def detectar_bordes_oscuros(image, axis):
         
         # Dibujar la línea en la posición detectada del borde
         if axis in ["top", "bottom"]:
-            cv2.line(image, (inicio, y), (fin, y), color_linea, 2)
+            cv2.line(image, (int(inicio), int(y)), (int(fin), int(y)), color_linea, 2)
         else:  # Caso "left" o "right"
-            cv2.line(image, (x, inicio), (x, fin), color_linea, 2)
+            cv2.line(image, (int(x), int(inicio)), (int(x), int(fin)), color_linea, 2)
 
 def verificar_cierre(image):
     """
     Verifica que la tabla representada en una imagen esté "cerrada" en sus bordes.
 
     La función aplica la detección de bordes oscuros en los cuatro lados de la imagen (superior, inferior,
-    izquierdo y derecho) para determinar si existe un contorno definido. Posteriormente, une las líneas cercanas
-    mediante una operación morfológica para mejorar la detección de contornos.
+    izquierdo y derecho) para determinar si existe un contorno definido. Posteriormente, convierte la
+    imagen a escala de grises una sola vez y une las líneas cercanas mediante una operación morfológica
+    para mejorar la detección de contornos.
     
-    :param image: Imagen en formato BGR (numpy array).
-    :return: Imagen modificada, en la que los bordes han sido "cerrados" y las líneas unidas.
+    :param image: Imagen en formato BGR (numpy array). Se modifica en el lugar.
+    :return: Imagen binaria en escala de grises, en la que los bordes han sido "cerrados" y las líneas unidas.
     """
-    # Detecta los bordes oscuros en cada lado
+    # Detecta los bordes oscuros en cada lado (solo se analizan las franjas de los bordes)
     detectar_bordes_oscuros(image, "top")
     detectar_bordes_oscuros(image, "bottom")
     detectar_bordes_oscuros(image, "left")
     detectar_bordes_oscuros(image, "right")
 
     # Unir las líneas que están muy cercanas entre sí para formar un contorno continuo
-    image = unir_lineas_cercanas(image, kernel_size=3, iterations=2)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    image = unir_lineas_cercanas(gray, kernel_size=3, iterations=2, convertir_a_bgr=False)
 
     return image
 
-def unir_lineas_cercanas(image, kernel_size=3, iterations=1):
+def unir_lineas_cercanas(image, kernel_size=3, iterations=1, convertir_a_bgr=True):
     """
     Une las líneas que están muy cercanas entre sí para mejorar la detección de contornos.
 
@@ -120,18 +125,20 @@ def unir_lineas_cercanas(image, kernel_size=3, iterations=1):
       2. Se aplica umbralización para obtener una imagen binaria invertida (líneas en negro sobre fondo blanco).
       3. Se utiliza dilatación para engrosar las líneas y unir espacios pequeños.
       4. Se aplica erosión para refinar y unir las líneas continuas.
-      5. Se invierte la imagen resultante y se la convierte a formato BGR.
+      5. Se invierte la imagen resultante y, si se pide, se la convierte a formato BGR.
     
     :param image: Imagen de entrada (en escala de grises o color).
     :param kernel_size: Tamaño del kernel (matriz de unos) para operaciones de dilatación y erosión.
     :param iterations: Número de iteraciones para las operaciones morfológicas.
-    :return: Imagen procesada con líneas unidas, en formato BGR.
+    :param convertir_a_bgr: Si es False, se devuelve directamente la imagen binaria en escala de grises.
+    :return: Imagen procesada con líneas unidas, en formato BGR (o escala de grises).
     """
     # Convertir la imagen a escala de grises si es una imagen a color
+    # (la umbralización no modifica la entrada, por lo que no hace falta copiarla)
     if len(image.shape) == 3:
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
-        gray = image.copy()
+        gray = image
 
     # Aplicar umbral para obtener una imagen binaria invertida (líneas en negro)
     _, binary = cv2.threshold(gray, 170, 255, cv2.THRESH_BINARY_INV)
@@ -150,7 +157,8 @@ def unir_lineas_cercanas(image, kernel_size=3, iterations=1):
     final_image = cv2.bitwise_not(eroded)
     
     # Convertir la imagen final a BGR para mantener el formato original
-    final_image = cv2.cvtColor(final_image, cv2.COLOR_GRAY2BGR)
+    if convertir_a_bgr:
+        final_image = cv2.cvtColor(final_image, cv2.COLOR_GRAY2BGR)
     
     if Config.DEBUG_IMAGES:
         mostrar_imagen_redimensionada("Verificar tabla cerrada:", final_image)